@@ -1,23 +1,48 @@
-from flask import Flask, request, jsonify, send_file, render_template, redirect, url_for, flash
+from flask import Flask, request, jsonify, send_file, render_template, redirect, url_for, flash, Response
 from flask_cors import CORS
 from config import Config
 from utils.file_utils import save_file
-from services.data_loader import load_csv
-from services.data_analysis import get_basic_stats
-from services.visualization_service import generate_visualizations
+from utils import instrumentation
+from prediction_routes import prediction_bp
+from services import data_loader
+from utils import scheduler
+from services.data_loader import load_csv, sniff_schema
+from services.visualization_service import generate_visualizations, generate_map
+from services import aggregates, profiling, dataset_store, chunked_upload, jobs, precompute, model_retention
+from services.dataset_cache import dataset_fingerprint
 from services.model_training import (
     train_model, 
     train_both_models, 
     list_models,
-    load_model
+    load_metadata,
+    set_pinned,
+    delete_model,
+    memory_summary
 )
 import os
-import pandas as pd
+import hashlib
+import logging
+
+logging.basicConfig(
+    level=getattr(logging, Config.LOG_LEVEL, logging.INFO),
+    format="%(asctime)s %(levelname)s %(name)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 app.config.from_object(Config)
 app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'secret-key')
 CORS(app)
+instrumentation.init_app(app)
+data_loader.configure(csv_engine=Config.CSV_ENGINE)
+jobs.configure(max_workers=Config.JOB_WORKERS)
+scheduler.configure(total_cores=Config.TRAINING_CORES)
+model_retention.configure(
+    keep_last=Config.MODEL_KEEP_LAST,
+    max_bytes=Config.MODEL_DIR_MAX_MB * 1024 * 1024,
+    orphan_grace_seconds=Config.MODEL_ORPHAN_GRACE_SECONDS,
+)
+app.register_blueprint(prediction_bp)
 
 @app.route("/")
 def index():
@@ -43,24 +68,52 @@ def analysis_page():
         flash("Nenhum arquivo CSV disponível para análise. Faça o upload primeiro.")
         return redirect(url_for('upload_file'))
     
+    source_path = last_uploaded_file
     try:
-        df = load_csv(last_uploaded_file)
-        stats = get_basic_stats(df)
-        plots = generate_visualizations(df, os.path.join("static", "plots"))
+        # PNGs renderizados no servidor viraram um caminho opcional de exportação;
+        # por padrão o navegador desenha os gráficos a partir de /api/aggregates/*
+        export_png = request.args.get("export") == "png" or app.config["PLOT_EXPORT_PNG"]
+        
+        # o upload enfileira o pré-processamento: o que já terminou é servido do cache
+        # e o que ainda roda aparece como progresso na página
+        job = precompute.current(source_path)
+        stats = aggregates.cached_stats(source_path)
+        plots = {}
+        if export_png or (stats is None and job is None):
+            # sem job (ex: servidor reiniciado) ou exportação de PNGs: calcula na requisição
+            df = load_csv(source_path)
+            stats = aggregates.get_stats(df, source_path)
+            if export_png:
+                plots = generate_visualizations(df, precompute.PLOTS_DIR, source_path=source_path)
+            else:
+                # o df já está em memória: aquece o cache dos agregados para as chamadas do navegador
+                aggregates.get_histograms(df, source_path)
+                aggregates.get_correlation(df, source_path)
+                aggregates.get_city_counts(df, source_path)
+                if not os.path.exists(precompute.map_path(source_path)):
+                    generate_map(df, precompute.map_dir(source_path))
+        if "mapa_vendas" not in plots and os.path.exists(precompute.map_path(source_path)):
+            plots["mapa_vendas"] = precompute.map_path(source_path)
         
         plot_urls = {}
         for key, path in plots.items():
             clean_path = path.replace('static/', '').replace('static\\', '').replace('\\', '/')
             plot_urls[key] = f"/static/{clean_path}"
-            print(f"DEBUG - Plot {key}: {path} -> {plot_urls[key]}")
+            logger.debug("Plot %s: %s -> %s", key, path, plot_urls[key])
         
-        print(f"DEBUG - Final plot_urls: {plot_urls}")
+        logger.debug("Final plot_urls: %s", plot_urls)
         
+        running = job is not None and job["status"] in (jobs.PENDING, jobs.RUNNING)
+        map_url = "/" + precompute.map_path(source_path).replace('\\', '/')
+        # as estatísticas por coluna vêm de /api/stats, página a página
         return render_template('analysis.html', 
-                             stats=stats, 
+                             has_stats=stats is not None, 
                              plots=plot_urls,
-                             filename=os.path.basename(last_uploaded_file),
-                             shape=df.shape)
+                             filename=os.path.basename(source_path),
+                             shape=stats["shape"] if stats else None,
+                             client_charts=not export_png,
+                             job=job if running else None,
+                             map_url=map_url)
     except Exception as e:
         flash(f"Erro ao analisar dados: {str(e)}")
         return redirect(url_for('upload_file'))
@@ -75,20 +128,23 @@ def results_page():
     
     system_info = {
         'last_file': os.path.basename(last_uploaded_file) if last_uploaded_file else None,
-        'plots_generated': len([f for f in os.listdir('static/plots') if f.endswith('.png') or f.endswith('.html')]) if os.path.exists('static/plots') else 0,
+        'plots_generated': 0,
         'has_data': last_uploaded_file and os.path.exists(last_uploaded_file)
     }
+    if system_info['has_data']:
+        system_info['plots_generated'] = aggregates.count_cached_charts(last_uploaded_file)
     
     analysis_data = None
     if system_info['has_data']:
         try:
-            df = load_csv(last_uploaded_file)
-            stats = get_basic_stats(df)
+            # estatísticas do pré-processamento do upload (o df só é carregado se faltarem)
+            stats = aggregates.get_stats(source_path=last_uploaded_file)
+            schema = sniff_schema(last_uploaded_file)
             analysis_data = {
                 'filename': os.path.basename(last_uploaded_file),
-                'shape': df.shape,
-                'columns': df.columns.tolist(),
-                'numeric_columns': df.select_dtypes(include='number').columns.tolist(),
+                'shape': stats['shape'],
+                'columns': stats['columns'],
+                'numeric_columns': schema['numeric_columns'],
                 'stats_count': len(stats) if stats else 0
             }
         except Exception as e:
@@ -103,13 +159,33 @@ def api_info():
     return jsonify({
         "message": "API de Análise de Dados com Flask e Machine Learning",
         "endpoints": {
-            "/upload": "POST - envia um arquivo CSV para análise",
+            "/upload": "POST - envia um arquivo (CSV, CSV gzip/zstd, Parquet ou Feather) para análise (mode=append acumula em um dataset)",
+            "/upload/chunked": "POST - inicia um upload em partes retomável (filename, size, mode, dataset)",
+            "/upload/chunked/<upload_id>": "PUT ?offset=N - envia um chunk (X-Chunk-SHA256); GET - offset confirmado; DELETE - cancela",
+            "/upload/chunked/<upload_id>/complete": "POST - monta o arquivo e o processa como o /upload",
             "/analyze": "GET - exibe estatísticas e gráficos do último arquivo enviado",
-            "/train": "POST - treina um modelo de ML",
+            "/train": "POST - treina um modelo de ML (memory_profile=true registra a memória por etapa)",
             "/train/both": "POST - treina modelos de regressão e classificação",
             "/models": "GET - lista todos os modelos treinados",
-            "/models/<model_id>": "GET - obtém informações de um modelo específico",
-            "/columns": "GET - lista as colunas do último arquivo enviado"
+            "/models/<model_id>": "GET - obtém informações de um modelo específico; DELETE - remove o modelo",
+            "/models/<model_id>/pin": "POST - fixa o modelo (nunca removido pela retenção); DELETE - desafixa",
+            "/models/memory": "GET - pico de memória por etapa dos treinos com memory_profile (?model_type=)",
+            "/models/retention": "GET - uso do diretório de modelos e o que a compactação removeria",
+            "/models/retention/compact": "POST - aplica a retenção agora (?dry_run=1 só simula)",
+            "/predict/cache": "GET - taxa de acerto do cache de predições por modelo (DELETE limpa)",
+            "/columns": "GET - lista as colunas do último arquivo enviado",
+            "/metrics": "GET - métricas de latência e etapas no formato Prometheus",
+            "/api/aggregates/histograms": "GET - histogramas pré-calculados das colunas numéricas",
+            "/api/aggregates/correlation": "GET - matriz de correlação (?columns=a,b,c para um subconjunto)",
+            "/api/aggregates/correlation/top-pairs": "GET - pares de colunas com correlação mais forte (?k=20)",
+            "/api/aggregates/city-counts": "GET - quantidade de registros por cidade",
+            "/api/datasets/<name>": "GET - linhas, lotes e estatísticas de um dataset acumulado (modo append)",
+            "/api/jobs": "GET - jobs em segundo plano (pré-processamento do upload, importância) e o status de cada etapa",
+            "/api/jobs/<job_id>": "GET - status e progresso de um job",
+            "/api/jobs/current": "GET - pré-processamento do arquivo atual",
+            "/api/training/cores": "GET - núcleos do escalonador de treinos: em uso, livres e ajustes na fila",
+            "/api/stats": "GET - estatísticas por coluna, paginadas (?offset=0&limit=50&q=trecho&columns=a,b)",
+            "/api/profile": "GET - perfil aproximado das colunas: distintos, valores mais frequentes e quantis"
         }
     })
 
@@ -117,8 +193,6 @@ last_uploaded_file = None
 
 @app.route("/upload", methods=["GET", "POST"])
 def upload_file():
-    global last_uploaded_file
-    
     if request.method == "GET":
         return render_template('upload.html')
     
@@ -134,13 +208,236 @@ def upload_file():
 
     try:
         filepath = save_file(file, app.config["UPLOAD_FOLDER"])
-        last_uploaded_file = filepath
-        flash("Arquivo enviado com sucesso! Pronto para análise.")
+        result = _register_upload(filepath, request.form.get("mode"), request.form.get("dataset"))
+        _start_precompute(result)
+        flash(result["message"])
         return redirect(url_for('dashboard'))
     except Exception as e:
         flash(f"Erro ao enviar arquivo: {str(e)}")
         return redirect(url_for('upload_file'))
 
+# torna o arquivo recebido (upload simples ou em partes) o dataset atual
+def _register_upload(filepath, mode, dataset):
+    global last_uploaded_file
+    
+    # modo append: o arquivo é somado ao dataset acumulado, sem repetir linhas já enviadas
+    if mode == "append":
+        result = dataset_store.append_csv(app.config["UPLOAD_FOLDER"], filepath, name=dataset or None)
+        last_uploaded_file = result["manifest"]
+        result["message"] = (
+            f"{result['added']} linhas adicionadas ao dataset '{result['dataset']}' "
+            f"({result['duplicates']} duplicadas ignoradas, total {result['total_rows']})."
+        )
+        return result
+    
+    last_uploaded_file = filepath
+    return {"file": os.path.basename(filepath), "message": "Arquivo enviado com sucesso! Pronto para análise."}
+
+def _start_precompute(result):
+    # limpeza, esquema, estatísticas, gráficos e mapa em segundo plano: o redirect não espera
+    job = precompute.start(last_uploaded_file, export_png=app.config["PLOT_EXPORT_PNG"])
+    result["job_id"] = job["job_id"]
+    return result
+
+def _chunked_error(e):
+    if isinstance(e, FileNotFoundError):
+        return jsonify({"error": str(e)}), 404
+    if isinstance(e, chunked_upload.OffsetMismatch):
+        # o cliente retoma a partir do offset confirmado
+        return jsonify({"error": str(e), "offset": e.offset}), 409
+    return jsonify({"error": str(e)}), 400
+
+@app.route("/upload/chunked", methods=["POST"])
+def chunked_upload_create():
+    data = request.get_json(silent=True) or {}
+    chunk_size = min(
+        app.config["CHUNKED_UPLOAD_CHUNK_MB"] * 1024 * 1024, app.config["MAX_CONTENT_LENGTH"]
+    )
+    try:
+        status = chunked_upload.create(
+            app.config["UPLOAD_FOLDER"],
+            data.get("filename"),
+            data.get("size"),
+            chunk_size=chunk_size,
+            max_size=app.config["CHUNKED_UPLOAD_MAX_MB"] * 1024 * 1024,
+            mode=data.get("mode") or "replace",
+            dataset=data.get("dataset"),
+            ttl_seconds=app.config["CHUNKED_UPLOAD_TTL_HOURS"] * 3600,
+        )
+        return jsonify(status), 201
+    except (FileNotFoundError, ValueError) as e:
+        return _chunked_error(e)
+
+@app.route("/upload/chunked/<upload_id>", methods=["GET", "PUT", "DELETE"])
+def chunked_upload_chunk(upload_id):
+    folder = app.config["UPLOAD_FOLDER"]
+    try:
+        if request.method == "GET":
+            return jsonify(chunked_upload.status(folder, upload_id))
+        
+        if request.method == "DELETE":
+            chunked_upload.abort(folder, upload_id)
+            return jsonify({"message": "Upload cancelado"})
+        
+        if request.content_length is None:
+            return jsonify({"error": "Content-Length obrigatório"}), 411
+        offset = request.args.get("offset", request.headers.get("Upload-Offset"))
+        if offset is None:
+            return jsonify({"error": "Informe o offset do chunk"}), 400
+        
+        # request.stream: o corpo vai do socket para o disco sem passar por request.files
+        status = chunked_upload.write_chunk(
+            folder, upload_id, offset, request.stream, request.content_length,
+            checksum=request.headers.get("X-Chunk-SHA256")
+        )
+        return jsonify(status)
+    except (FileNotFoundError, ValueError) as e:
+        return _chunked_error(e)
+
+@app.route("/upload/chunked/<upload_id>/complete", methods=["POST"])
+def chunked_upload_complete(upload_id):
+    data = request.get_json(silent=True) or {}
+    try:
+        upload = chunked_upload.complete(app.config["UPLOAD_FOLDER"], upload_id, checksum=data.get("sha256"))
+    except (FileNotFoundError, ValueError) as e:
+        return _chunked_error(e)
+    
+    try:
+        result = _start_precompute(_register_upload(upload["filepath"], upload["mode"], upload["dataset"]))
+        # a página de upload redireciona para o dashboard, que exibe a mensagem
+        flash(result["message"])
+        return jsonify(result)
+    except Exception as e:
+        return jsonify({"error": f"Erro ao processar arquivo: {e}"}), 400
+
+def _aggregate_response(name, compute):
+    global last_uploaded_file
+    if not last_uploaded_file or not os.path.exists(last_uploaded_file):
+        return jsonify({"error": "Nenhum arquivo CSV disponível"}), 400
+    
+    try:
+        # ETag pela impressão digital do dataset (e parâmetros da consulta):
+        # o navegador reaproveita o JSON até um novo upload
+        etag = f"{dataset_fingerprint(last_uploaded_file)}-{name}"
+        if request.query_string:
+            etag += "-" + hashlib.sha1(request.query_string).hexdigest()[:12]
+        if request.if_none_match.contains(etag):
+            return Response(status=304, headers={"ETag": f'"{etag}"'})
+        
+        response = jsonify(compute(source_path=last_uploaded_file))
+        response.set_etag(etag)
+        return response
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route("/api/aggregates/histograms", methods=["GET"])
+def aggregate_histograms():
+    return _aggregate_response("histograms", lambda source_path: {
+        "columns": aggregates.get_histograms(source_path=source_path)
+    })
+
+
+@app.route("/api/aggregates/correlation", methods=["GET"])
+def aggregate_correlation():
+    columns = [c.strip() for c in request.args.get("columns", "").split(",") if c.strip()]
+    if len(columns) > app.config["MAX_CORRELATION_COLUMNS"]:
+        return jsonify({"error": f"Máximo de {app.config['MAX_CORRELATION_COLUMNS']} colunas por consulta"}), 400
+    return _aggregate_response("correlation", lambda source_path: aggregates.get_correlation(
+        source_path=source_path, columns=columns or None
+    ))
+
+
+@app.route("/api/aggregates/correlation/top-pairs", methods=["GET"])
+def aggregate_top_correlations():
+    k = request.args.get("k", 20, type=int)
+    absolute = request.args.get("absolute", "true").lower() != "false"
+    return _aggregate_response("top-pairs", lambda source_path: aggregates.get_top_correlations(
+        source_path=source_path, k=max(1, min(k, 1000)), absolute=absolute
+    ))
+
+
+@app.route("/api/aggregates/city-counts", methods=["GET"])
+def aggregate_city_counts():
+    return _aggregate_response("city-counts", aggregates.get_city_counts)
+
+
+@app.route("/api/stats", methods=["GET"])
+def dataset_stats():
+    # Estatísticas paginadas por coluna: a página de análise busca só as colunas visíveis
+    columns = [c.strip() for c in request.args.get("columns", "").split(",") if c.strip()]
+    offset = request.args.get("offset", 0, type=int)
+    limit = request.args.get("limit", app.config["STATS_PAGE_SIZE"], type=int)
+    limit = max(1, min(limit, app.config["MAX_STATS_PAGE_SIZE"]))
+    return _aggregate_response("stats", lambda source_path: aggregates.stats_page(
+        aggregates.get_stats(source_path=source_path), columns=columns or None,
+        q=request.args.get("q", "").strip() or None, offset=offset, limit=limit
+    ))
+
+
+@app.route("/api/profile", methods=["GET"])
+def dataset_profile():
+    # Perfil aproximado (distintos, top-k, quantis) calculado em uma varredura e salvo em cache
+    columns = [c.strip() for c in request.args.get("columns", "").split(",") if c.strip()]
+    return _aggregate_response("profile", lambda source_path: profiling.get_profile(
+        source_path, columns=columns or None
+    ))
+
+
+@app.route("/api/jobs", methods=["GET"])
+def list_jobs():
+    limit = request.args.get("limit", 20, type=int)
+    return jsonify({"jobs": jobs.list_jobs(kind=request.args.get("kind") or None, limit=max(1, min(limit, 100)))})
+
+
+@app.route("/api/jobs/current", methods=["GET"])
+def current_job():
+    # pré-processamento do arquivo atual (o que as páginas acompanham)
+    if not last_uploaded_file or not os.path.exists(last_uploaded_file):
+        return jsonify({"error": "Nenhum arquivo CSV disponível"}), 400
+    job = precompute.current(last_uploaded_file)
+    if job is None:
+        return jsonify({"error": "Nenhum job para o arquivo atual"}), 404
+    return jsonify(job)
+
+
+@app.route("/api/jobs/<job_id>", methods=["GET"])
+def job_status(job_id):
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job não encontrado"}), 404
+    return jsonify(job)
+
+
+@app.route("/api/training/cores", methods=["GET"])
+def training_cores():
+    return jsonify(scheduler.status())
+
+
+@app.route("/api/datasets/<name>", methods=["GET"])
+def dataset_info(name):
+    path = dataset_store.manifest_path(app.config["UPLOAD_FOLDER"], name)
+    if not os.path.exists(path):
+        return jsonify({"error": f"Dataset '{name}' não encontrado"}), 404
+    
+    manifest = dataset_store.load_manifest(path)
+    return jsonify({
+        "name": manifest["name"],
+        "rows": manifest["rows"],
+        "columns": manifest["columns"],
+        "parts": len(manifest["parts"]),
+        "batches": manifest["batches"],
+        "stats": dataset_store.summary_stats(manifest)
+    })
+
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    return Response(instrumentation.render_prometheus(), mimetype="text/plain; version=0.0.4")
+
+
 @app.route("/download/<path:filename>")
 def download_plot(filename):
     filepath = os.path.join("static", "plots", filename)
@@ -156,16 +453,8 @@ def get_columns():
         return jsonify({"error": "Nenhum arquivo CSV disponível"}), 400
     
     try:
-        df = load_csv(last_uploaded_file)
-        numeric_cols = df.select_dtypes(include=['int64', 'float64']).columns.tolist()
-        categorical_cols = df.select_dtypes(include=['object', 'bool', 'category']).columns.tolist()
-        
-        return jsonify({
-            "columns": list(df.columns),
-            "numeric_columns": numeric_cols,
-            "categorical_columns": categorical_cols,
-            "shape": df.shape
-        })
+        # só cabeçalho + amostra: não lê nem limpa o arquivo inteiro
+        return jsonify(sniff_schema(last_uploaded_file))
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -185,6 +474,9 @@ def train():
         params = data.get("params")
         test_size = data.get("test_size", 0.2)
         random_state = data.get("random_state", 42)
+        sample_first = data.get("sample_first")
+        cv_folds = data.get("cv_folds")
+        importance = data.get("importance")
         
         if not target_col:
             return jsonify({"error": "target_col é obrigatório"}), 400
@@ -194,7 +486,9 @@ def train():
             "random_forest_reg": "rf",
             "linear_regression": "linreg",
             "logistic_regression": "logreg",
-            "knn": "knn"
+            "knn": "knn",
+            "hist_gradient_boosting": "hgb",
+            "gradient_boosting": "hgb"
         }
         algorithm = algorithm_map.get(algorithm, algorithm)
         
@@ -205,7 +499,11 @@ def train():
             algorithm=algorithm,
             params=params,
             test_size=test_size,
-            random_state=random_state
+            random_state=random_state,
+            sample_first=sample_first,
+            cv_folds=cv_folds,
+            importance=importance,
+            memory_profile=bool(data.get("memory_profile", Config.MEMORY_PROFILE))
         )
         
         return jsonify({
@@ -233,6 +531,8 @@ def train_both():
         clf_params = data.get("clf_params")
         test_size = data.get("test_size", 0.2)
         random_state = data.get("random_state", 42)
+        sample_first = data.get("sample_first")
+        importance = data.get("importance")
         
         if not target_reg or not target_clf:
             return jsonify({"error": "target_reg e target_clf são obrigatórios"}), 400
@@ -246,7 +546,10 @@ def train_both():
             reg_params=reg_params,
             clf_params=clf_params,
             test_size=test_size,
-            random_state=random_state
+            random_state=random_state,
+            sample_first=sample_first,
+            importance=importance,
+            memory_profile=bool(data.get("memory_profile", Config.MEMORY_PROFILE))
         )
         
         return jsonify({
@@ -269,10 +572,21 @@ def get_models():
         return jsonify({"error": str(e)}), 500
 
 
+@app.route("/models/memory", methods=["GET"])
+def models_memory():
+    try:
+        return jsonify(memory_summary(model_type=request.args.get("model_type") or None))
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
 @app.route("/models/<model_id>", methods=["GET"])
 def get_model(model_id):
     try:
-        model, metadata, label_encoder = load_model(model_id)
+        # só os metadados (com a importância já calculada): o estimador não é desserializado
+        metadata = load_metadata(model_id)
+        model_path = metadata.get("model_path", metadata.get("regression", {}).get("model_path"))
+        has_model = bool(model_path) and os.path.exists(model_path)
         metadata.pop("model_path", None)
         if "regression" in metadata:
             metadata["regression"].pop("model_path", None)
@@ -283,85 +597,50 @@ def get_model(model_id):
         return jsonify({
             "model_id": model_id,
             "metadata": metadata,
-            "has_model": True
+            "has_model": has_model
         })
     except Exception as e:
         return jsonify({"error": str(e)}), 404
 
 
-@app.route("/predict", methods=["POST"])
-def predict():
+
+@app.route("/models/<model_id>", methods=["DELETE"])
+def remove_model(model_id):
     try:
-        data = request.get_json()
-        
-        if not data:
-            return jsonify({"error": "Dados não fornecidos"}), 400
-        
-        model_id = data.get("model_id")
-        model_type = data.get("model_type")
-        features = data.get("features")
-        
-        if not model_id:
-            return jsonify({"error": "model_id é obrigatório"}), 400
-        
-        if not features:
-            return jsonify({"error": "features é obrigatório"}), 400
-        
-        if not model_type:
-            return jsonify({"error": "model_type é obrigatório"}), 400
-        
-        from services.model_training import predict_with_model
-        result = predict_with_model(model_id, features, model_type=model_type)
-        
-        return jsonify(result)
-        
+        freed = delete_model(model_id)
+        return jsonify({"message": f"Modelo {model_id} removido", "bytes_freed": freed})
     except FileNotFoundError as e:
         return jsonify({"error": str(e)}), 404
     except Exception as e:
-        return jsonify({"error": f"Erro ao fazer predição: {str(e)}"}), 500
+        return jsonify({"error": str(e)}), 500
 
 
-@app.route("/models/<model_id>/features", methods=["GET"])
-def get_model_features(model_id):
+@app.route("/models/<model_id>/pin", methods=["POST", "DELETE"])
+def pin_model(model_id):
     try:
-        model, metadata, label_encoder = load_model(model_id)
-        
-        model_type = metadata.get("model_type")
-        
-        if model_type is None:
-            model_type_param = request.args.get("model_type")
-            if not model_type_param:
-                return jsonify({
-                    "error": "model_type é obrigatório para modelos com ambos os tipos"
-                }), 400
-            model_type = model_type_param
-        
-        if "regression" in metadata and "classification" in metadata:
-            if model_type == "regression":
-                numeric_features = metadata.get("regression", {}).get("numeric_features", [])
-                categorical_features = metadata.get("regression", {}).get("categorical_features", [])
-            else:
-                numeric_features = metadata.get("classification", {}).get("numeric_features", [])
-                categorical_features = metadata.get("classification", {}).get("categorical_features", [])
-        else:
-            numeric_features = metadata.get("numeric_features", [])
-            categorical_features = metadata.get("categorical_features", [])
-        
-        all_features = numeric_features + categorical_features
-        
-        return jsonify({
-            "model_id": model_id,
-            "model_type": model_type,
-            "numeric_features": numeric_features,
-            "categorical_features": categorical_features,
-            "all_features": all_features
-        })
-        
+        metadata = set_pinned(model_id, pinned=request.method == "POST")
+        return jsonify({"model_id": model_id, "pinned": metadata["pinned"]})
     except FileNotFoundError as e:
         return jsonify({"error": str(e)}), 404
     except Exception as e:
-        return jsonify({"error": f"Erro ao obter features: {str(e)}"}), 500
+        return jsonify({"error": str(e)}), 500
 
 
+@app.route("/models/retention", methods=["GET"])
+def models_retention():
+    try:
+        return jsonify({**model_retention.usage(), "plan": model_retention.compact(dry_run=True)})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route("/models/retention/compact", methods=["POST"])
+def models_compact():
+    dry_run = request.args.get("dry_run", "").lower() in ("1", "true", "yes")
+    try:
+        return jsonify(model_retention.compact(dry_run=dry_run))
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 if __name__ == "__main__":
     app.run(debug=True, port=5000, host='0.0.0.0')
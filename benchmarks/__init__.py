@@ -0,0 +1 @@
+# Suíte de benchmarks offline (dados sintéticos de e-commerce + medições por etapa)
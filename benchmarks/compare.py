@@ -0,0 +1,73 @@
+import sys
+import json
+import argparse
+
+
+def load_report(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compare(baseline, current, threshold=0.10, metric="median_s"):
+    """
+    Compara dois relatórios de benchmark etapa a etapa.
+
+    Uma etapa é marcada como regressão quando o tempo atual supera o baseline
+    em mais de `threshold` (proporção, ex: 0.10 = 10%).
+
+    Returns:
+        Lista de dicionários com stage, baseline, current, change e status.
+    """
+    rows = []
+    base_results = baseline.get("results", {})
+    curr_results = current.get("results", {})
+
+    for stage in sorted(set(base_results) | set(curr_results)):
+        base = base_results.get(stage, {}).get(metric)
+        curr = curr_results.get(stage, {}).get(metric)
+
+        if base is None or curr is None:
+            rows.append({"stage": stage, "baseline": base, "current": curr, "change": None, "status": "missing"})
+            continue
+
+        change = (curr - base) / base if base > 0 else 0.0
+        if change > threshold:
+            status = "regression"
+        elif change < -threshold:
+            status = "improvement"
+        else:
+            status = "ok"
+        rows.append({"stage": stage, "baseline": base, "current": curr, "change": change, "status": status})
+
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compara resultados de benchmark com um baseline salvo.")
+    parser.add_argument("baseline", help="JSON de baseline")
+    parser.add_argument("current", help="JSON da execução atual")
+    parser.add_argument("--threshold", type=float, default=0.10, help="tolerância de regressão (0.10 = 10%%)")
+    parser.add_argument("--metric", default="median_s", choices=["min_s", "median_s", "mean_s", "max_s", "p95_s", "p99_s"])
+    parser.add_argument("--json", action="store_true", help="imprime o resultado em JSON")
+    args = parser.parse_args(argv)
+
+    rows = compare(load_report(args.baseline), load_report(args.current), args.threshold, args.metric)
+
+    if args.json:
+        print(json.dumps(rows, indent=4))
+    else:
+        for row in rows:
+            if row["change"] is None:
+                print(f"{row['stage']:<28} {'-':>10} {'-':>10} {'':>8}  {row['status']}")
+                continue
+            print(
+                f"{row['stage']:<28} {row['baseline']:>9.4f}s {row['current']:>9.4f}s "
+                f"{row['change'] * 100:>+7.1f}%  {row['status']}"
+            )
+
+    # Código de saída != 0 permite usar o comando em CI
+    return 1 if any(r["status"] == "regression" for r in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,458 @@
+import os
+import sys
+import csv
+import json
+import math
+import time
+import random
+import shutil
+import socket
+import argparse
+import platform
+import tempfile
+import threading
+import subprocess
+import http.client
+from datetime import datetime
+from pathlib import Path
+from urllib.parse import urlsplit
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from benchmarks.synthetic_data import COLUMNS, ensure_dataset, parse_size
+from benchmarks.run_benchmarks import DEFAULT_PARAMS, REG_TARGET, CLF_TARGET, _git_commit
+
+# Operações disponíveis no mix de carga (peso relativo de cada uma em --mix)
+OPERATIONS = ("predict", "columns", "models", "features")
+DEFAULT_MIX = "predict=8,columns=1,models=1"
+
+# Sobe o app em um diretório de trabalho descartável: uploads, modelos e gráficos
+# não tocam nos do repositório
+_SERVER = r"""
+import os, sys
+from pathlib import Path
+sys.path.insert(0, {root!r})
+os.chdir({work_dir!r})
+from services import model_training
+model_training.MODEL_DIR = Path({work_dir!r}) / "models"
+model_training.MODEL_DIR.mkdir(exist_ok=True)
+import {module} as target
+target.app.config["UPLOAD_FOLDER"] = os.path.join({work_dir!r}, "uploads")
+os.makedirs(target.app.config["UPLOAD_FOLDER"], exist_ok=True)
+from werkzeug.serving import make_server
+server = make_server({host!r}, {port}, target.app, threaded=True)
+print("READY", flush=True)
+server.serve_forever()
+"""
+
+
+def _free_port(host):
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind((host, 0))
+        return s.getsockname()[1]
+
+
+class Client:
+    """Conexão HTTP persistente (uma por thread de carga), reaberta após erro de rede."""
+
+    def __init__(self, base_url, timeout=60):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.timeout = timeout
+        self.conn = None
+
+    def request(self, method, path, body=None, headers=None):
+        if self.conn is None:
+            self.conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        try:
+            self.conn.request(method, path, body=body, headers=headers or {})
+            response = self.conn.getresponse()
+            return response.status, response.read()
+        except (OSError, http.client.HTTPException):
+            self.conn.close()
+            self.conn = None
+            raise
+
+    def json(self, method, path, payload=None):
+        body = json.dumps(payload).encode() if payload is not None else None
+        headers = {"Content-Type": "application/json"} if body is not None else {}
+        status, data = self.request(method, path, body, headers)
+        try:
+            return status, json.loads(data or b"null")
+        except ValueError:
+            return status, None
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+
+
+def start_server(module="app", host="127.0.0.1", port=None, work_dir=None, timeout=60):
+    """
+    Inicia o app em um subprocesso (servidor do werkzeug com threads).
+
+    Returns:
+        Tupla (processo, URL base, arquivo de log)
+    """
+    port = port or _free_port(host)
+    code = _SERVER.format(root=str(ROOT_DIR), work_dir=work_dir, module=module, host=host, port=port)
+    log_path = os.path.join(work_dir, "server.log")
+    log = open(log_path, "w", encoding="utf-8")
+    process = subprocess.Popen([sys.executable, "-c", code], cwd=work_dir, stdout=log, stderr=subprocess.STDOUT)
+    log.close()
+
+    base_url = f"http://{host}:{port}"
+    client = Client(base_url, timeout=5)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"O servidor terminou ao iniciar (veja {log_path})")
+        try:
+            status, _ = client.request("GET", "/api")
+            if status == 200:
+                client.close()
+                return process, base_url, log_path
+        except OSError:
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError(f"O servidor não respondeu em {timeout}s (veja {log_path})")
+
+
+def _multipart(field, filename, content):
+    boundary = f"----loadtest{random.getrandbits(64):016x}"
+    head = (
+        f"--{boundary}\r\nContent-Disposition: form-data; name=\"{field}\"; filename=\"{filename}\"\r\n"
+        f"Content-Type: application/octet-stream\r\n\r\n"
+    ).encode()
+    body = head + content + f"\r\n--{boundary}--\r\n".encode()
+    return body, {"Content-Type": f"multipart/form-data; boundary={boundary}"}
+
+
+def _wait_precompute(client, timeout):
+    # o pré-processamento do upload concorre com a carga: espera terminar antes de medir
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        status, job = client.json("GET", "/api/jobs/current")
+        if status != 200 or job["status"] in ("done", "failed"):
+            return job if status == 200 else None
+        time.sleep(0.2)
+    return None
+
+
+def setup_fixtures(client, csv_path, params=None, timeout=600):
+    """
+    Envia o CSV e treina os modelos usados pela carga (fixados, para a retenção não os remover).
+
+    Returns:
+        Dicionário com os model_id de regressão e classificação e o tempo de cada etapa
+    """
+    params = params or DEFAULT_PARAMS
+    timings = {}
+
+    with open(csv_path, "rb") as f:
+        body, headers = _multipart("file", os.path.basename(csv_path), f.read())
+    start = time.perf_counter()
+    status, _ = client.request("POST", "/upload", body, headers)
+    timings["upload_s"] = time.perf_counter() - start
+    if status >= 400:
+        raise RuntimeError(f"Upload falhou com status {status}")
+    job = _wait_precompute(client, timeout)
+    timings["precompute_s"] = time.perf_counter() - start
+
+    models = {}
+    for model_type, target in (("regression", REG_TARGET), ("classification", CLF_TARGET)):
+        if models:
+            time.sleep(1.1)  # model_id tem resolução de segundos
+        start = time.perf_counter()
+        status, data = client.json("POST", "/train", {
+            "model_type": model_type, "target_col": target, "algorithm": "rf", "params": params,
+        })
+        timings[f"train_{model_type}_s"] = time.perf_counter() - start
+        if status != 200:
+            raise RuntimeError(f"Treino de {model_type} falhou ({status}): {data}")
+        models[model_type] = data["model"]["model_id"]
+        client.json("POST", f"/models/{models[model_type]}/pin")
+
+    # colunas que cada modelo espera em /predict
+    features = {}
+    for model_type, model_id in models.items():
+        status, data = client.json("GET", f"/models/{model_id}/features")
+        if status != 200:
+            raise RuntimeError(f"Features de {model_id} indisponíveis ({status}): {data}")
+        features[model_type] = data["all_features"]
+
+    return {"models": models, "features": features, "precompute_status": job and job["status"], "timings": timings}
+
+
+def feature_rows(csv_path, limit=500):
+    """Linhas completas do CSV com os nomes de coluna normalizados, base dos payloads de /predict."""
+    names = {raw: clean for clean, raw in COLUMNS.items()}
+    rows = []
+    with open(csv_path, "r", encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f):
+            if any(value == "" for value in row.values()):
+                continue
+            row = {names.get(k, k): v for k, v in row.items()}
+            # numéricas como o clean_dataset as deixa (vírgula decimal -> ponto)
+            for col in ("total_amount", "delivery_time_days"):
+                if col in row:
+                    row[col] = float(row[col].replace(",", "."))
+            rows.append(row)
+            if len(rows) >= limit:
+                break
+    if not rows:
+        raise ValueError("Nenhuma linha completa no CSV para montar as predições")
+    return rows
+
+
+def parse_mix(mix):
+    weights = {}
+    for item in mix.split(","):
+        if not item.strip():
+            continue
+        name, _, weight = item.partition("=")
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise ValueError(f"Operação desconhecida no mix: '{name}'. Use {', '.join(OPERATIONS)}")
+        weights[name] = float(weight or 1)
+    if not weights or sum(weights.values()) <= 0:
+        raise ValueError("O mix precisa de pelo menos uma operação com peso positivo")
+    return weights
+
+
+def _operation(name, rng, fixtures, rows, use_cache):
+    models = fixtures["models"]
+    if name == "predict":
+        model_type = rng.choice(("regression", "classification"))
+        row = rng.choice(rows)
+        features = {col: row.get(col) for col in fixtures["features"][model_type]}
+        payload = {"model_id": models[model_type], "model_type": model_type, "features": features}
+        if not use_cache:
+            payload["cache"] = False
+        return "POST", "/predict", payload
+    if name == "columns":
+        return "GET", "/columns", None
+    if name == "models":
+        return "GET", "/models", None
+    model_type = rng.choice(("regression", "classification"))
+    return "GET", f"/models/{models[model_type]}/features", None
+
+
+def _percentile(ordered, q):
+    # nearest-rank: o valor observado que deixa q% das amostras abaixo ou igual
+    if not ordered:
+        return None
+    return ordered[max(0, math.ceil(q * len(ordered)) - 1)]
+
+
+def summarize(samples, elapsed):
+    """
+    Agrega amostras (latência, status) em percentis, erros e vazão.
+    Erro = status >= 400 ou falha de rede (status None).
+    """
+    latencies = sorted(latency for latency, _ in samples)
+    errors = {}
+    for _, status in samples:
+        if status is None or status >= 400:
+            key = str(status or "connection")
+            errors[key] = errors.get(key, 0) + 1
+    n_errors = sum(errors.values())
+    return {
+        "count": len(samples),
+        "errors": n_errors,
+        "error_rate": n_errors / len(samples) if samples else 0.0,
+        "errors_by_status": errors,
+        "throughput_rps": len(samples) / elapsed if elapsed > 0 else None,
+        "min_s": latencies[0] if latencies else None,
+        "median_s": _percentile(latencies, 0.50),
+        "p50_s": _percentile(latencies, 0.50),
+        "p95_s": _percentile(latencies, 0.95),
+        "p99_s": _percentile(latencies, 0.99),
+        "mean_s": sum(latencies) / len(latencies) if latencies else None,
+        "max_s": latencies[-1] if latencies else None,
+    }
+
+
+def _train_loop(base_url, stop, samples, params):
+    client = Client(base_url, timeout=600)
+    targets = [("regression", REG_TARGET), ("classification", CLF_TARGET)]
+    i = 0
+    while not stop.is_set():
+        model_type, target = targets[i % 2]
+        i += 1
+        start = time.perf_counter()
+        try:
+            status, _ = client.json("POST", "/train", {
+                "model_type": model_type, "target_col": target, "algorithm": "rf", "params": params,
+            })
+        except (OSError, http.client.HTTPException):
+            status = None
+        samples.append((time.perf_counter() - start, status))
+    client.close()
+
+
+def run_phase(base_url, fixtures, rows, mix, concurrency=8, duration=10.0, warmup=1.0,
+              use_cache=True, train_concurrency=0, params=None, seed=42):
+    """
+    Carga em malha fechada: `concurrency` threads disparam requisições sorteadas do mix,
+    uma após a outra, por `duration` segundos (o aquecimento não entra nas medições).
+    Com `train_concurrency`, outras threads ficam treinando modelos durante a fase.
+
+    Returns:
+        Resumo por operação, o total ("all") e, se houver, o dos treinos ("train")
+    """
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    samples = {name: [] for name in names}
+    lock = threading.Lock()
+    stop = threading.Event()
+    measuring = threading.Event()
+
+    def worker(index):
+        rng = random.Random(seed + index)
+        client = Client(base_url)
+        local = []
+        while not stop.is_set():
+            name = rng.choices(names, weights)[0]
+            method, path, payload = _operation(name, rng, fixtures, rows, use_cache)
+            start = time.perf_counter()
+            try:
+                status, _ = client.json(method, path, payload)
+            except (OSError, http.client.HTTPException):
+                status = None
+            if measuring.is_set():
+                local.append((name, time.perf_counter() - start, status))
+        client.close()
+        with lock:
+            for name, latency, status in local:
+                samples[name].append((latency, status))
+
+    train_samples = []
+    trainers = [
+        threading.Thread(target=_train_loop, args=(base_url, stop, train_samples, params or DEFAULT_PARAMS), daemon=True)
+        for _ in range(train_concurrency)
+    ]
+    workers = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(concurrency)]
+    for thread in trainers + workers:
+        thread.start()
+
+    time.sleep(warmup)
+    measuring.set()
+    start = time.perf_counter()
+    time.sleep(duration)
+    stop.set()
+    elapsed = time.perf_counter() - start
+    for thread in workers:
+        thread.join()
+    for thread in trainers:
+        thread.join()
+
+    results = {name: summarize(op_samples, elapsed) for name, op_samples in samples.items()}
+    results["all"] = summarize([s for op_samples in samples.values() for s in op_samples], elapsed)
+    if trainers:
+        # treinos em andamento no fim da fase também entram (terminaram no join)
+        results["train"] = summarize(train_samples, time.perf_counter() - start)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Teste de carga HTTP local de /predict, /columns e /models.")
+    parser.add_argument("--size", default="10k", help="10k, 1m, 10m ou número de linhas")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--csv", default=None, help="usa um CSV existente em vez do sintético")
+    parser.add_argument("--data-dir", default=os.path.join("benchmarks", "data"))
+    parser.add_argument("--url", default=None, help="usa um servidor já em execução em vez de subir o app")
+    parser.add_argument("--module", default="app", help="módulo que expõe o Flask app (quando sobe o servidor)")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"pesos por operação ({', '.join(OPERATIONS)})")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=10.0, help="segundos medidos por fase")
+    parser.add_argument("--warmup", type=float, default=1.0, help="segundos de aquecimento por fase")
+    parser.add_argument("--no-cache", action="store_true", help="envia cache=false em /predict")
+    parser.add_argument("--train-concurrency", type=int, default=1,
+                        help="treinos simultâneos na fase 'with_train' (0 pula a fase)")
+    parser.add_argument("--out", default=None, help="arquivo JSON de saída")
+    args = parser.parse_args(argv)
+
+    try:
+        mix = parse_mix(args.mix)
+    except ValueError as e:
+        parser.error(str(e))
+
+    csv_path = args.csv or ensure_dataset(args.data_dir, args.size, args.seed)
+    work_dir = None
+    process = None
+    try:
+        if args.url:
+            base_url = args.url.rstrip("/")
+        else:
+            work_dir = tempfile.mkdtemp(prefix="loadtest_")
+            process, base_url, _ = start_server(args.module, work_dir=work_dir)
+
+        client = Client(base_url, timeout=600)
+        fixtures = setup_fixtures(client, csv_path)
+        client.close()
+        rows = feature_rows(csv_path)
+
+        phase_args = dict(
+            concurrency=args.concurrency, duration=args.duration, warmup=args.warmup,
+            use_cache=not args.no_cache, seed=args.seed,
+        )
+        phases = {"steady": run_phase(base_url, fixtures, rows, mix, **phase_args)}
+        if args.train_concurrency > 0:
+            phases["with_train"] = run_phase(
+                base_url, fixtures, rows, mix, train_concurrency=args.train_concurrency, **phase_args
+            )
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=10)
+        if work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "dataset": os.path.basename(csv_path),
+            "rows": None if args.csv else parse_size(args.size),
+            "server": args.url or f"{args.module} (local)",
+            "mix": mix,
+            "concurrency": args.concurrency,
+            "duration_s": args.duration,
+            "cache": not args.no_cache,
+            "train_concurrency": args.train_concurrency,
+            "fixtures": fixtures,
+        },
+        # chaves "<fase>.<operação>": o compare.py funciona com --metric p95_s/p99_s
+        "results": {
+            f"{phase}.{name}": summary
+            for phase, results in phases.items() for name, summary in results.items()
+        },
+    }
+
+    out = args.out or os.path.join(
+        "benchmarks", "results", f"load_{args.size}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=4, ensure_ascii=False, default=str)
+
+    for key, data in report["results"].items():
+        if not data["count"]:
+            continue
+        print(
+            f"{key:<24} n={data['count']:<6} p50={data['p50_s'] * 1000:8.1f}ms  p95={data['p95_s'] * 1000:8.1f}ms  "
+            f"p99={data['p99_s'] * 1000:8.1f}ms  erros={data['errors']:<4} {data['throughput_rps']:.1f} req/s"
+        )
+    print(f"\nResultados salvos em {out}")
+    return 1 if any(data["errors"] for data in report["results"].values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,246 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+from datetime import datetime
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from benchmarks.synthetic_data import ensure_dataset, parse_size
+
+STAGES = [
+    "load_csv",
+    "load_csv_engines",
+    "get_basic_stats",
+    "generate_visualizations",
+    "train_regression_model",
+    "train_classification_model",
+    "compare_algorithms",
+    "predict_with_model",
+]
+
+# Hiperparâmetros fixos para que as medições sejam comparáveis entre execuções
+DEFAULT_PARAMS = {"n_estimators": 50, "random_state": 42}
+# Boosting por histogramas comparado ao rf (mesmo teto de árvores; a parada antecipada pode usar menos)
+HGB_PARAMS = {"max_iter": 100, "random_state": 42}
+REG_TARGET = "total_amount"
+CLF_TARGET = "customer_type"
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return None
+
+
+def _time(fn, repeats):
+    timings = []
+    result = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return timings, result
+
+
+def _summary(timings, **extra):
+    ordered = sorted(timings)
+    return {
+        "repeats": len(timings),
+        "min_s": ordered[0],
+        "median_s": ordered[len(ordered) // 2],
+        "mean_s": sum(timings) / len(timings),
+        "max_s": ordered[-1],
+        "timings_s": timings,
+        **extra,
+    }
+
+
+def run(csv_path, stages=None, repeats=3, predict_calls=200, params=None, work_dir=None):
+    """
+    Executa os benchmarks de cada etapa sobre o CSV informado.
+
+    Returns:
+        Dicionário com os resultados por etapa (tempos em segundos).
+    """
+    from services import model_training
+    from services.data_loader import load_csv
+    from services.data_analysis import get_basic_stats
+    from services.visualization_service import generate_visualizations
+    from ml.ml_module import train_regression_model, train_classification_model
+
+    stages = stages or STAGES
+    params = dict(DEFAULT_PARAMS if params is None else params)
+    results = {}
+
+    work_dir = Path(work_dir or tempfile.mkdtemp(prefix="bench_"))
+    plots_dir = work_dir / "plots"
+    models_dir = work_dir / "models"
+    models_dir.mkdir(parents=True, exist_ok=True)
+
+    # Modelos do benchmark não devem poluir o MODEL_DIR da aplicação
+    original_model_dir = model_training.MODEL_DIR
+    model_training.MODEL_DIR = models_dir
+
+    try:
+        timings, df = _time(lambda: load_csv(csv_path), repeats)
+        if "load_csv" in stages:
+            results["load_csv"] = _summary(timings, rows=len(df), columns=len(df.columns))
+
+        if "load_csv_engines" in stages:
+            # Leitor atual (pandas, inferência a cada leitura) contra o pyarrow.csv com o esquema
+            # já aprendido; a primeira leitura com o Arrow só grava o esquema e fica de fora
+            timings, df_pandas = _time(lambda: load_csv(csv_path, engine="pandas"), repeats)
+            results["load_csv_pandas"] = _summary(timings)
+            load_csv(csv_path, engine="arrow")
+            timings, df_arrow = _time(lambda: load_csv(csv_path, engine="arrow"), repeats)
+            results["load_csv_arrow"] = _summary(timings, identical=bool(df_pandas.equals(df_arrow)))
+
+        if "get_basic_stats" in stages:
+            timings, _ = _time(lambda: get_basic_stats(df), repeats)
+            results["get_basic_stats"] = _summary(timings)
+
+        if "generate_visualizations" in stages:
+            timings, plots = _time(lambda: generate_visualizations(df.copy(), str(plots_dir)), repeats)
+            results["generate_visualizations"] = _summary(timings, plots=len(plots))
+
+            # Redesenho com os histogramas já em cache ao lado do dataset
+            generate_visualizations(df.copy(), str(plots_dir), source_path=csv_path)
+            timings, _ = _time(
+                lambda: generate_visualizations(df.copy(), str(plots_dir), source_path=csv_path), repeats
+            )
+            results["generate_visualizations_cached"] = _summary(timings)
+
+        if "train_regression_model" in stages:
+            timings, reg = _time(
+                lambda: train_regression_model(df, REG_TARGET, model_type="rf", params=params), repeats
+            )
+            results["train_regression_model"] = _summary(timings, metrics=reg["metrics"])
+
+        if "train_classification_model" in stages:
+            timings, clf = _time(
+                lambda: train_classification_model(df, CLF_TARGET, model_type="rf", params=params), repeats
+            )
+            metrics = {k: v for k, v in clf["metrics"].items() if k != "confusion_matrix"}
+            results["train_classification_model"] = _summary(timings, metrics=metrics)
+
+        if "compare_algorithms" in stages:
+            # rf x hgb: tempo de treino, tamanho do modelo serializado e largura da matriz
+            # pré-processada (o hgb usa códigos ordinais no lugar do one-hot)
+            import joblib
+
+            trainers = {
+                "regression": lambda algorithm, p: train_regression_model(df, REG_TARGET, model_type=algorithm, params=p),
+                "classification": lambda algorithm, p: train_classification_model(df, CLF_TARGET, model_type=algorithm, params=p),
+            }
+            for task, train in trainers.items():
+                for algorithm, algo_params in (("rf", params), ("hgb", HGB_PARAMS)):
+                    timings, trained = _time(lambda: train(algorithm, algo_params), repeats)
+                    model_path = models_dir / f"compare_{task}_{algorithm}.pkl"
+                    joblib.dump(trained["model"], model_path)
+                    metrics = {k: v for k, v in trained["metrics"].items() if k != "confusion_matrix"}
+                    results[f"train_{task}_{algorithm}"] = _summary(
+                        timings,
+                        model_bytes=model_path.stat().st_size,
+                        features_out=len(trained["model"].named_steps["preprocess"].get_feature_names_out()),
+                        boosting=trained.get("boosting"),
+                        metrics=metrics,
+                    )
+
+        if "predict_with_model" in stages:
+            # Um modelo salvo de verdade, para medir também o carregamento do disco
+            info = model_training.train_model(
+                csv_path, model_type="regression", target_col=REG_TARGET, algorithm="rf", params=params,
+                importance="none"
+            )
+            features = df.drop(columns=[REG_TARGET]).iloc[0].to_dict()
+            features = {k: (v.isoformat() if hasattr(v, "isoformat") else v) for k, v in features.items()}
+
+            # Sem o cache de predições: o payload é sempre o mesmo e viraria só acerto de cache
+            timings, _ = _time(
+                lambda: model_training.predict_with_model(
+                    info["model_id"], features, model_type="regression", use_cache=False
+                ),
+                predict_calls,
+            )
+            results["predict_with_model"] = _summary(timings)
+
+            timings, _ = _time(
+                lambda: model_training.predict_with_model(info["model_id"], features, model_type="regression"),
+                predict_calls,
+            )
+            results["predict_with_model_cached"] = _summary(timings)
+    finally:
+        model_training.MODEL_DIR = original_model_dir
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks offline das etapas de dados e ML.")
+    parser.add_argument("--size", default="10k", help="10k, 1m, 10m ou número de linhas")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--csv", default=None, help="usa um CSV existente em vez do sintético")
+    parser.add_argument("--stages", default=",".join(STAGES), help="etapas separadas por vírgula")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--predict-calls", type=int, default=200)
+    parser.add_argument("--data-dir", default=os.path.join("benchmarks", "data"))
+    parser.add_argument("--out", default=None, help="arquivo JSON de saída")
+    args = parser.parse_args(argv)
+
+    stages = [s.strip() for s in args.stages.split(",") if s.strip()]
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        parser.error(f"Etapas desconhecidas: {', '.join(sorted(unknown))}")
+
+    csv_path = args.csv or ensure_dataset(args.data_dir, args.size, args.seed)
+
+    results = run(
+        csv_path,
+        stages=stages,
+        repeats=args.repeats,
+        predict_calls=args.predict_calls,
+    )
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "dataset": os.path.basename(csv_path),
+            "rows": None if args.csv else parse_size(args.size),
+            "seed": args.seed,
+            "params": DEFAULT_PARAMS,
+            "hgb_params": HGB_PARAMS,
+        },
+        "results": results,
+    }
+
+    out = args.out or os.path.join(
+        "benchmarks", "results", f"bench_{args.size}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=4, ensure_ascii=False, default=str)
+
+    for stage, data in results.items():
+        print(f"{stage:<28} min={data['min_s']:.4f}s  median={data['median_s']:.4f}s")
+    print(f"\nResultados salvos em {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+import os
+import sys
+import json
+import argparse
+import subprocess
+from datetime import datetime
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+# Bibliotecas que não devem ser carregadas só por importar o app
+HEAVY_MODULES = ["matplotlib", "seaborn", "folium", "geopy", "sklearn", "ml.ml_module", "joblib", "pandas"]
+
+# Executado em um interpretador novo a cada rodada (cache de import frio)
+_PROBE = r"""
+import sys, time, json
+t0 = time.perf_counter()
+import {module} as target
+t1 = time.perf_counter()
+loaded = [m for m in {heavy!r} if m in sys.modules]
+client = getattr(target, "app").test_client()
+t2 = time.perf_counter()
+response = client.get({path!r})
+t3 = time.perf_counter()
+print(json.dumps({{
+    "import_s": t1 - t0,
+    "first_request_s": t3 - t2,
+    "status": response.status_code,
+    "heavy_loaded": loaded,
+}}))
+"""
+
+
+def probe(module="app", path="/"):
+    code = _PROBE.format(module=module, heavy=HEAVY_MODULES, path=path)
+    output = subprocess.check_output([sys.executable, "-c", code], cwd=ROOT_DIR, stderr=subprocess.DEVNULL)
+    return json.loads(output.decode().strip().splitlines()[-1])
+
+
+def run(module="app", path="/", repeats=5):
+    """
+    Mede o tempo de import do módulo da aplicação e a latência da primeira requisição.
+
+    Returns:
+        Dicionário com as medianas e as medições individuais.
+    """
+    samples = [probe(module, path) for _ in range(repeats)]
+    imports = sorted(s["import_s"] for s in samples)
+    firsts = sorted(s["first_request_s"] for s in samples)
+    return {
+        "module": module,
+        "path": path,
+        "repeats": repeats,
+        "import_median_s": imports[len(imports) // 2],
+        "first_request_median_s": firsts[len(firsts) // 2],
+        "status": samples[-1]["status"],
+        "heavy_loaded": samples[-1]["heavy_loaded"],
+        "samples": samples,
+    }
+
+
+def check_budget(result, import_budget, first_request_budget):
+    failures = []
+    if result["import_median_s"] > import_budget:
+        failures.append(f"import {result['import_median_s']:.3f}s > orçamento {import_budget:.3f}s")
+    if result["first_request_median_s"] > first_request_budget:
+        failures.append(
+            f"primeira requisição {result['first_request_median_s']:.3f}s > orçamento {first_request_budget:.3f}s"
+        )
+    if result["heavy_loaded"]:
+        failures.append(f"bibliotecas pesadas carregadas no import: {', '.join(result['heavy_loaded'])}")
+    if result["status"] >= 500:
+        failures.append(f"primeira requisição retornou {result['status']}")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mede o tempo de inicialização do app e aplica um orçamento.")
+    parser.add_argument("--module", default="app", help="módulo que expõe o Flask app")
+    parser.add_argument("--path", default="/", help="rota usada na primeira requisição")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--import-budget", type=float, default=0.5, help="segundos")
+    parser.add_argument("--first-request-budget", type=float, default=0.25, help="segundos")
+    parser.add_argument("--out", default=None, help="arquivo JSON de saída")
+    args = parser.parse_args(argv)
+
+    result = run(args.module, args.path, args.repeats)
+    failures = check_budget(result, args.import_budget, args.first_request_budget)
+    report = {
+        "meta": {"timestamp": datetime.now().isoformat(), "python": sys.version.split()[0]},
+        "budget": {"import_s": args.import_budget, "first_request_s": args.first_request_budget},
+        "result": result,
+        "failures": failures,
+    }
+
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=4, ensure_ascii=False)
+
+    print(f"import {args.module:<20} {result['import_median_s']:.4f}s")
+    print(f"primeira requisição {args.path:<10} {result['first_request_median_s']:.4f}s")
+    for failure in failures:
+        print(f"FALHA: {failure}")
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,180 @@
+import os
+import argparse
+import numpy as np
+import pandas as pd
+
+# Tamanhos padrão usados pela suíte de benchmarks
+SIZES = {
+    "10k": 10_000,
+    "1m": 1_000_000,
+    "10m": 10_000_000,
+}
+
+CITIES = [
+    "São Paulo", "Rio de Janeiro", "Belo Horizonte", "Curitiba", "Porto Alegre",
+    "Salvador", "Recife", "Fortaleza", "Brasília", "Manaus", "Belém", "Goiânia",
+    "Campinas", "Florianópolis", "Vitória", "Natal", "João Pessoa", "Maceió",
+    "Cuiabá", "Campo Grande",
+]
+CITY_WEIGHTS = np.linspace(3.0, 0.5, len(CITIES))
+CITY_WEIGHTS = CITY_WEIGHTS / CITY_WEIGHTS.sum()
+
+CUSTOMER_TYPES = ["New", "Returning", "Guest"]
+
+# Cabeçalhos "sujos", do jeito que chegam nas exportações (o clean_dataset normaliza)
+COLUMNS = {
+    "city": "City",
+    "order_date": "Order Date",
+    "customer_type": "Customer Type",
+    "total_amount": "Total Amount",
+    "delivery_time_days": "Delivery Time Days",
+}
+
+MISSING_RATE = 0.02
+DUPLICATE_RATE = 0.01
+START_DATE = np.datetime64("2023-01-01")
+N_DAYS = 730
+
+
+def parse_size(size):
+    """
+    Converte '10k', '1m', '10m' (ou um inteiro) em número de linhas.
+    """
+    if isinstance(size, int):
+        return size
+    key = str(size).strip().lower()
+    if key in SIZES:
+        return SIZES[key]
+    try:
+        return int(key.replace("_", ""))
+    except ValueError:
+        raise ValueError(f"Tamanho inválido: '{size}'. Use {', '.join(SIZES)} ou um inteiro.")
+
+
+def _chunk(rng, n_rows):
+    # Cliente recorrente compra mais e recebe mais rápido: dá sinal para os modelos
+    customer_draw = rng.random(n_rows)
+    is_returning = customer_draw < 0.45
+    is_guest = customer_draw > 0.85
+    city_idx = rng.choice(len(CITIES), size=n_rows, p=CITY_WEIGHTS)
+
+    base_amount = rng.gamma(shape=2.0, scale=60.0, size=n_rows)
+    total_amount = np.round(base_amount * np.where(is_returning, 1.35, 1.0) + city_idx * 1.5, 2)
+
+    delivery = rng.poisson(lam=np.where(is_returning, 4.0, 6.0) + (city_idx % 5)).astype(np.int64) + 1
+
+    days = rng.integers(0, N_DAYS, size=n_rows)
+    dates = (START_DATE + days.astype("timedelta64[D]")).astype(str)
+
+    cities = np.array(CITIES, dtype=object)[city_idx]
+    # Espaços extras em parte das cidades (o clean_dataset faz strip)
+    padded = rng.random(n_rows) < 0.05
+    cities[padded] = np.char.add(np.char.add(" ", cities[padded].astype(str)), " ")
+
+    # Valores monetários com vírgula decimal, como nas exportações originais
+    amounts = np.char.replace(np.char.mod("%.2f", total_amount), ".", ",").astype(object)
+
+    df = pd.DataFrame({
+        COLUMNS["city"]: cities,
+        COLUMNS["order_date"]: dates.astype(object),
+        COLUMNS["customer_type"]: np.select(
+            [is_returning, is_guest], CUSTOMER_TYPES[1:], default=CUSTOMER_TYPES[0]
+        ).astype(object),
+        COLUMNS["total_amount"]: amounts,
+        COLUMNS["delivery_time_days"]: pd.array(delivery, dtype="Int64"),
+    })
+
+    # Valores ausentes espalhados. total_amount e customer_type ficam sempre preenchidos:
+    # o clean_dataset preenche texto com 'desconhecido' antes da conversão numérica
+    for col in (COLUMNS["city"], COLUMNS["order_date"], COLUMNS["delivery_time_days"]):
+        mask = rng.random(n_rows) < MISSING_RATE
+        df.loc[mask, col] = None
+
+    # Linhas duplicadas (o clean_dataset remove)
+    n_dup = int(n_rows * DUPLICATE_RATE)
+    if n_dup:
+        src = rng.integers(0, n_rows, size=n_dup)
+        dst = rng.integers(0, n_rows, size=n_dup)
+        df.iloc[dst] = df.iloc[src].to_numpy()
+
+    return df
+
+
+def generate_orders(n_rows, seed=42, chunk_size=1_000_000):
+    """
+    Gera um DataFrame sintético de pedidos no formato "sujo" esperado pelo clean_dataset.
+
+    A geração é determinística: mesma seed e mesmo n_rows produzem exatamente
+    os mesmos dados, independente do chunk_size.
+    """
+    return pd.concat(list(iter_orders(n_rows, seed=seed, chunk_size=chunk_size)), ignore_index=True)
+
+
+def iter_orders(n_rows, seed=42, chunk_size=1_000_000):
+    """
+    Gera os pedidos em blocos, para não manter 10M linhas em memória.
+    """
+    n_rows = parse_size(n_rows)
+    if n_rows <= 0:
+        raise ValueError("n_rows deve ser positivo.")
+
+    # Blocos de tamanho fixo garantem determinismo independente de quem consome
+    block = 100_000
+    n_blocks = (n_rows + block - 1) // block
+    seeds = np.random.SeedSequence(seed).spawn(n_blocks)
+
+    buffer = []
+    buffered = 0
+    for i, child in enumerate(seeds):
+        rows = min(block, n_rows - i * block)
+        buffer.append(_chunk(np.random.default_rng(child), rows))
+        buffered += rows
+        if buffered >= chunk_size:
+            yield pd.concat(buffer, ignore_index=True)
+            buffer, buffered = [], 0
+    if buffer:
+        yield pd.concat(buffer, ignore_index=True)
+
+
+def write_orders_csv(path, n_rows, seed=42, chunk_size=1_000_000):
+    """
+    Escreve o dataset sintético em CSV, em blocos. Retorna o caminho do arquivo.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    header = True
+    for chunk in iter_orders(n_rows, seed=seed, chunk_size=chunk_size):
+        chunk.to_csv(tmp_path, mode="w" if header else "a", header=header, index=False, encoding="utf-8")
+        header = False
+    os.replace(tmp_path, path)
+    return path
+
+
+def dataset_path(data_dir, size, seed=42):
+    return os.path.join(data_dir, f"orders_{size}_seed{seed}.csv")
+
+
+def ensure_dataset(data_dir, size, seed=42):
+    """
+    Reaproveita o CSV já gerado para (size, seed) ou gera um novo.
+    """
+    path = dataset_path(data_dir, size, seed)
+    if not os.path.exists(path):
+        write_orders_csv(path, parse_size(size), seed=seed)
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gera datasets sintéticos de pedidos de e-commerce.")
+    parser.add_argument("--size", default="10k", help="10k, 1m, 10m ou número de linhas")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", default=None, help="caminho do CSV de saída")
+    args = parser.parse_args(argv)
+
+    out = args.out or dataset_path(os.path.join("benchmarks", "data"), args.size, args.seed)
+    write_orders_csv(out, parse_size(args.size), seed=args.seed)
+    print(out)
+
+
+if __name__ == "__main__":
+    main()
@@ -12,4 +12,44 @@ os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 class Config:
     SECRET_KEY = os.getenv("SECRET_KEY", "secret-key")
     UPLOAD_FOLDER = UPLOAD_FOLDER
-    MAX_CONTENT_LENGTH = 50 * 1024 * 1024  # 50MB
+    # Tamanho máximo do upload (Parquet/CSV comprimido cabem em bem menos bytes que o CSV)
+    MAX_UPLOAD_MB = int(os.getenv("MAX_UPLOAD_MB", "50"))
+    MAX_CONTENT_LENGTH = MAX_UPLOAD_MB * 1024 * 1024
+    # Upload em partes (/upload/chunked) para arquivos acima do limite acima: cada chunk é
+    # uma requisição própria (e por isso também limitado por MAX_CONTENT_LENGTH)
+    CHUNKED_UPLOAD_MAX_MB = int(os.getenv("CHUNKED_UPLOAD_MAX_MB", "10240"))
+    CHUNKED_UPLOAD_CHUNK_MB = int(os.getenv("CHUNKED_UPLOAD_CHUNK_MB", "8"))
+    # Uploads em partes sem chunk novo há mais que isso são descartados
+    CHUNKED_UPLOAD_TTL_HOURS = float(os.getenv("CHUNKED_UPLOAD_TTL_HOURS", "24"))
+    # DEBUG reativa os dumps de diagnóstico (df.info(), head(), URLs dos gráficos)
+    LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+    # Os gráficos são desenhados no navegador a partir de /api/aggregates/*.
+    # PNGs no servidor só com ?export=png na página de análise ou com esta opção ligada
+    PLOT_EXPORT_PNG = os.getenv("PLOT_EXPORT_PNG", "false").lower() in ("1", "true", "yes")
+    # Leitor de CSV: "arrow" (multithread, com esquema aprendido na primeira leitura) ou "pandas"
+    CSV_ENGINE = os.getenv("CSV_ENGINE", "arrow").lower()
+    # Threads do pool de jobs em segundo plano (pré-processamento do upload, importância)
+    JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+    # Perfil de memória (tracemalloc) por etapa em todo treino; sem isso, só com
+    # "memory_profile": true no corpo do /train. Deixa o treino mais lento
+    MEMORY_PROFILE = os.getenv("MEMORY_PROFILE", "false").lower() in ("1", "true", "yes")
+    # Núcleos que os treinos podem usar juntos (0 = todos os do processo). O escalonador
+    # divide esses núcleos entre os ajustes em andamento (n_jobs e threads de BLAS/OpenMP)
+    TRAINING_CORES = int(os.getenv("TRAINING_CORES", "0"))
+    # Retenção do diretório de modelos: os N mais recentes de cada alvo (0 desliga),
+    # um teto em MB para o diretório (0 desliga) e a carência para arquivos sem metadados
+    MODEL_KEEP_LAST = int(os.getenv("MODEL_KEEP_LAST", "5"))
+    MODEL_DIR_MAX_MB = int(os.getenv("MODEL_DIR_MAX_MB", "2048"))
+    MODEL_ORPHAN_GRACE_SECONDS = float(os.getenv("MODEL_ORPHAN_GRACE_SECONDS", "600"))
+    # Limite de colunas por consulta de submatriz de correlação
+    MAX_CORRELATION_COLUMNS = int(os.getenv("MAX_CORRELATION_COLUMNS", "100"))
+    # Colunas por página em /api/stats (estatísticas da página de análise)
+    STATS_PAGE_SIZE = int(os.getenv("STATS_PAGE_SIZE", "50"))
+    MAX_STATS_PAGE_SIZE = int(os.getenv("MAX_STATS_PAGE_SIZE", "200"))
+    # Cache de resultados do /predict por modelo (PREDICTION_CACHE_SIZE=0 desliga)
+    PREDICTION_CACHE_SIZE = int(os.getenv("PREDICTION_CACHE_SIZE", "1000"))
+    PREDICTION_CACHE_TTL = float(os.getenv("PREDICTION_CACHE_TTL", "300"))
+    # Modo de serving (serving.py): modelos pré-carregados antes do fork dos workers.
+    # Se SERVING_PRELOAD_MODEL_IDS estiver vazio, usa os N mais recentes de list_models
+    SERVING_PRELOAD_LATEST = int(os.getenv("SERVING_PRELOAD_LATEST", "5"))
+    SERVING_PRELOAD_MODEL_IDS = [m.strip() for m in os.getenv("SERVING_PRELOAD_MODEL_IDS", "").split(",") if m.strip()]
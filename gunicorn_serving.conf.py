@@ -0,0 +1,10 @@
+import os
+import multiprocessing
+
+# Uso: gunicorn -c gunicorn_serving.conf.py serving:app
+bind = os.getenv("SERVING_BIND", "0.0.0.0:8000")
+workers = int(os.getenv("SERVING_WORKERS", multiprocessing.cpu_count()))
+
+# Carrega o app (e os modelos pré-carregados) no master antes do fork,
+# para que todos os workers compartilhem a mesma memória
+preload_app = True
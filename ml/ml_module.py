@@ -3,24 +3,28 @@ from typing import Optional, Dict, Any, List, Tuple, Union
 
 from sklearn.model_selection import train_test_split
 from sklearn.compose import ColumnTransformer
-from sklearn.preprocessing import OneHotEncoder, StandardScaler, LabelEncoder
+from sklearn.preprocessing import OneHotEncoder, OrdinalEncoder, StandardScaler, LabelEncoder
 from sklearn.pipeline import Pipeline
 
 from sklearn.linear_model import LinearRegression, LogisticRegression
-from sklearn.ensemble import RandomForestRegressor, RandomForestClassifier
+from sklearn.ensemble import (
+    RandomForestRegressor,
+    RandomForestClassifier,
+    HistGradientBoostingRegressor,
+    HistGradientBoostingClassifier
+)
 from sklearn.neighbors import KNeighborsClassifier
 
 from sklearn.metrics import (
     r2_score,
     mean_absolute_error,
     mean_squared_error,
-    accuracy_score,
-    precision_score,
-    recall_score,
-    f1_score,
-    confusion_matrix
+    accuracy_score
 )
 
+from utils.instrumentation import span
+from utils import scheduler
+
 # Opcional: para salvar/carregar modelos, se o pessoal do backend quiser
 # import joblib
 
@@ -106,11 +110,41 @@ def _validate_model_params(params: Optional[Dict[str, Any]], model_class) -> Dic
     return filtered_params
 
 
-def build_preprocessor(X: pd.DataFrame) -> Tuple[ColumnTransformer, List[str], List[str]]:
+# Modelos que tratam categóricas nativamente: recebem códigos ordinais em vez do one-hot denso
+NATIVE_CATEGORICAL_MODELS = ("hgb",)
+# O HistGradientBoosting aceita no máximo max_bins (255) categorias por coluna;
+# as menos frequentes além disso viram uma categoria só
+MAX_NATIVE_CATEGORIES = 255
+
+
+def _native_categorical_encoder():
+    """
+    Codificador ordinal para modelos com suporte nativo a categóricas. Valores ausentes
+    e categorias desconhecidas viram NaN, que o modelo trata como "ausente".
+    """
+    import numpy as np
+
+    return OrdinalEncoder(
+        handle_unknown="use_encoded_value",
+        unknown_value=np.nan,
+        encoded_missing_value=np.nan,
+        max_categories=MAX_NATIVE_CATEGORIES,
+        dtype=np.float64
+    )
+
+
+def build_preprocessor(
+    X: pd.DataFrame,
+    native_categorical: bool = False
+) -> Tuple[ColumnTransformer, List[str], List[str]]:
     """
     Cria o pré-processador com:
     - StandardScaler para variáveis numéricas
     - OneHotEncoder para variáveis categóricas
+
+    Com native_categorical=True (modelos em NATIVE_CATEGORICAL_MODELS), as numéricas passam
+    sem escala e as categóricas viram uma coluna de códigos ordinais cada, no lugar do
+    one-hot denso. A saída continua com as numéricas primeiro e as categóricas depois.
     
     Raises:
         ValueError: Se não houver features numéricas ou categóricas.
@@ -127,16 +161,437 @@ def build_preprocessor(X: pd.DataFrame) -> Tuple[ColumnTransformer, List[str], L
         )
     
     transformers = []
-    if numeric_features:
-        transformers.append(("num", StandardScaler(), numeric_features))
-    if categorical_features:
-        transformers.append(("cat", OneHotEncoder(handle_unknown="ignore", sparse_output=False), categorical_features))
+    if native_categorical:
+        if numeric_features:
+            transformers.append(("num", "passthrough", numeric_features))
+        if categorical_features:
+            transformers.append(("cat", _native_categorical_encoder(), categorical_features))
+    else:
+        if numeric_features:
+            transformers.append(("num", StandardScaler(), numeric_features))
+        if categorical_features:
+            transformers.append(("cat", OneHotEncoder(handle_unknown="ignore", sparse_output=False), categorical_features))
     
     preprocessor = ColumnTransformer(transformers=transformers, remainder="drop")
 
     return preprocessor, numeric_features, categorical_features
 
 
+def _set_native_categoricals(estimator, num_cols: List[str], cat_cols: List[str]) -> None:
+    """
+    Aponta para o modelo quais colunas da saída do pré-processador são categóricas
+    (as últimas, na ordem de build_preprocessor).
+    """
+    if cat_cols:
+        estimator.set_params(categorical_features=[False] * len(num_cols) + [True] * len(cat_cols))
+
+
+def boosting_summary(estimator) -> Optional[Dict[str, Any]]:
+    """
+    Iterações usadas por um modelo de boosting treinado e se a parada antecipada interrompeu
+    o treino antes de max_iter. None para os demais modelos.
+    """
+    # n_iter_ sozinho não basta: a LogisticRegression também o tem
+    if not hasattr(estimator, "do_early_stopping_"):
+        return None
+    max_iter = estimator.get_params()["max_iter"]
+    return {
+        "n_iter": int(estimator.n_iter_),
+        "max_iter": int(max_iter),
+        "early_stopping": bool(estimator.do_early_stopping_),
+        "stopped_early": int(estimator.n_iter_) < int(max_iter)
+    }
+
+
+def _fit_pipeline(model: Pipeline, X_train, y_train) -> Pipeline:
+    """
+    Treina o Pipeline medindo separadamente o pré-processamento e o ajuste do modelo.
+    
+    Equivale a model.fit(X_train, y_train), mas registra as etapas
+    'preprocess' e 'fit' na instrumentação.
+    """
+    with span("preprocess"):
+        X_train_t = model.named_steps["preprocess"].fit_transform(X_train, y_train)
+    estimator = model.named_steps["model"]
+    # o pré-processamento é single-thread; só o ajuste ocupa a cota de núcleos
+    with scheduler.fit_slot(estimator), span("fit"):
+        estimator.fit(X_train_t, y_train)
+    return model
+
+
+SAMPLE_FIRST_DEFAULTS = {
+    "initial_size": 10_000,   # tamanho da primeira amostra
+    "growth": 2.0,            # fator de crescimento entre amostras
+    "min_gain": 0.002,        # ganho marginal mínimo na métrica para continuar
+    "max_eval_size": 200_000, # limite de linhas do teste usadas em cada ponto da curva
+    "full_fit": False         # se True, treina no split completo ao final
+}
+
+
+def _resolve_sample_first(sample_first) -> Optional[Dict[str, Any]]:
+    """
+    Normaliza a opção sample_first (None/False, True ou dicionário de opções).
+    """
+    if not sample_first:
+        return None
+    if sample_first is True:
+        return dict(SAMPLE_FIRST_DEFAULTS)
+    if not isinstance(sample_first, dict):
+        raise TypeError(f"sample_first deve ser bool ou dicionário, recebido {type(sample_first).__name__}")
+    
+    unknown = set(sample_first) - set(SAMPLE_FIRST_DEFAULTS)
+    if unknown:
+        raise ValueError(
+            f"Opções de sample_first inválidas: {', '.join(sorted(unknown))}. "
+            f"Opções válidas: {', '.join(SAMPLE_FIRST_DEFAULTS)}"
+        )
+    options = {**SAMPLE_FIRST_DEFAULTS, **sample_first}
+    if options["initial_size"] < 10:
+        raise ValueError("sample_first.initial_size deve ser pelo menos 10")
+    if options["growth"] <= 1:
+        raise ValueError("sample_first.growth deve ser maior que 1")
+    return options
+
+
+def _sample_first_fit(
+    model: Pipeline,
+    X_train,
+    y_train,
+    X_test,
+    y_test,
+    score_fn,
+    options: Dict[str, Any],
+    stratify: bool = False,
+    random_state: int = 42
+):
+    """
+    Treina em amostras crescentes do conjunto de treino, medindo a métrica de teste
+    em cada tamanho, e para quando o ganho marginal fica abaixo de min_gain.
+    
+    Returns:
+        Tupla (modelo treinado, informações da curva de aprendizado, nº de amostras usadas)
+    """
+    import time
+    import numpy as np
+    from sklearn.base import clone
+
+    n_train = len(X_train)
+    rng = np.random.RandomState(random_state)
+
+    # Subconjunto fixo do teste para os pontos da curva (as métricas finais usam o teste inteiro)
+    if len(X_test) > options["max_eval_size"]:
+        eval_idx = rng.choice(len(X_test), size=options["max_eval_size"], replace=False)
+        X_eval = X_test.iloc[eval_idx]
+        y_eval = np.asarray(y_test)[eval_idx]
+    else:
+        X_eval, y_eval = X_test, y_test
+
+    sizes = []
+    size = int(options["initial_size"])
+    while size < n_train:
+        sizes.append(size)
+        size = int(size * options["growth"])
+    sizes.append(n_train)
+
+    curve = []
+    best_model = None
+    best_size = None
+    previous_score = None
+    stopped_early = False
+
+    for size in sizes:
+        if size < n_train:
+            stratify_y = y_train if stratify else None
+            try:
+                X_sample, _, y_sample, _ = train_test_split(
+                    X_train, y_train, train_size=size, random_state=random_state, stratify=stratify_y
+                )
+            except ValueError:
+                # Classes raras demais para estratificar nesse tamanho
+                X_sample, _, y_sample, _ = train_test_split(
+                    X_train, y_train, train_size=size, random_state=random_state
+                )
+        else:
+            X_sample, y_sample = X_train, y_train
+
+        candidate = clone(model)
+        start = time.perf_counter()
+        _fit_pipeline(candidate, X_sample, y_sample)
+        fit_time = time.perf_counter() - start
+
+        with span("evaluate"):
+            score = float(score_fn(y_eval, candidate.predict(X_eval)))
+
+        curve.append({"n_samples": int(size), "score": score, "fit_time_s": fit_time})
+
+        if previous_score is not None and score - previous_score < options["min_gain"]:
+            stopped_early = size < n_train
+            # Se a métrica piorou, fica com a amostra anterior (menor e melhor)
+            if score >= previous_score:
+                best_model, best_size = candidate, size
+            break
+        best_model, best_size = candidate, size
+        previous_score = score
+
+    # Treino final opcional no split completo
+    if options["full_fit"] and best_size < n_train:
+        _fit_pipeline(model, X_train, y_train)
+        best_model, best_size = model, n_train
+
+    info = {
+        "metric": getattr(score_fn, "__name__", "score"),
+        "points": curve,
+        "stopped_early": stopped_early,
+        "n_samples_used": int(best_size),
+        "full_fit": bool(options["full_fit"]),
+        "options": options
+    }
+    return best_model, info, best_size
+
+
+def _validate_cv_folds(cv_folds, n_samples: int) -> Optional[int]:
+    """
+    Normaliza a opção cv_folds (None/0 desliga a validação cruzada).
+    """
+    if not cv_folds:
+        return None
+    if isinstance(cv_folds, bool) or not isinstance(cv_folds, int):
+        raise TypeError(f"cv_folds deve ser um inteiro, recebido {type(cv_folds).__name__}")
+    if cv_folds < 2:
+        raise ValueError(f"cv_folds deve ser pelo menos 2, recebido {cv_folds}")
+    if cv_folds > n_samples:
+        raise ValueError(f"cv_folds ({cv_folds}) maior que o número de amostras ({n_samples})")
+    return cv_folds
+
+
+def _cv_design_matrix(X: pd.DataFrame, num_cols: List[str], cat_cols: List[str], native_categorical: bool = False):
+    """
+    Monta uma única vez a matriz numérica usada por todos os folds: colunas numéricas
+    seguidas do one-hot das categóricas (mesma ordem do ColumnTransformer).
+
+    O vocabulário do one-hot vem do dataset inteiro; categorias ausentes do treino de um
+    fold viram colunas zeradas, o mesmo efeito do handle_unknown="ignore" do pipeline.
+    A padronização das numéricas continua sendo ajustada dentro de cada fold.
+    Com native_categorical=True, as categóricas entram como códigos ordinais.
+    """
+    import numpy as np
+
+    blocks = []
+    if num_cols:
+        blocks.append(X[num_cols].to_numpy(dtype=np.float64))
+    if cat_cols:
+        if native_categorical:
+            encoder = _native_categorical_encoder()
+        else:
+            encoder = OneHotEncoder(handle_unknown="ignore", sparse_output=False, dtype=np.float64)
+        blocks.append(encoder.fit_transform(X[cat_cols]))
+    return np.hstack(blocks)
+
+
+def _cv_fold(estimator, X, y, train_idx, test_idx, n_numeric: int, task: str, fold: int):
+    """
+    Treina e avalia um fold. Roda em um processo separado, com X e y memory-mapped.
+    """
+    import time
+    from sklearn.base import clone
+
+    steps = []
+    if n_numeric:
+        scaler = ColumnTransformer(
+            transformers=[("num", StandardScaler(), list(range(n_numeric)))], remainder="passthrough"
+        )
+        steps.append(("preprocess", scaler))
+    steps.append(("model", clone(estimator)))
+    model = Pipeline(steps=steps)
+
+    start = time.perf_counter()
+    model.fit(X[train_idx], y[train_idx])
+    fit_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    y_pred = model.predict(X[test_idx])
+    if task == "regression":
+        metrics = regression_metrics(y[test_idx], y_pred)
+    else:
+        metrics = classification_metrics(y[test_idx], y_pred)
+        metrics.pop("confusion_matrix", None)
+        metrics.pop("average_used", None)
+    score_time = time.perf_counter() - start
+
+    return {
+        "fold": fold,
+        "n_train": int(len(train_idx)),
+        "n_test": int(len(test_idx)),
+        "metrics": {name: float(value) for name, value in metrics.items()},
+        "fit_time_s": fit_time,
+        "score_time_s": score_time
+    }
+
+
+def _cross_validate(
+    estimator,
+    X: pd.DataFrame,
+    y,
+    num_cols: List[str],
+    cat_cols: List[str],
+    cv_folds: int,
+    task: str,
+    random_state: int = 42,
+    n_jobs: Optional[int] = None,
+    native_categorical: bool = False
+) -> Dict[str, Any]:
+    """
+    Validação cruzada k-fold com os folds rodando em paralelo.
+
+    A matriz pré-processada é gravada uma vez em disco e aberta com mmap_mode='r':
+    os workers leem as mesmas páginas em vez de receber cópias dos dados.
+    Na classificação os folds são estratificados (StratifiedKFold).
+
+    Returns:
+        Dicionário com métricas e tempos por fold e média/desvio de cada métrica
+    """
+    import os
+    import time
+    import shutil
+    import tempfile
+    import numpy as np
+    import joblib
+    from joblib import Parallel, delayed
+    from sklearn.model_selection import KFold, StratifiedKFold
+
+    start = time.perf_counter()
+    with span("cv"):
+        design = _cv_design_matrix(X, num_cols, cat_cols, native_categorical)
+        y_array = np.asarray(y)
+
+        splitter = None
+        if task == "classification":
+            _, class_counts = np.unique(y_array, return_counts=True)
+            if class_counts.min() >= cv_folds:
+                splitter = StratifiedKFold(n_splits=cv_folds, shuffle=True, random_state=random_state)
+            else:
+                import warnings
+                warnings.warn(
+                    f"Classe com menos de {cv_folds} amostras: usando KFold sem estratificação.",
+                    UserWarning
+                )
+        if splitter is None:
+            splitter = KFold(n_splits=cv_folds, shuffle=True, random_state=random_state)
+        folds = list(splitter.split(design, y_array))
+
+        tmp_dir = tempfile.mkdtemp(prefix="cv_")
+        try:
+            data_path = os.path.join(tmp_dir, "cv_data.joblib")
+            joblib.dump((design, y_array), data_path)
+            del design
+            X_mmap, y_mmap = joblib.load(data_path, mmap_mode="r")
+
+            # um processo por fold, até a cota de núcleos concedida pelo escalonador
+            with scheduler.allocate(n_jobs or cv_folds, label="cv") as n_jobs:
+                fold_results = Parallel(n_jobs=n_jobs)(
+                    delayed(_cv_fold)(estimator, X_mmap, y_mmap, train_idx, test_idx, len(num_cols), task, i)
+                    for i, (train_idx, test_idx) in enumerate(folds)
+                )
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    summary = {}
+    for name in fold_results[0]["metrics"]:
+        values = np.array([fold["metrics"][name] for fold in fold_results])
+        summary[name] = {"mean": float(values.mean()), "std": float(values.std())}
+
+    return {
+        "n_folds": cv_folds,
+        "stratified": isinstance(splitter, StratifiedKFold),
+        "n_jobs": n_jobs,
+        "folds": fold_results,
+        "summary": summary,
+        "total_time_s": time.perf_counter() - start
+    }
+
+
+PERMUTATION_DEFAULTS = {
+    "n_repeats": 5,         # embaralhamentos por feature
+    "max_samples": 10_000   # limite de linhas do teste usadas no cálculo
+}
+
+
+def _permutation_score(model: Pipeline, X: pd.DataFrame, y, column: str, seed, score_fn) -> float:
+    """
+    Embaralha uma coluna e mede a métrica do modelo. Roda em um worker separado.
+    """
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    X_permuted = X.copy()
+    X_permuted[column] = X_permuted[column].to_numpy()[rng.permutation(len(X_permuted))]
+    return float(score_fn(y, model.predict(X_permuted)))
+
+
+def permutation_feature_importance(
+    model: Pipeline,
+    X_test: pd.DataFrame,
+    y_test,
+    features: List[str],
+    task: str,
+    n_repeats: int = PERMUTATION_DEFAULTS["n_repeats"],
+    max_samples: int = PERMUTATION_DEFAULTS["max_samples"],
+    random_state: int = 42,
+    n_jobs: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Importância por permutação das colunas originais (antes do one-hot): queda da métrica
+    (R² na regressão, acurácia na classificação) quando a coluna é embaralhada.
+
+    Cada par (feature, repetição) é uma tarefa independente, distribuída entre os núcleos.
+
+    Returns:
+        Dicionário com a métrica de referência e média/desvio da queda por feature
+        (ordenado da mais para a menos importante)
+    """
+    import os
+    import time
+    import numpy as np
+    from joblib import Parallel, delayed
+
+    start = time.perf_counter()
+    score_fn = r2_score if task == "regression" else accuracy_score
+    y_test = np.asarray(y_test)
+
+    if len(X_test) > max_samples:
+        rng = np.random.default_rng(random_state)
+        idx = np.sort(rng.choice(len(X_test), size=max_samples, replace=False))
+        X_test, y_test = X_test.iloc[idx], y_test[idx]
+
+    baseline = float(score_fn(y_test, model.predict(X_test)))
+
+    tasks = [(feature, repeat) for feature in features for repeat in range(n_repeats)]
+    seeds = np.random.SeedSequence(random_state).spawn(len(tasks))
+    with scheduler.allocate(n_jobs or len(tasks), label="importance") as n_jobs:
+        scores = Parallel(n_jobs=n_jobs)(
+            delayed(_permutation_score)(model, X_test, y_test, feature, seed, score_fn)
+            for (feature, _), seed in zip(tasks, seeds)
+        )
+
+    drops = np.array(scores).reshape(len(features), n_repeats)
+    drops = baseline - drops
+    importances = [
+        {"feature": feature, "importance_mean": float(row.mean()), "importance_std": float(row.std())}
+        for feature, row in zip(features, drops)
+    ]
+    importances.sort(key=lambda item: item["importance_mean"], reverse=True)
+
+    return {
+        "metric": score_fn.__name__,
+        "baseline_score": baseline,
+        "n_repeats": n_repeats,
+        "n_samples": int(len(X_test)),
+        "n_jobs": n_jobs,
+        "features": importances,
+        "computed_in_s": time.perf_counter() - start
+    }
+
+
 def regression_metrics(y_true, y_pred):
     """
     Calcula métricas de regressão:
@@ -156,43 +611,189 @@ def regression_metrics(y_true, y_pred):
     }
 
 
-def classification_metrics(y_true, y_pred, labels=None):
+def _label_indices(values, labels):
     """
-    Calcula métricas de classificação:
+    Posição de cada valor em `labels` (que pode estar fora de ordem, ex: LabelEncoder
+    invertido pelo positive_label); -1 para valores fora de `labels`.
+    """
+    import numpy as np
+
+    values = np.asarray(values)
+    order = np.argsort(labels, kind="stable")
+    sorted_labels = labels[order]
+    pos = np.clip(np.searchsorted(sorted_labels, values), 0, len(labels) - 1)
+    found = sorted_labels[pos] == values
+    return np.where(found, order[pos], -1)
+
+
+def classification_metrics(y_true, y_pred, labels=None, pos_label=None):
+    """
+    Calcula métricas de classificação a partir de uma única matriz de confusão:
     - Accuracy
     - Precision
     - Recall
     - F1
     - Matriz de confusão
     
-    Detecta automaticamente se é classificação binária ou multiclasse.
+    Detecta automaticamente se é classificação binária ou multiclasse. Na binária, a classe
+    positiva é `pos_label` (padrão: labels[1], a classe codificada como 1 no treino).
     """
-    acc = accuracy_score(y_true, y_pred)
-    
-    # Detecta número de classes únicas
-    n_classes = len(set(y_true) | set(y_pred))
+    import numpy as np
+
+    y_true = np.asarray(y_true)
+    y_pred = np.asarray(y_pred)
+    if labels is None:
+        labels = np.unique(np.concatenate([y_true, y_pred]))
+    labels = np.asarray(labels)
+    k = len(labels)
+
+    # Uma passada: cada par (real, previsto) vira uma célula da matriz
+    true_idx = _label_indices(y_true, labels)
+    pred_idx = _label_indices(y_pred, labels)
+    valid = (true_idx >= 0) & (pred_idx >= 0)
+    cm = np.bincount(true_idx[valid] * k + pred_idx[valid], minlength=k * k).reshape(k, k)
+
+    tp = np.diag(cm).astype(np.float64)
+    predicted = cm.sum(axis=0)
+    support = cm.sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        precision = np.where(predicted > 0, tp / predicted, 0.0)
+        recall = np.where(support > 0, tp / support, 0.0)
+        f1_denominator = predicted + support
+        f1 = np.where(f1_denominator > 0, 2 * tp / f1_denominator, 0.0)
+
+    n_samples = cm.sum()
+    acc = tp.sum() / n_samples if n_samples else 0.0
     
-    # Para classificação binária, usa average="binary"
+    # Para classificação binária, usa average="binary" (métricas da classe positiva)
     # Para multiclasse, usa average="weighted" (melhor para classes desbalanceadas)
-    if n_classes == 2:
+    if k == 2:
         average = "binary"
+        pos_label = labels[1] if pos_label is None else pos_label
+        pos_index = int(_label_indices([pos_label], labels)[0])
+        if pos_index < 0:
+            raise ValueError(f"pos_label '{pos_label}' não está entre as classes {labels.tolist()}")
+        prec, rec, f1_score_ = precision[pos_index], recall[pos_index], f1[pos_index]
     else:
         average = "weighted"
-    
-    prec = precision_score(y_true, y_pred, average=average, zero_division=0)
-    rec = recall_score(y_true, y_pred, average=average, zero_division=0)
-    f1 = f1_score(y_true, y_pred, average=average, zero_division=0)
-    cm = confusion_matrix(y_true, y_pred, labels=labels)
-
-    return {
-        "accuracy": acc,
-        "precision": prec,
-        "recall": rec,
-        "f1": f1,
+        pos_label = None
+        weights = support / support.sum() if support.sum() else np.zeros(k)
+        prec, rec, f1_score_ = (float(np.dot(weights, values)) for values in (precision, recall, f1))
+
+    metrics = {
+        "accuracy": float(acc),
+        "precision": float(prec),
+        "recall": float(rec),
+        "f1": float(f1_score_),
         "confusion_matrix": cm.tolist(),  # para poder virar JSON no backend
-        "n_classes": n_classes,
+        # classes vistas no teste ou nas previsões
+        "n_classes": int(np.count_nonzero(predicted + support)),
         "average_used": average
     }
+    if pos_label is not None:
+        metrics["pos_label"] = pos_label.item() if hasattr(pos_label, "item") else pos_label
+    return metrics
+
+
+CURVE_POINTS = 101  # pontos guardados por curva ROC/PR (os extremos sempre ficam)
+
+
+def _downsample_curve(curve: Dict[str, Any], max_points: int) -> Dict[str, Any]:
+    import numpy as np
+
+    n = len(curve["thresholds"])
+    if n <= max_points:
+        keep = np.arange(n)
+    else:
+        keep = np.unique(np.linspace(0, n - 1, max_points).round().astype(int))
+    return {name: np.round(values[keep], 6).tolist() for name, values in curve.items()}
+
+
+def _binary_curves(is_positive, scores, max_points: int = CURVE_POINTS) -> Dict[str, Any]:
+    """
+    ROC e precisão-revocação de uma classe por ordenação: as amostras são ordenadas pelo
+    score uma vez e as somas acumuladas dão VP/FP em cada limiar distinto.
+    """
+    import numpy as np
+
+    order = np.argsort(-scores, kind="mergesort")
+    scores = scores[order]
+    is_positive = is_positive[order]
+
+    # último índice de cada limiar distinto
+    ends = np.r_[np.flatnonzero(np.diff(scores)), len(scores) - 1]
+    tps = np.cumsum(is_positive)[ends].astype(np.float64)
+    fps = (ends + 1) - tps
+    positives, negatives = tps[-1], fps[-1]
+    if positives == 0 or negatives == 0:
+        return None  # curva indefinida com uma classe só no teste
+
+    # ROC começa em (0, 0); a precisão em revocação 0 é 1 por convenção
+    tpr = np.r_[0.0, tps / positives]
+    fpr = np.r_[0.0, fps / negatives]
+    precision = np.r_[1.0, tps / (tps + fps)]
+    thresholds = np.r_[np.inf, scores[ends]]
+
+    auc = float(np.sum(np.diff(fpr) * (tpr[1:] + tpr[:-1]) / 2))
+    # precisão média: soma de P(k) * ΔR(k), como o average_precision_score
+    average_precision = float(np.sum(np.diff(tpr) * precision[1:]))
+
+    curve = {"thresholds": np.where(np.isinf(thresholds), 1.0 + scores[0], thresholds),
+             "fpr": fpr, "tpr": tpr, "precision": precision}
+    return {
+        "roc_auc": auc,
+        "average_precision": average_precision,
+        "n_thresholds": int(len(ends)),
+        **_downsample_curve(curve, max_points),
+    }
+
+
+def classification_curves(y_true_encoded, proba, classes, max_points: int = CURVE_POINTS) -> Optional[Dict[str, Any]]:
+    """
+    Curvas ROC/PR a partir das probabilidades do teste: na binária, da classe positiva
+    (codificada como 1); na multiclasse, uma por classe (um-contra-todos) mais as médias macro.
+    As curvas guardam no máximo `max_points` pontos (recall = tpr).
+    """
+    import numpy as np
+
+    if proba is None:
+        return None
+    y_true_encoded = np.asarray(y_true_encoded)
+    classes = list(classes)
+
+    if proba.shape[1] == 2:
+        curve = _binary_curves(y_true_encoded == 1, proba[:, 1], max_points)
+        return curve and {"type": "binary", "pos_label": classes[1], **curve}
+
+    per_class = {}
+    for index, label in enumerate(classes):
+        curve = _binary_curves(y_true_encoded == index, proba[:, index], max_points)
+        if curve is not None:
+            per_class[str(label)] = curve
+    if not per_class:
+        return None
+    return {
+        "type": "one_vs_rest",
+        "macro_roc_auc": float(np.mean([c["roc_auc"] for c in per_class.values()])),
+        "macro_average_precision": float(np.mean([c["average_precision"] for c in per_class.values()])),
+        "classes": per_class,
+    }
+
+
+def _predict_with_proba(model: Pipeline, X: pd.DataFrame):
+    """
+    Previsões e probabilidades com um único pré-processamento de X. Com predict_proba, a
+    classe prevista é a de maior probabilidade (o mesmo que o predict dos classificadores
+    suportados); sem ele, usa o predict e devolve proba=None.
+    """
+    import numpy as np
+
+    X_t = model.named_steps["preprocess"].transform(X)
+    estimator = model.named_steps["model"]
+    if hasattr(estimator, "predict_proba"):
+        proba = estimator.predict_proba(X_t)
+        return estimator.classes_[np.argmax(proba, axis=1)], proba
+    return estimator.predict(X_t), None
 
 
 # ================================
@@ -204,7 +805,7 @@ def get_regressor(model_type: str, params: Optional[Dict[str, Any]] = None):
     Retorna o regressor de acordo com o tipo escolhido.
     
     Args:
-        model_type: 'linreg' ou 'rf'
+        model_type: 'linreg', 'rf' ou 'hgb'
         params: dicionário opcional com hiperparâmetros do modelo
     
     Returns:
@@ -222,10 +823,16 @@ def get_regressor(model_type: str, params: Optional[Dict[str, Any]] = None):
     elif model_type == "rf":
         validated_params = _validate_model_params(params, RandomForestRegressor)
         model = RandomForestRegressor(**validated_params)
+    elif model_type == "hgb":
+        validated_params = _validate_model_params(params, HistGradientBoostingRegressor)
+        # Parada antecipada por padrão (10% do treino como validação interna)
+        if "early_stopping" not in validated_params:
+            validated_params["early_stopping"] = True
+        model = HistGradientBoostingRegressor(**validated_params)
     else:
         raise ValueError(
             f"Tipo de regressor não suportado: '{model_type}'. "
-            f"Tipos suportados: 'linreg', 'rf'"
+            f"Tipos suportados: 'linreg', 'rf', 'hgb'"
         )
 
     return model
@@ -237,7 +844,9 @@ def train_regression_model(
     model_type: str = "rf",
     params: Optional[Dict[str, Any]] = None,
     test_size: float = 0.2,
-    random_state: int = 42
+    random_state: int = 42,
+    sample_first: Optional[Union[bool, Dict[str, Any]]] = None,
+    cv_folds: Optional[int] = None
 ):
     """
     Treina um modelo de regressão para prever o valor da compra (ou outro alvo contínuo).
@@ -245,10 +854,14 @@ def train_regression_model(
     Args:
         df: DataFrame com os dados de treinamento
         target_col: nome da coluna alvo (ex: 'total_amount')
-        model_type: 'linreg' ou 'rf'
+        model_type: 'linreg', 'rf' ou 'hgb'
         params: dicionário opcional com hiperparâmetros (ex: {'n_estimators': 200, 'max_depth': 10})
         test_size: proporção do dataset para teste (entre 0 e 1)
         random_state: seed para reprodutibilidade
+        sample_first: opcional, True ou dicionário (ver SAMPLE_FIRST_DEFAULTS) para treinar em
+                      amostras crescentes e parar quando a métrica (R²) estabilizar
+        cv_folds: opcional, número de folds da validação cruzada (paralela) feita além
+                  do split treino/teste
     
     Returns:
         Dicionário com modelo treinado, métricas e informações sobre features
@@ -260,6 +873,7 @@ def train_regression_model(
     _validate_dataframe(df, "treinamento de modelo de regressão")
     _validate_target_column(df, target_col)
     _validate_test_size(test_size)
+    cv_folds = _validate_cv_folds(cv_folds, len(df))
     
     # Verifica se há colunas suficientes após remover o target
     if len(df.columns) < 2:
@@ -288,11 +902,14 @@ def train_regression_model(
                 f"Remova ou preencha esses valores antes do treinamento."
             )
 
-        # Pré-processador
-        preprocessor, num_cols, cat_cols = build_preprocessor(X)
+        # Pré-processador (códigos ordinais no lugar do one-hot para modelos com categóricas nativas)
+        native_categorical = model_type in NATIVE_CATEGORICAL_MODELS
+        preprocessor, num_cols, cat_cols = build_preprocessor(X, native_categorical=native_categorical)
 
         # Modelo
         regressor = get_regressor(model_type, params)
+        if native_categorical:
+            _set_native_categoricals(regressor, num_cols, cat_cols)
 
         # Pipeline completo
         model = Pipeline(steps=[
@@ -305,12 +922,30 @@ def train_regression_model(
             X, y, test_size=test_size, random_state=random_state
         )
 
-        # Treino
-        model.fit(X_train, y_train)
+        # Treino (completo ou por amostras crescentes)
+        learning_curve = None
+        n_used = len(X_train)
+        sample_options = _resolve_sample_first(sample_first)
+        if sample_options:
+            model, learning_curve, n_used = _sample_first_fit(
+                model, X_train, y_train, X_test, y_test, r2_score,
+                sample_options, stratify=False, random_state=random_state
+            )
+        else:
+            _fit_pipeline(model, X_train, y_train)
 
         # Avaliação
-        y_pred = model.predict(X_test)
-        metrics = regression_metrics(y_test, y_pred)
+        with span("evaluate"):
+            y_pred = model.predict(X_test)
+            metrics = regression_metrics(y_test, y_pred)
+
+        # Validação cruzada opcional sobre o dataset inteiro
+        cross_validation = None
+        if cv_folds:
+            cross_validation = _cross_validate(
+                model.named_steps["model"], X, y, num_cols, cat_cols, cv_folds,
+                task="regression", random_state=random_state, native_categorical=native_categorical
+            )
 
         # Retorna algumas predições de exemplo para visualização (primeiras 20)
         sample_size = min(20, len(y_test))
@@ -325,10 +960,16 @@ def train_regression_model(
             "numeric_features": num_cols,
             "categorical_features": cat_cols,
             "metrics": metrics,
-            "n_samples_train": len(X_train),
+            "n_samples_train": n_used,
             "n_samples_test": len(X_test),
             "y_test_sample": y_test_sample,
-            "y_pred_sample": y_pred_sample
+            "y_pred_sample": y_pred_sample,
+            "learning_curve": learning_curve,
+            "cross_validation": cross_validation,
+            "boosting": boosting_summary(model.named_steps["model"]),
+            # conjunto de teste, para cálculos posteriores (ex: importância por permutação)
+            "X_test": X_test,
+            "y_test": y_test
         }
 
         return result
@@ -386,7 +1027,7 @@ def get_classifier(model_type: str, params: Optional[Dict[str, Any]] = None):
     Retorna o classificador de acordo com o tipo escolhido.
     
     Args:
-        model_type: 'logreg', 'rf' ou 'knn'
+        model_type: 'logreg', 'rf', 'knn' ou 'hgb'
         params: dicionário opcional com hiperparâmetros do modelo
     
     Returns:
@@ -413,10 +1054,17 @@ def get_classifier(model_type: str, params: Optional[Dict[str, Any]] = None):
         validated_params = _validate_model_params(params, KNeighborsClassifier)
         model = KNeighborsClassifier(**validated_params)
 
+    elif model_type == "hgb":
+        validated_params = _validate_model_params(params, HistGradientBoostingClassifier)
+        # Parada antecipada por padrão (10% do treino como validação interna)
+        if "early_stopping" not in validated_params:
+            validated_params["early_stopping"] = True
+        model = HistGradientBoostingClassifier(**validated_params)
+
     else:
         raise ValueError(
             f"Tipo de classificador não suportado: '{model_type}'. "
-            f"Tipos suportados: 'logreg', 'rf', 'knn'"
+            f"Tipos suportados: 'logreg', 'rf', 'knn', 'hgb'"
         )
 
     return model
@@ -429,7 +1077,9 @@ def train_classification_model(
     model_type: str = "rf",
     params: Optional[Dict[str, Any]] = None,
     test_size: float = 0.2,
-    random_state: int = 42
+    random_state: int = 42,
+    sample_first: Optional[Union[bool, Dict[str, Any]]] = None,
+    cv_folds: Optional[int] = None
 ):
     """
     Treina um modelo de classificação binária (ex: cliente recorrente vs novo).
@@ -439,10 +1089,14 @@ def train_classification_model(
         target_col: nome da coluna alvo (ex: 'customer_type')
         positive_label: opcional, rótulo que você considera como "1" (ex: 'Returning').
                         Se None, o LabelEncoder vai tratar automaticamente.
-        model_type: 'logreg', 'rf' ou 'knn'
+        model_type: 'logreg', 'rf', 'knn' ou 'hgb'
         params: dicionário opcional com hiperparâmetros
         test_size: proporção do dataset para teste (entre 0 e 1)
         random_state: seed para reprodutibilidade
+        sample_first: opcional, True ou dicionário (ver SAMPLE_FIRST_DEFAULTS) para treinar em
+                      amostras estratificadas crescentes e parar quando a acurácia estabilizar
+        cv_folds: opcional, número de folds da validação cruzada estratificada (paralela)
+                  feita além do split treino/teste
     
     Returns:
         Dicionário com modelo treinado, métricas e informações sobre features
@@ -454,6 +1108,7 @@ def train_classification_model(
     _validate_dataframe(df, "treinamento de modelo de classificação")
     _validate_target_column(df, target_col)
     _validate_test_size(test_size)
+    cv_folds = _validate_cv_folds(cv_folds, len(df))
     
     # Verifica se há colunas suficientes após remover o target
     if len(df.columns) < 2:
@@ -515,11 +1170,14 @@ def train_classification_model(
                 classes_original = label_encoder.classes_
                 label_encoder.classes_ = classes_original[::-1]
 
-        # Pré-processador
-        preprocessor, num_cols, cat_cols = build_preprocessor(X)
+        # Pré-processador (códigos ordinais no lugar do one-hot para modelos com categóricas nativas)
+        native_categorical = model_type in NATIVE_CATEGORICAL_MODELS
+        preprocessor, num_cols, cat_cols = build_preprocessor(X, native_categorical=native_categorical)
 
         # Classificador
         classifier = get_classifier(model_type, params)
+        if native_categorical:
+            _set_native_categoricals(classifier, num_cols, cat_cols)
 
         # Pipeline completo
         model = Pipeline(steps=[
@@ -544,30 +1202,41 @@ def train_classification_model(
                 X, y_encoded, test_size=test_size, random_state=random_state
             )
 
-        # Treino
-        model.fit(X_train, y_train)
-
-        # Avaliação
-        y_pred_encoded = model.predict(X_test)
-        y_pred = label_encoder.inverse_transform(y_pred_encoded)
-        
-        # Calcula probabilidades se o modelo suportar
-        y_proba = None
-        if hasattr(model.named_steps['model'], 'predict_proba'):
-            try:
-                y_proba_encoded = model.named_steps['model'].predict_proba(X_test)
-                # Para classificação binária, pega a probabilidade da classe positiva (índice 1)
-                if y_proba_encoded.shape[1] == 2:
-                    y_proba = y_proba_encoded[:, 1]
-                else:
-                    # Para multiclasse, pega a probabilidade máxima
-                    y_proba = y_proba_encoded.max(axis=1)
-            except:
-                pass
+        # Treino (completo ou por amostras estratificadas crescentes)
+        learning_curve = None
+        n_used = len(X_train)
+        sample_options = _resolve_sample_first(sample_first)
+        if sample_options:
+            model, learning_curve, n_used = _sample_first_fit(
+                model, X_train, y_train, X_test, y_test, accuracy_score,
+                sample_options, stratify=True, random_state=random_state
+            )
+        else:
+            _fit_pipeline(model, X_train, y_train)
+
+        # Avaliação: uma passada de previsão + probabilidades; métricas e curvas derivam dela
+        with span("evaluate"):
+            y_pred_encoded, proba = _predict_with_proba(model, X_test)
+            y_pred = label_encoder.inverse_transform(y_pred_encoded)
+
+            # Para classificação binária, a probabilidade da classe positiva (índice 1);
+            # para multiclasse, a probabilidade máxima
+            y_proba = None
+            if proba is not None:
+                y_proba = proba[:, 1] if proba.shape[1] == 2 else proba.max(axis=1)
         
-        # Converte y_test de volta para valores originais para métricas
-        y_test_original = label_encoder.inverse_transform(y_test)
-        metrics = classification_metrics(y_test_original, y_pred, labels=label_encoder.classes_)
+            # Converte y_test de volta para valores originais para métricas
+            y_test_original = label_encoder.inverse_transform(y_test)
+            metrics = classification_metrics(y_test_original, y_pred, labels=label_encoder.classes_)
+            curves = classification_curves(y_test, proba, label_encoder.classes_.tolist())
+
+        # Validação cruzada opcional (estratificada) sobre o dataset inteiro
+        cross_validation = None
+        if cv_folds:
+            cross_validation = _cross_validate(
+                model.named_steps["model"], X, y_encoded, num_cols, cat_cols, cv_folds,
+                task="classification", random_state=random_state, native_categorical=native_categorical
+            )
 
         # Retorna algumas predições de exemplo para visualização (primeiras 20)
         sample_size = min(20, len(y_test_original))
@@ -586,12 +1255,19 @@ def train_classification_model(
             "numeric_features": num_cols,
             "categorical_features": cat_cols,
             "metrics": metrics,
-            "n_samples_train": len(X_train),
+            "n_samples_train": n_used,
             "n_samples_test": len(X_test),
             "n_classes": n_classes,
             "y_test_sample": y_test_sample,
             "y_pred_sample": y_pred_sample,
-            "y_proba_sample": y_proba_sample
+            "y_proba_sample": y_proba_sample,
+            "curves": curves,
+            "learning_curve": learning_curve,
+            "cross_validation": cross_validation,
+            "boosting": boosting_summary(model.named_steps["model"]),
+            # conjunto de teste (rótulos codificados), para cálculos posteriores
+            "X_test": X_test,
+            "y_test": y_test
         }
 
         return result
@@ -641,27 +1317,19 @@ def predict_classification(
         raise ValueError("Pipeline deve conter o step 'model'")
     
     try:
-        y_pred = model_pipeline.predict(new_data)
-
-        # Tenta obter probabilidades se solicitado e disponível
+        # Tenta obter probabilidades se solicitado e disponível (mesma passada da previsão)
         y_proba = None
         if return_proba:
-            model_step = model_pipeline.named_steps["model"]
-            if hasattr(model_step, "predict_proba"):
-                try:
-                    proba_matrix = model_pipeline.predict_proba(new_data)
-                    # Para classificação binária, pega a probabilidade da classe 1
-                    if proba_matrix.shape[1] == 2:
-                        y_proba = proba_matrix[:, 1]
-                    else:
-                        # Para multiclasse, retorna a matriz completa
-                        y_proba = proba_matrix.tolist()
-                except Exception as e:
-                    import warnings
-                    warnings.warn(
-                        f"Não foi possível obter probabilidades: {str(e)}",
-                        UserWarning
-                    )
+            y_pred, proba_matrix = _predict_with_proba(model_pipeline, new_data)
+            if proba_matrix is not None:
+                # Para classificação binária, pega a probabilidade da classe 1
+                if proba_matrix.shape[1] == 2:
+                    y_proba = proba_matrix[:, 1]
+                else:
+                    # Para multiclasse, retorna a matriz completa
+                    y_proba = proba_matrix.tolist()
+        else:
+            y_pred = model_pipeline.predict(new_data)
 
         # Converte labels se encoder fornecido
         if label_encoder is not None:
@@ -707,7 +1375,8 @@ def train_all_models(
     clf_params: Optional[Dict[str, Any]] = None,
     positive_label: Optional[Union[str, int]] = None,
     test_size: float = 0.2,
-    random_state: int = 42
+    random_state: int = 42,
+    sample_first: Optional[Union[bool, Dict[str, Any]]] = None
 ):
     """
     Função geral que treina:
@@ -721,13 +1390,14 @@ def train_all_models(
         df: DataFrame com os dados de treinamento
         target_reg: nome da coluna alvo para regressão
         target_clf: nome da coluna alvo para classificação
-        reg_model_type: tipo de modelo de regressão ('linreg' ou 'rf')
-        clf_model_type: tipo de modelo de classificação ('logreg', 'rf' ou 'knn')
+        reg_model_type: tipo de modelo de regressão ('linreg', 'rf' ou 'hgb')
+        clf_model_type: tipo de modelo de classificação ('logreg', 'rf', 'knn' ou 'hgb')
         reg_params: parâmetros opcionais para o modelo de regressão
         clf_params: parâmetros opcionais para o modelo de classificação
         positive_label: rótulo positivo para classificação (opcional)
         test_size: proporção do dataset para teste (entre 0 e 1)
         random_state: seed para reprodutibilidade
+        sample_first: opcional, treino por amostras crescentes (aplicado aos dois modelos)
     
     Returns:
         Dicionário com resultados de ambos os modelos treinados
@@ -754,7 +1424,8 @@ def train_all_models(
             model_type=reg_model_type,
             params=reg_params,
             test_size=test_size,
-            random_state=random_state
+            random_state=random_state,
+            sample_first=sample_first
         )
 
         clf_result = train_classification_model(
@@ -764,7 +1435,8 @@ def train_all_models(
             model_type=clf_model_type,
             params=clf_params,
             test_size=test_size,
-            random_state=random_state
+            random_state=random_state,
+            sample_first=sample_first
         )
 
         return {
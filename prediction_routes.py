@@ -0,0 +1,88 @@
+from flask import Blueprint, request, jsonify
+from services import prediction_cache
+from services.model_training import load_metadata, predict_with_model, get_model_feature_lists
+
+# Rotas de predição compartilhadas entre o app completo (app.py) e o modo de serving (serving.py)
+prediction_bp = Blueprint("prediction", __name__)
+
+
+@prediction_bp.record_once
+def _configure_cache(state):
+    prediction_cache.configure(
+        max_entries=state.app.config.get("PREDICTION_CACHE_SIZE", prediction_cache.DEFAULT_MAX_ENTRIES),
+        ttl_seconds=state.app.config.get("PREDICTION_CACHE_TTL", prediction_cache.DEFAULT_TTL_SECONDS)
+    )
+
+
+@prediction_bp.route("/predict", methods=["POST"])
+def predict():
+    try:
+        data = request.get_json()
+
+        if not data:
+            return jsonify({"error": "Dados não fornecidos"}), 400
+
+        model_id = data.get("model_id")
+        model_type = data.get("model_type")
+        features = data.get("features")
+
+        if not model_id:
+            return jsonify({"error": "model_id é obrigatório"}), 400
+
+        if not features:
+            return jsonify({"error": "features é obrigatório"}), 400
+
+        if not model_type:
+            return jsonify({"error": "model_type é obrigatório"}), 400
+
+        # "cache": false força o cálculo (ex: para conferir um resultado)
+        result = predict_with_model(
+            model_id, features, model_type=model_type, use_cache=data.get("cache", True) is not False
+        )
+
+        return jsonify(result)
+
+    except FileNotFoundError as e:
+        return jsonify({"error": str(e)}), 404
+    except Exception as e:
+        return jsonify({"error": f"Erro ao fazer predição: {str(e)}"}), 500
+
+
+@prediction_bp.route("/predict/cache", methods=["GET", "DELETE"])
+def predict_cache():
+    if request.method == "DELETE":
+        prediction_cache.invalidate(request.args.get("model_id"))
+    return jsonify(prediction_cache.stats())
+
+
+@prediction_bp.route("/models/<model_id>/features", methods=["GET"])
+def get_model_features(model_id):
+    try:
+        # só os metadados: não há motivo para desserializar o modelo aqui
+        metadata = load_metadata(model_id)
+
+        model_type = metadata.get("model_type")
+
+        if model_type is None:
+            model_type_param = request.args.get("model_type")
+            if not model_type_param:
+                return jsonify({
+                    "error": "model_type é obrigatório para modelos com ambos os tipos"
+                }), 400
+            model_type = model_type_param
+
+        numeric_features, categorical_features = get_model_feature_lists(metadata, model_type)
+        all_features = numeric_features + categorical_features
+
+        return jsonify({
+            "model_id": model_id,
+            "model_type": model_type,
+            "numeric_features": numeric_features,
+            "categorical_features": categorical_features,
+            "all_features": all_features
+        })
+
+    except FileNotFoundError as e:
+        return jsonify({"error": str(e)}), 404
+    except Exception as e:
+        return jsonify({"error": f"Erro ao obter features: {str(e)}"}), 500
@@ -0,0 +1,256 @@
+import logging
+from services import dataset_cache
+
+logger = logging.getLogger(__name__)
+
+HIST_BINS = 50
+KDE_SAMPLE_SIZE = 5000
+KDE_GRID_POINTS = 200
+# Linhas processadas por bloco no binning (limita a cópia float64 em memória)
+BLOCK_ROWS = 1_000_000
+
+
+def _kde_curve(sample, lo, hi, n_valid, bin_width):
+    import numpy as np
+
+    m = len(sample)
+    std = sample.std() if m > 1 else 0.0
+    if m < 2 or std == 0:
+        return None
+
+    # Regra de Silverman para a largura de banda
+    bandwidth = 1.06 * std * m ** (-1 / 5)
+    grid = np.linspace(lo, hi, KDE_GRID_POINTS)
+    z = (grid[:, None] - sample[None, :]) / bandwidth
+    density = np.exp(-0.5 * z * z).sum(axis=1) / (m * bandwidth * np.sqrt(2 * np.pi))
+
+    # Escala a densidade para a mesma unidade do histograma (contagens por bin)
+    return {"x": grid.tolist(), "y": (density * n_valid * bin_width).tolist()}
+
+
+def compute_histograms(df, bins=HIST_BINS, kde_sample_size=KDE_SAMPLE_SIZE, random_state=42):
+    """
+    Calcula histogramas de todas as colunas numéricas em uma única passada vetorizada
+    (em blocos de linhas) e ajusta a KDE sobre uma amostra uniforme limitada.
+
+    Returns:
+        Dicionário coluna -> {edges, counts, n, missing, kde}
+    """
+    import numpy as np
+
+    cols = df.select_dtypes(include="number").columns.tolist()
+    if not cols:
+        return {}
+
+    n_rows = len(df)
+    numeric = df[cols]
+    lo = numeric.min().to_numpy(dtype=np.float64)
+    hi = numeric.max().to_numpy(dtype=np.float64)
+
+    # Colunas inteiras com poucos valores distintos ganham um bin por valor
+    n_bins = np.full(len(cols), bins, dtype=np.int64)
+    for i, col in enumerate(cols):
+        if np.isnan(lo[i]):
+            continue
+        if hi[i] == lo[i]:
+            lo[i], hi[i] = lo[i] - 0.5, hi[i] + 0.5
+        elif np.issubdtype(numeric[col].dtype, np.integer) and hi[i] - lo[i] + 1 <= bins:
+            n_bins[i] = int(hi[i] - lo[i]) + 1
+            lo[i], hi[i] = lo[i] - 0.5, hi[i] + 0.5
+
+    valid_range = ~np.isnan(lo)
+    width = np.where(valid_range, (hi - lo) / n_bins, 1.0)
+    lo_safe = np.where(valid_range, lo, 0.0)
+    offsets = np.arange(len(cols), dtype=np.int64) * bins
+    counts = np.zeros(len(cols) * bins, dtype=np.int64)
+
+    for start in range(0, n_rows, BLOCK_ROWS):
+        block = numeric.iloc[start:start + BLOCK_ROWS].to_numpy(dtype=np.float64, na_value=np.nan)
+        finite = np.isfinite(block)
+        idx = np.floor((block - lo_safe) / width)
+        idx = np.clip(np.nan_to_num(idx, nan=0.0), 0, n_bins - 1).astype(np.int64)
+        counts += np.bincount((idx + offsets)[finite], minlength=len(counts))
+
+    counts = counts.reshape(len(cols), bins)
+
+    # Amostra uniforme de linhas (sem reposição), compartilhada entre as colunas
+    rng = np.random.default_rng(random_state)
+    positions = np.sort(rng.choice(n_rows, size=min(n_rows, kde_sample_size), replace=False))
+    sample_block = numeric.iloc[positions].to_numpy(dtype=np.float64, na_value=np.nan)
+
+    histograms = {}
+    for i, col in enumerate(cols):
+        col_counts = counts[i, :n_bins[i]]
+        n_valid = int(col_counts.sum())
+        if not valid_range[i]:
+            histograms[col] = {"edges": [], "counts": [], "n": 0, "missing": n_rows, "kde": None}
+            continue
+
+        edges = lo[i] + width[i] * np.arange(n_bins[i] + 1)
+        sample = sample_block[:, i]
+        sample = sample[np.isfinite(sample)]
+        histograms[col] = {
+            "edges": edges.tolist(),
+            "counts": col_counts.tolist(),
+            "n": n_valid,
+            "missing": n_rows - n_valid,
+            "kde": _kde_curve(sample, lo[i], hi[i], n_valid, width[i]),
+        }
+
+    return histograms
+
+
+def _load_cached(name, params, source_path):
+    cached = dataset_cache.load_json(source_path, name)
+    if cached and cached.get("params") == params and "data" in cached:
+        return cached["data"]
+    return None
+
+
+def _cached(name, params, compute, df=None, source_path=None):
+    """
+    Lê um agregado do cache do dataset ou calcula (carregando o df só se necessário).
+    """
+    if source_path:
+        cached = _load_cached(name, params, source_path)
+        if cached is not None:
+            return cached
+
+    if df is None:
+        if not source_path:
+            raise ValueError("Informe df ou source_path.")
+        from services.data_loader import load_csv
+        df = load_csv(source_path)
+
+    data = compute(df)
+
+    if source_path:
+        try:
+            dataset_cache.save_json(source_path, name, {"params": params, "data": data})
+        except OSError as e:
+            logger.warning("Não foi possível salvar o cache %s: %s", name, e)
+
+    return data
+
+
+def get_histograms(df=None, source_path=None, bins=HIST_BINS, kde_sample_size=KDE_SAMPLE_SIZE):
+    """
+    Retorna os histogramas do dataset, reaproveitando o cache salvo ao lado do arquivo
+    de origem (se source_path for informado).
+    """
+    params = {"bins": bins, "kde_sample_size": kde_sample_size}
+    return _cached(
+        "histograms.json", params,
+        lambda frame: compute_histograms(frame, bins=bins, kde_sample_size=kde_sample_size),
+        df=df, source_path=source_path
+    )
+
+
+def get_correlation(df=None, source_path=None, columns=None):
+    """
+    Retorna a matriz de correlação de um subconjunto limitado de colunas
+    (as escolhidas em `columns` ou, por padrão, as dos pares mais fortes).
+    """
+    from services.correlation import get_correlation_matrix, heatmap_columns, submatrix
+
+    all_columns, matrix = get_correlation_matrix(df, source_path)
+    selected = list(columns) if columns else heatmap_columns(all_columns, matrix)
+    result = submatrix(all_columns, matrix, selected)
+    result["n_columns"] = len(all_columns)
+    result["truncated"] = len(selected) < len(all_columns)
+    return result
+
+
+def get_top_correlations(df=None, source_path=None, k=20, absolute=True):
+    from services.correlation import get_correlation_matrix, top_k_pairs
+
+    all_columns, matrix = get_correlation_matrix(df, source_path)
+    return {"n_columns": len(all_columns), "pairs": top_k_pairs(all_columns, matrix, k=k, absolute=absolute)}
+
+
+CITY_COLUMNS = ("city", "cidade")
+
+
+def compute_city_counts(df):
+    col = next((c for c in CITY_COLUMNS if c in df.columns), None)
+    if col is None:
+        return {"column": None, "counts": {}}
+    counts = df[col].value_counts()
+    return {"column": col, "counts": {str(k): int(v) for k, v in counts.items()}}
+
+
+def get_city_counts(df=None, source_path=None):
+    return _cached("city_counts.json", {}, compute_city_counts, df=df, source_path=source_path)
+
+
+def get_stats(df=None, source_path=None):
+    from services.data_analysis import get_basic_stats
+
+    return _cached("stats.json", {}, get_basic_stats, df=df, source_path=source_path)
+
+
+# Estatísticas já calculadas (pelo pré-processamento do upload), sem carregar o dataset
+def cached_stats(source_path):
+    return _load_cached("stats.json", {}, source_path)
+
+
+# NaN/inf do describe() (ex: desvio de uma coluna de datas) não são JSON válido no navegador
+def _json_safe(summary):
+    import math
+
+    if summary is None:
+        return None
+    return {
+        k: None if isinstance(v, float) and not math.isfinite(v) else v
+        for k, v in summary.items()
+    }
+
+
+def stats_page(stats, columns=None, q=None, offset=0, limit=50):
+    """
+    Recorta as estatísticas do dataset em uma página de colunas: filtra pelos nomes
+    pedidos em `columns` e/ou pelo trecho `q` (sem diferenciar maiúsculas) e devolve
+    só as linhas de `offset` a `offset + limit`.
+
+    Returns:
+        Dicionário com shape, total de colunas, quantas passaram no filtro e as linhas
+        {name, missing, summary}; summary é o describe() da coluna (None se não numérica)
+    """
+    names = stats["columns"]
+    if columns:
+        unknown = [c for c in columns if c not in stats["missing_values"]]
+        if unknown:
+            raise ValueError(f"Colunas inexistentes: {', '.join(unknown)}")
+        names = list(columns)
+    if q:
+        needle = q.lower()
+        names = [c for c in names if needle in str(c).lower()]
+
+    offset = max(0, int(offset))
+    summary = stats["numeric_summary"]
+    rows = [
+        {"name": c, "missing": stats["missing_values"].get(c), "summary": _json_safe(summary.get(c))}
+        for c in names[offset:offset + limit]
+    ]
+    return {
+        "shape": stats["shape"],
+        "total_columns": len(stats["columns"]),
+        "matched": len(names),
+        "offset": offset,
+        "limit": limit,
+        "columns": rows,
+    }
+
+
+# Quantidade de gráficos que a página de análise consegue desenhar a partir do cache
+def count_cached_charts(source_path):
+    total = 0
+    histograms = dataset_cache.load_json(source_path, "histograms.json")
+    if histograms:
+        total += sum(1 for h in histograms["data"].values() if h["counts"])
+    if dataset_cache.load_json(source_path, "correlation_columns.json"):
+        total += 1
+    city = dataset_cache.load_json(source_path, "city_counts.json")
+    if city and city["data"]["counts"]:
+        total += 1
+    return total
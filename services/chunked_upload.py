@@ -0,0 +1,264 @@
+import os
+import re
+import json
+import time
+import uuid
+import shutil
+import hashlib
+import logging
+import threading
+from datetime import datetime
+from werkzeug.utils import secure_filename
+from utils.file_utils import detect_format
+
+logger = logging.getLogger(__name__)
+
+# Uploads em andamento ficam em <UPLOAD_FOLDER>/chunked/<upload_id>/
+CHUNKED_FOLDER = "chunked"
+SESSION_NAME = "session.json"
+DATA_NAME = "data.part"
+
+# Padrões (sobrescritos pelo Config nas rotas)
+DEFAULT_CHUNK_SIZE = 8 * 1024 * 1024
+DEFAULT_MAX_SIZE = 10 * 1024 * 1024 * 1024
+DEFAULT_TTL_SECONDS = 24 * 3600
+
+# O corpo do chunk é copiado para o disco em blocos deste tamanho
+COPY_BLOCK = 1024 * 1024
+
+_UPLOAD_ID = re.compile(r"[0-9a-f]{32}")
+
+# Um lock por upload: chunks de uploads diferentes são gravados em paralelo
+_locks = {}
+_locks_guard = threading.Lock()
+
+
+class OffsetMismatch(ValueError):
+    """Chunk enviado fora de ordem: o cliente deve retomar a partir de `offset`."""
+
+    def __init__(self, offset):
+        super().__init__(f"Offset inválido: o próximo chunk deve começar em {offset}")
+        self.offset = offset
+
+
+def _lock(upload_id):
+    with _locks_guard:
+        return _locks.setdefault(upload_id, threading.Lock())
+
+
+def _session_dir(upload_folder, upload_id):
+    if not _UPLOAD_ID.fullmatch(upload_id or ""):
+        raise FileNotFoundError(f"Upload não encontrado: {upload_id}")
+    return os.path.join(upload_folder, CHUNKED_FOLDER, upload_id)
+
+
+def _load(upload_folder, upload_id):
+    path = os.path.join(_session_dir(upload_folder, upload_id), SESSION_NAME)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Upload não encontrado: {upload_id}")
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _write_json(path, data):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=4, ensure_ascii=False, default=str)
+    os.replace(tmp_path, path)
+
+
+def _save(upload_folder, session):
+    session["updated_at"] = datetime.now().isoformat()
+    session["updated_ts"] = time.time()
+    _write_json(os.path.join(_session_dir(upload_folder, session["upload_id"]), SESSION_NAME), session)
+
+
+def _status(session):
+    return {
+        "upload_id": session["upload_id"],
+        "filename": session["filename"],
+        "size": session["size"],
+        "chunk_size": session["chunk_size"],
+        "offset": session["offset"],
+        "chunks": len(session["chunks"]),
+        "complete": session["offset"] == session["size"],
+        "mode": session["mode"],
+        "dataset": session["dataset"],
+    }
+
+
+def _hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(COPY_BLOCK), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# remove uploads abandonados (sem chunk novo há mais de `ttl_seconds`)
+def purge_expired(upload_folder, ttl_seconds=DEFAULT_TTL_SECONDS):
+    folder = os.path.join(upload_folder, CHUNKED_FOLDER)
+    if not os.path.isdir(folder):
+        return 0
+    now = time.time()
+    removed = 0
+    for upload_id in os.listdir(folder):
+        try:
+            session = _load(upload_folder, upload_id)
+            expired = now - session.get("updated_ts", 0) > ttl_seconds
+        except (FileNotFoundError, ValueError):
+            # diretório sem sessão válida (ex: criação interrompida): vale a data do diretório
+            expired = now - os.path.getmtime(os.path.join(folder, upload_id)) > ttl_seconds
+        if expired:
+            with _lock(upload_id):
+                shutil.rmtree(os.path.join(folder, upload_id), ignore_errors=True)
+            with _locks_guard:
+                _locks.pop(upload_id, None)
+            removed += 1
+    if removed:
+        logger.info("Uploads em partes expirados removidos: %s", removed)
+    return removed
+
+
+def create(upload_folder, filename, size, chunk_size=DEFAULT_CHUNK_SIZE, max_size=DEFAULT_MAX_SIZE,
+           mode="replace", dataset=None, ttl_seconds=DEFAULT_TTL_SECONDS):
+    """
+    Abre um upload em partes: o arquivo é recebido em chunks sequenciais gravados
+    direto no disco e pode ser retomado a partir do último offset confirmado.
+
+    Returns:
+        Estado do upload (upload_id, offset, chunk_size...)
+    """
+    filename = secure_filename(filename or "")
+    detect_format(filename)  # ValueError para formatos não suportados
+    try:
+        size = int(size)
+    except (TypeError, ValueError):
+        raise ValueError("Informe o tamanho do arquivo em bytes (size)")
+    if size <= 0:
+        raise ValueError("O arquivo está vazio")
+    if size > max_size:
+        raise ValueError(f"Arquivo maior que o limite de {max_size // (1024 * 1024)}MB")
+    if mode not in ("replace", "append"):
+        raise ValueError("mode deve ser 'replace' ou 'append'")
+
+    purge_expired(upload_folder, ttl_seconds)
+
+    upload_id = uuid.uuid4().hex
+    folder = _session_dir(upload_folder, upload_id)
+    os.makedirs(folder)
+    open(os.path.join(folder, DATA_NAME), "wb").close()
+
+    session = {
+        "upload_id": upload_id,
+        "filename": filename,
+        "size": size,
+        "chunk_size": int(chunk_size),
+        "offset": 0,
+        "chunks": [],
+        "mode": mode,
+        "dataset": dataset or None,
+        "created_at": datetime.now().isoformat(),
+    }
+    _save(upload_folder, session)
+    logger.info("Upload em partes iniciado: %s (%s, %s bytes)", upload_id, filename, size)
+    return _status(session)
+
+
+def status(upload_folder, upload_id):
+    return _status(_load(upload_folder, upload_id))
+
+
+def write_chunk(upload_folder, upload_id, offset, stream, length, checksum=None):
+    """
+    Grava o chunk que começa em `offset` lendo `stream` em blocos (o chunk nunca fica
+    inteiro na memória). Com `checksum` (SHA-256 em hex), o chunk só é confirmado se
+    bater; do contrário o arquivo volta ao último offset confirmado.
+
+    Reenviar um chunk já confirmado (resposta perdida) é aceito sem regravar.
+    """
+    with _lock(upload_id):
+        session = _load(upload_folder, upload_id)
+        offset = int(offset)
+        length = int(length)
+        checksum = checksum.lower() if checksum else None
+
+        if offset < session["offset"]:
+            previous = next((c for c in session["chunks"] if c["offset"] == offset), None)
+            if previous is not None and previous["size"] == length and checksum in (None, previous["sha256"]):
+                return _status(session)
+        if offset != session["offset"]:
+            raise OffsetMismatch(session["offset"])
+        if length <= 0 or length > session["chunk_size"]:
+            raise ValueError(f"Tamanho do chunk deve estar entre 1 e {session['chunk_size']} bytes")
+        if offset + length > session["size"]:
+            raise ValueError("O chunk ultrapassa o tamanho declarado do arquivo")
+
+        digest = hashlib.sha256()
+        received = 0
+        data_path = os.path.join(_session_dir(upload_folder, upload_id), DATA_NAME)
+        with open(data_path, "r+b") as f:
+            # descarta bytes de uma tentativa anterior que não foi confirmada
+            f.truncate(offset)
+            f.seek(offset)
+            while received < length:
+                block = stream.read(min(COPY_BLOCK, length - received))
+                if not block:
+                    break
+                digest.update(block)
+                f.write(block)
+                received += len(block)
+
+            error = None
+            if received != length:
+                error = f"Chunk incompleto: {received} de {length} bytes recebidos"
+            elif checksum is not None and digest.hexdigest() != checksum:
+                error = "Checksum do chunk não confere"
+            if error:
+                f.truncate(offset)
+                raise ValueError(error)
+
+            f.flush()
+            os.fsync(f.fileno())
+
+        session["chunks"].append({"offset": offset, "size": length, "sha256": digest.hexdigest()})
+        session["offset"] = offset + length
+        _save(upload_folder, session)
+        return _status(session)
+
+
+def complete(upload_folder, upload_id, checksum=None):
+    """
+    Fecha o upload: confere que todos os bytes chegaram (e o SHA-256 do arquivo, se
+    informado) e move o arquivo montado para a pasta de uploads sem copiá-lo.
+
+    Returns:
+        Dicionário com o caminho final e o modo/dataset escolhidos na criação
+    """
+    with _lock(upload_id):
+        session = _load(upload_folder, upload_id)
+        if session["offset"] != session["size"]:
+            raise OffsetMismatch(session["offset"])
+
+        folder = _session_dir(upload_folder, upload_id)
+        data_path = os.path.join(folder, DATA_NAME)
+        if checksum and _hash_file(data_path) != checksum.lower():
+            raise ValueError("Checksum do arquivo não confere")
+
+        filepath = os.path.join(upload_folder, session["filename"])
+        os.replace(data_path, filepath)
+        shutil.rmtree(folder, ignore_errors=True)
+
+    with _locks_guard:
+        _locks.pop(upload_id, None)
+
+    logger.info("Upload em partes concluído: %s -> %s", upload_id, filepath)
+    return {"filepath": filepath, "mode": session["mode"], "dataset": session["dataset"]}
+
+
+def abort(upload_folder, upload_id):
+    with _lock(upload_id):
+        _load(upload_folder, upload_id)
+        shutil.rmtree(_session_dir(upload_folder, upload_id), ignore_errors=True)
+    with _locks_guard:
+        _locks.pop(upload_id, None)
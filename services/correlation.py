@@ -0,0 +1,176 @@
+import logging
+from services import dataset_cache
+
+logger = logging.getLogger(__name__)
+
+# Linhas e colunas por bloco no cálculo da matriz
+ROW_BLOCK = 200_000
+COL_BLOCK = 128
+# Heatmap só para um subconjunto limitado de colunas
+MAX_HEATMAP_COLUMNS = 20
+DEFAULT_TOP_K = 20
+
+
+def compute_correlation_matrix(df, row_block=ROW_BLOCK, col_block=COL_BLOCK):
+    """
+    Calcula a correlação de Pearson entre todas as colunas numéricas em blocos float32.
+
+    As colunas são centralizadas pela média (float64) antes dos produtos em float32,
+    evitando a perda de precisão da fórmula de momentos brutos. Valores ausentes são
+    tratados aos pares (pairwise-complete), como no df.corr do pandas.
+
+    Returns:
+        Tupla (lista de colunas, matriz numpy float32 k x k)
+    """
+    import numpy as np
+
+    cols = df.select_dtypes(include="number").columns.tolist()
+    k = len(cols)
+    if k == 0:
+        return [], np.zeros((0, 0), dtype=np.float32)
+
+    numeric = df[cols]
+    means = numeric.mean().to_numpy(dtype=np.float64)
+    has_missing = bool(numeric.isna().to_numpy().any())
+
+    # Acumuladores em float64; os produtos de cada bloco são em float32
+    sxy = np.zeros((k, k), dtype=np.float64)
+    if has_missing:
+        n = np.zeros((k, k), dtype=np.float64)
+        sx = np.zeros((k, k), dtype=np.float64)
+        sxx = np.zeros((k, k), dtype=np.float64)
+
+    col_ranges = [(c, min(c + col_block, k)) for c in range(0, k, col_block)]
+
+    for start in range(0, len(numeric), row_block):
+        block = numeric.iloc[start:start + row_block].to_numpy(dtype=np.float64, na_value=np.nan)
+        block = (block - np.nan_to_num(means)).astype(np.float32)
+
+        if has_missing:
+            valid = np.isfinite(block)
+            x = np.where(valid, block, np.float32(0))
+            w = valid.astype(np.float32)
+            xx = x * x
+        else:
+            x = block
+
+        for a0, a1 in col_ranges:
+            for b0, b1 in col_ranges:
+                # Termos simétricos (sxy, n): só os blocos do triângulo superior
+                if b0 >= a0:
+                    sxy[a0:a1, b0:b1] += x[:, a0:a1].T @ x[:, b0:b1]
+                    if has_missing:
+                        n[a0:a1, b0:b1] += w[:, a0:a1].T @ w[:, b0:b1]
+                if has_missing:
+                    sx[a0:a1, b0:b1] += x[:, a0:a1].T @ w[:, b0:b1]
+                    sxx[a0:a1, b0:b1] += xx[:, a0:a1].T @ w[:, b0:b1]
+
+    upper = np.triu(np.ones((k, k), dtype=bool))
+    sxy = np.where(upper, sxy, sxy.T)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        if has_missing:
+            n = np.where(upper, n, n.T)
+            sy = sx.T
+            syy = sxx.T
+            cov = n * sxy - sx * sy
+            var_x = n * sxx - sx * sx
+            var_y = n * syy - sy * sy
+            corr = cov / np.sqrt(var_x * var_y)
+        else:
+            diag = np.sqrt(np.diag(sxy))
+            corr = sxy / np.outer(diag, diag)
+
+    corr = np.clip(corr, -1.0, 1.0)
+    np.fill_diagonal(corr, np.where(np.isnan(np.diag(corr)), np.nan, 1.0))
+    return cols, corr.astype(np.float32)
+
+
+def get_correlation_matrix(df=None, source_path=None):
+    """
+    Retorna (colunas, matriz) usando o cache do dataset quando houver source_path.
+    """
+    if source_path:
+        meta = dataset_cache.load_json(source_path, "correlation_columns.json")
+        matrix = dataset_cache.load_array(source_path, "correlation.npy")
+        if meta is not None and matrix is not None and matrix.shape == (len(meta["columns"]),) * 2:
+            return meta["columns"], matrix
+
+    if df is None:
+        if not source_path:
+            raise ValueError("Informe df ou source_path.")
+        from services.data_loader import load_csv
+        df = load_csv(source_path)
+
+    cols, matrix = compute_correlation_matrix(df)
+
+    if source_path:
+        try:
+            dataset_cache.save_array(source_path, "correlation.npy", matrix)
+            dataset_cache.save_json(source_path, "correlation_columns.json", {"columns": cols})
+        except OSError as e:
+            logger.warning("Não foi possível salvar o cache de correlação: %s", e)
+
+    return cols, matrix
+
+
+def top_k_pairs(columns, matrix, k=DEFAULT_TOP_K, absolute=True):
+    """
+    Retorna os k pares de colunas com correlação mais forte (sem a diagonal).
+    """
+    import numpy as np
+
+    n = len(columns)
+    if n < 2 or k <= 0:
+        return []
+
+    i_idx, j_idx = np.triu_indices(n, k=1)
+    values = matrix[i_idx, j_idx].astype(np.float64)
+    keys = np.abs(values) if absolute else values
+    keys = np.where(np.isnan(keys), -np.inf, keys)
+
+    k = min(k, len(values))
+    best = np.argpartition(-keys, k - 1)[:k]
+    best = best[np.argsort(-keys[best])]
+
+    return [
+        {"a": columns[i_idx[p]], "b": columns[j_idx[p]], "corr": round(float(values[p]), 4)}
+        for p in best if np.isfinite(values[p])
+    ]
+
+
+def submatrix(columns, matrix, selected):
+    """
+    Recorta a matriz para as colunas escolhidas (na ordem informada).
+    """
+    import numpy as np
+
+    index = {c: i for i, c in enumerate(columns)}
+    missing = [c for c in selected if c not in index]
+    if missing:
+        raise ValueError(f"Colunas não numéricas ou inexistentes: {', '.join(missing)}")
+
+    pos = [index[c] for c in selected]
+    sub = np.round(matrix[np.ix_(pos, pos)].astype(np.float64), 4)
+    return {
+        "columns": list(selected),
+        "matrix": [[None if np.isnan(v) else float(v) for v in row] for row in sub],
+    }
+
+
+def heatmap_columns(columns, matrix, limit=MAX_HEATMAP_COLUMNS):
+    """
+    Escolhe até `limit` colunas para o heatmap: todas, se couberem; senão,
+    as que aparecem nos pares mais fortes.
+    """
+    if len(columns) <= limit:
+        return list(columns)
+
+    selected = []
+    for pair in top_k_pairs(columns, matrix, k=limit * limit):
+        for col in (pair["a"], pair["b"]):
+            if col not in selected:
+                selected.append(col)
+            if len(selected) == limit:
+                return selected
+    return selected or list(columns[:limit])
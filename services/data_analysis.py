@@ -1,7 +1,10 @@
+from utils.instrumentation import span
+
 def get_basic_stats(df):
-    return {
-        "shape": df.shape,
-        "columns": list(df.columns),
-        "missing_values": df.isnull().sum().to_dict(),
-        "numeric_summary": df.describe().to_dict()
-    }
+    with span("stats"):
+        return {
+            "shape": df.shape,
+            "columns": list(df.columns),
+            "missing_values": df.isnull().sum().to_dict(),
+            "numeric_summary": df.describe().to_dict()
+        }
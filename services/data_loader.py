@@ -1,22 +1,262 @@
-import pandas as pd
-import numpy as np
 import re
+import io
+import os
+import json
+import hashlib
+import logging
+from datetime import datetime
+from services import dataset_cache
+from utils.file_utils import detect_format
+from utils.instrumentation import span
 
-def clean_dataset(filepath):
-    print(f"Lendo arquivo: {filepath}\n")
+logger = logging.getLogger(__name__)
+
+# Linhas lidas do início do arquivo para inferir o esquema (/columns)
+SCHEMA_SAMPLE_ROWS = 10_000
+
+# Leitor de CSV do clean_dataset: "arrow" (pyarrow.csv, multithread, com o esquema aprendido
+# na primeira leitura) ou "pandas" (C engine, inferência a cada leitura)
+CSV_ENGINES = ("arrow", "pandas")
+_settings = {"csv_engine": "arrow"}
+
+# Esquemas aprendidos ficam em <pasta>/.cache/csv_schemas/, um por cabeçalho
+CSV_SCHEMA_FOLDER = "csv_schemas"
+CSV_SCHEMA_VERSION = 1
+
+# Mesmos marcadores de ausente que o pd.read_csv reconhece por padrão
+NA_VALUES = [
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN",
+    "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null",
+]
+
+
+def configure(csv_engine="arrow"):
+    if csv_engine not in CSV_ENGINES:
+        raise ValueError(f"CSV_ENGINE deve ser um de: {', '.join(CSV_ENGINES)}")
+    _settings["csv_engine"] = csv_engine
+
+# lê o arquivo conforme o formato (CSV, CSV gzip/zstd, Parquet ou Feather/Arrow IPC).
+# Formatos colunares não passam por parsing de texto e leem só as colunas pedidas.
+def read_dataset(filepath, columns=None, nrows=None, as_text=False):
+    import pandas as pd
     
-    df = pd.read_csv(filepath, encoding="utf-8")
-    print("Arquivo lido com sucesso!\n")
+    fmt, compression = detect_format(filepath)
     
-    # corrige cabeçalhos 
-    df.columns = (
-        df.columns
+    if fmt == "csv":
+        return pd.read_csv(
+            filepath, encoding="utf-8", compression=compression, usecols=columns,
+            nrows=nrows, dtype=str if as_text else None
+        )
+    
+    import pyarrow as pa
+    
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+        
+        if nrows is None:
+            table = pq.read_table(filepath, columns=columns)
+        else:
+            parquet_file = pq.ParquetFile(filepath)
+            schema = parquet_file.schema_arrow
+            if columns is not None:
+                schema = pa.schema([schema.field(c) for c in columns])
+            batch = None
+            if nrows > 0:
+                batch = next(parquet_file.iter_batches(batch_size=nrows, columns=columns), None)
+            table = pa.Table.from_batches([batch]) if batch is not None else schema.empty_table()
+    else:
+        import pyarrow.feather as feather
+        
+        table = feather.read_table(filepath, columns=columns, memory_map=True)
+        if nrows is not None:
+            table = table.slice(0, nrows)
+    
+    df = table.to_pandas()
+    return df.astype("string") if as_text else df
+
+
+# lê o arquivo em blocos de até `chunk_rows` linhas (memória limitada)
+def iter_dataset_chunks(filepath, chunk_rows, as_text=False):
+    import pandas as pd
+    
+    fmt, compression = detect_format(filepath)
+    
+    if fmt == "csv":
+        yield from pd.read_csv(
+            filepath, encoding="utf-8", compression=compression,
+            dtype=str if as_text else None, chunksize=chunk_rows
+        )
+        return
+    
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+        
+        batches = pq.ParquetFile(filepath).iter_batches(batch_size=chunk_rows)
+    else:
+        import pyarrow.feather as feather
+        
+        batches = feather.read_table(filepath, memory_map=True).to_batches(max_chunksize=chunk_rows)
+    
+    for batch in batches:
+        df = batch.to_pandas()
+        yield df.astype("string") if as_text else df
+
+
+# nomes originais (no arquivo) das colunas pedidas já normalizadas
+def _source_columns(filepath, columns):
+    header = read_dataset(filepath, nrows=0).columns
+    by_name = dict(zip(normalize_columns(header), header))
+    missing = [c for c in columns if c not in by_name]
+    if missing:
+        raise ValueError(f"Colunas não encontradas: {', '.join(missing)}")
+    return [by_name[c] for c in columns]
+
+
+def _csv_schema_path(filepath, header):
+    digest = hashlib.sha1(json.dumps([CSV_SCHEMA_VERSION, header]).encode("utf-8")).hexdigest()[:20]
+    folder = os.path.dirname(os.path.abspath(filepath))
+    return os.path.join(folder, ".cache", CSV_SCHEMA_FOLDER, f"{digest}.json")
+
+
+def _load_csv_schema(path):
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning("Esquema de CSV inválido em %s: %s", path, e)
+        return None
+
+
+def _save_csv_schema(path, schema):
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(schema, f, indent=4, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logger.warning("Não foi possível salvar o esquema do CSV: %s", e)
+
+
+def _drop_csv_schema(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+# tipos que o pd.read_csv inferiu -> tipos explícitos para o leitor do Arrow
+def _learn_csv_schema(filepath, raw, cleaned):
+    types = {}
+    for col, dtype in raw.dtypes.items():
+        kind = str(dtype)
+        types[col] = kind if kind in ("int64", "float64", "bool") else "string"
+    # colunas de texto que o _clean converteu em número (ex: decimal com vírgula)
+    numeric_text = [
+        norm for col, norm in zip(raw.columns, normalize_columns(raw.columns))
+        if types[col] == "string" and norm in cleaned.columns and cleaned[norm].dtype.kind in "iuf"
+    ]
+    return {
+        "columns": list(raw.columns),
+        "types": types,
+        "numeric_text_columns": numeric_text,
+        "learned_from": os.path.basename(filepath),
+        "learned_at": datetime.now().isoformat(),
+    }
+
+
+def _read_csv_arrow(filepath, schema, columns=None):
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+    
+    arrow_types = {"int64": pa.int64(), "float64": pa.float64(), "bool": pa.bool_(), "string": pa.string()}
+    convert_options = pacsv.ConvertOptions(
+        column_types={col: arrow_types[kind] for col, kind in schema["types"].items()},
+        include_columns=columns,
+        null_values=NA_VALUES,
+        strings_can_be_null=True,
+        true_values=["True", "TRUE", "true"],
+        false_values=["False", "FALSE", "false"],
+    )
+    # use_threads: blocos do arquivo convertidos em paralelo, coluna a coluna
+    table = pacsv.read_csv(
+        filepath, read_options=pacsv.ReadOptions(use_threads=True), convert_options=convert_options
+    )
+    return table.to_pandas()
+
+
+# leitura do CSV para o clean_dataset: devolve também o esquema aprendido (ou None)
+def _read_csv(filepath, columns, engine):
+    import pandas as pd
+    import pyarrow as pa
+    
+    _, compression = detect_format(filepath)
+    header = list(pd.read_csv(filepath, encoding="utf-8", compression=compression, nrows=0).columns)
+    path = _csv_schema_path(filepath, header)
+    schema = _load_csv_schema(path) if engine == "arrow" else None
+    
+    if schema is not None and schema.get("columns") == header:
+        try:
+            return _read_csv_arrow(filepath, schema, columns), schema, path, False
+        except (pa.ArrowInvalid, KeyError) as e:
+            # o arquivo não segue mais o esquema aprendido (ex: texto numa coluna inteira)
+            logger.warning("Esquema do CSV não confere (%s); lendo com pandas e reaprendendo", e)
+            _drop_csv_schema(path)
+    
+    df = read_dataset(filepath, columns=columns)
+    # só uma leitura completa ensina o esquema; cabeçalhos repetidos ficam sempre no pandas
+    learn = engine == "arrow" and columns is None and len(set(header)) == len(header)
+    return df, None, path, learn
+
+
+def clean_dataset(filepath, columns=None, engine=None):
+    engine = engine or _settings["csv_engine"]
+    logger.info("Lendo arquivo: %s", filepath)
+    
+    with span("read"):
+        source_columns = _source_columns(filepath, columns) if columns else None
+        schema = learn = None
+        if detect_format(filepath)[0] == "csv":
+            df, schema, schema_path, learn = _read_csv(filepath, source_columns, engine)
+        else:
+            df = read_dataset(filepath, columns=source_columns)
+        raw = df.head(0).copy() if learn else None
+    logger.debug("Arquivo lido com sucesso!")
+    
+    with span("clean"):
+        numeric_text = schema["numeric_text_columns"] if schema else None
+        df = _clean(df, numeric_text_columns=numeric_text)
+    
+    if learn:
+        _save_csv_schema(schema_path, _learn_csv_schema(filepath, raw, df))
+    elif schema is not None and any(df[c].dtype == object for c in numeric_text if c in df.columns):
+        # coluna que era numérica no arquivo de origem do esquema não converteu: reaprende
+        _drop_csv_schema(schema_path)
+    return df
+
+
+# padroniza os nomes das colunas (snake_case, sem pontuação)
+def normalize_columns(columns):
+    import pandas as pd
+
+    return (
+        pd.Index(columns)
         .str.strip()
         .str.replace(" ", "_")
         .str.replace("-", "_")
         .str.replace(r"[^\w\s]", "", regex=True)
         .str.lower()
     )
+
+
+def _clean(df, numeric_text_columns=None):
+    import pandas as pd
+    import numpy as np
+
+    # corrige cabeçalhos 
+    df.columns = normalize_columns(df.columns)
     
     # conversão automática para datas 
     for col in df.columns:
@@ -26,8 +266,9 @@ def clean_dataset(filepath):
             except Exception:
                 pass
     
-    print("Valores nulos por coluna:")
-    print(df.isnull().sum(), "\n")
+    # os dumps de diagnóstico custam uma varredura extra: só em nível DEBUG
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Valores nulos por coluna:\n%s", df.isnull().sum())
     
     # preenchimento 
     for col in df.columns:
@@ -41,14 +282,16 @@ def clean_dataset(filepath):
     # remover duplicatas
     duplicadas = df.duplicated().sum()
     df.drop_duplicates(inplace=True)
-    print(f"Duplicatas removidas: {duplicadas}")
+    logger.info("Duplicatas removidas: %s", duplicadas)
     
     # limpar strings
     for col in df.select_dtypes(include='object'):
         df[col] = df[col].str.strip()
     
-    # converte números em strings para numéricos
-    for col in df.columns:
+    # converte números em strings para numéricos (com esquema aprendido, só as colunas
+    # que se sabe converterem: as demais seguem texto sem a tentativa)
+    candidates = df.columns if numeric_text_columns is None else [c for c in numeric_text_columns if c in df.columns]
+    for col in candidates:
         if df[col].dtype == object:
             try:
                 df[col] = pd.to_numeric(df[col].str.replace(",", "."), errors='ignore')
@@ -68,29 +311,130 @@ def clean_dataset(filepath):
         df[col].fillna(df[col].median(), inplace=True)
         df[col] = df[col].astype(int)
         
-        print(f"\nColuna '{col}' corrigida")
-        print(df[col].head(10))
+        logger.debug("Coluna '%s' corrigida", col)
     else:
-        print("Coluna 'delivery_time_days' não encontrada.\n")
+        logger.debug("Coluna 'delivery_time_days' não encontrada.")
     
-    print("\nInformações finais:")
-    print(df.info())
-    print("\nPrimeiras linhas:")
-    print(df.head(), "\n")
+    if logger.isEnabledFor(logging.DEBUG):
+        buffer = io.StringIO()
+        df.info(buf=buffer)
+        logger.debug("Informações finais:\n%s", buffer.getvalue())
+        logger.debug("Primeiras linhas:\n%s", df.head())
     
     return df
 
 
-# carrega e limpa o arquivo CSV
-def load_csv(filepath):
+# carrega e limpa o arquivo (CSV, CSV comprimido, Parquet ou Feather).
+# `columns` (nomes já normalizados) lê só essas colunas; as duplicatas passam
+# a ser avaliadas apenas sobre elas.
+def load_csv(filepath, columns=None, engine=None):
+    from services.dataset_store import is_store, load_store
+
     try:
-        df = clean_dataset(filepath)  
+        # datasets acumulados (modo append) já estão limpos no armazenamento colunar
+        if is_store(filepath):
+            df = load_store(filepath, columns)
+        else:
+            df = clean_dataset(filepath, columns, engine=engine)
         
         if df.empty:
-            raise ValueError("O arquivo CSV está vazio após limpeza.")
+            raise ValueError("O arquivo está vazio após limpeza.")
         
         return df
     except Exception as e:
-        raise ValueError(f"Erro ao processar CSV: {e}")
+        raise ValueError(f"Erro ao processar arquivo: {e}")
+
+
+def _describe_columns(df):
+    # mesmos critérios de tipo usados pela rota /columns e pelo pré-processador
+    return {
+        "columns": list(df.columns),
+        "numeric_columns": df.select_dtypes(include=['int64', 'float64']).columns.tolist(),
+        "categorical_columns": df.select_dtypes(include=['object', 'bool', 'category']).columns.tolist(),
+        "datetime_columns": df.select_dtypes(include=['datetime']).columns.tolist(),
+        "dtypes": {col: str(dtype) for col, dtype in df.dtypes.items()},
+    }
+
+
+def _estimate_rows(filepath, sample_rows):
+    # formatos colunares trazem o número de linhas nos metadados
+    fmt, compression = detect_format(filepath)
+    
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+        return pq.ParquetFile(filepath).metadata.num_rows, False
+    if fmt == "feather":
+        import pyarrow.feather as feather
+        return feather.read_table(filepath, memory_map=True).num_rows, False
+    
+    if compression is not None:
+        # o descompressor lê o arquivo em blocos grandes, então não há como relacionar
+        # linhas a bytes comprimidos: conta tudo (só quebras de linha, sem parsing)
+        if compression == "gzip":
+            import gzip
+            stream = gzip.open(filepath, "rb")
+        else:
+            import zstandard
+            stream = zstandard.ZstdDecompressor().stream_reader(open(filepath, "rb"), closefd=True)
+        with stream:
+            lines = sum(block.count(b"\n") for block in iter(lambda: stream.read(1 << 20), b""))
+        return max(lines - 1, 0), False
+    
+    # conta as linhas do início do arquivo; se não chegar ao fim, extrapola pelos bytes por linha
+    size = os.path.getsize(filepath)
+    with open(filepath, "rb") as f:
+        f.readline()  # cabeçalho
+        header_bytes = f.tell()
+        lines = 0
+        for _ in f:
+            lines += 1
+            if lines >= sample_rows:
+                break
+        read = f.tell() - header_bytes
+        if f.read(1) == b"":
+            return lines, False
+    return int(round((size - header_bytes) / read * lines)), True
 
 
+# esquema (nomes e tipos das colunas) a partir do cabeçalho e de uma amostra limitada de linhas
+def sniff_schema(filepath, sample_rows=SCHEMA_SAMPLE_ROWS):
+    """
+    Aplica a mesma normalização de nomes e inferência de tipos do clean_dataset
+    apenas às primeiras `sample_rows` linhas, sem ler o arquivo inteiro.
+    O resultado fica em cache pela impressão digital do arquivo.
+    
+    Returns:
+        Dicionário com colunas, colunas numéricas/categóricas/datas, dtypes e shape.
+        O número de linhas é o do arquivo (antes da remoção de duplicatas) e é
+        estimado quando o arquivo é maior que a amostra (rows_estimated=True)
+    """
+    import pandas as pd
+    from services.dataset_store import is_store, load_manifest
+    
+    # dataset acumulado: o manifesto já tem o esquema e a contagem exata
+    if is_store(filepath):
+        manifest = load_manifest(filepath)
+        empty = pd.DataFrame({col: pd.Series(dtype=dtype) for col, dtype in manifest["dtypes"].items()})
+        schema = _describe_columns(empty)
+        schema.update({"shape": [manifest["rows"], len(manifest["columns"])], "rows_estimated": False})
+        return schema
+    
+    params = {"sample_rows": sample_rows}
+    cached = dataset_cache.load_json(filepath, "schema.json")
+    if cached and cached.get("params") == params and "data" in cached:
+        return cached["data"]
+    
+    with span("read"):
+        sample = read_dataset(filepath, nrows=sample_rows)
+    with span("clean"):
+        sample = _clean(sample)
+    
+    rows, estimated = _estimate_rows(filepath, sample_rows)
+    schema = _describe_columns(sample)
+    schema.update({"shape": [rows, len(sample.columns)], "rows_estimated": estimated})
+    
+    try:
+        dataset_cache.save_json(filepath, "schema.json", {"params": params, "data": schema})
+    except OSError as e:
+        logger.warning("Não foi possível salvar o esquema em cache: %s", e)
+    return schema
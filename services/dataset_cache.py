@@ -0,0 +1,86 @@
+import os
+import json
+import hashlib
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Bytes lidos do início e do fim do arquivo para compor a impressão digital
+_FINGERPRINT_BLOCK = 1024 * 1024
+
+# Incrementar quando o formato dos artefatos em cache mudar
+CACHE_VERSION = 1
+
+
+# Impressão digital barata do arquivo: tamanho, mtime e o primeiro/último MB.
+# Evita ler um CSV de vários GB inteiro só para saber se o cache ainda vale.
+def dataset_fingerprint(filepath):
+    stat = os.stat(filepath)
+    digest = hashlib.sha256()
+    digest.update(f"{stat.st_size}:{stat.st_mtime_ns}:{CACHE_VERSION}".encode())
+    with open(filepath, "rb") as f:
+        digest.update(f.read(_FINGERPRINT_BLOCK))
+        if stat.st_size > _FINGERPRINT_BLOCK:
+            f.seek(max(stat.st_size - _FINGERPRINT_BLOCK, _FINGERPRINT_BLOCK))
+            digest.update(f.read(_FINGERPRINT_BLOCK))
+    return digest.hexdigest()[:20]
+
+
+# Diretório de cache ao lado do dataset: <pasta>/.cache/<arquivo>.<fingerprint>/
+def cache_dir(filepath, create=True):
+    folder = os.path.dirname(os.path.abspath(filepath))
+    name = f"{os.path.basename(filepath)}.{dataset_fingerprint(filepath)}"
+    path = os.path.join(folder, ".cache", name)
+    if create:
+        os.makedirs(path, exist_ok=True)
+    return path
+
+
+def cache_path(filepath, name):
+    return os.path.join(cache_dir(filepath), name)
+
+
+def load_json(filepath, name):
+    path = os.path.join(cache_dir(filepath, create=False), name)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning("Cache inválido em %s: %s", path, e)
+        return None
+
+
+# Escrita atômica: leitores nunca veem um JSON pela metade
+def save_json(filepath, name, data):
+    path = cache_path(filepath, name)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, default=str)
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_array(filepath, name):
+    import numpy as np
+
+    path = os.path.join(cache_dir(filepath, create=False), name)
+    if not os.path.exists(path):
+        return None
+    try:
+        return np.load(path, allow_pickle=False)
+    except (OSError, ValueError) as e:
+        logger.warning("Cache inválido em %s: %s", path, e)
+        return None
+
+
+def save_array(filepath, name, array):
+    import numpy as np
+
+    path = cache_path(filepath, name)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.save(f, array, allow_pickle=False)
+    os.replace(tmp_path, path)
+    return path
@@ -0,0 +1,250 @@
+import os
+import json
+import logging
+import threading
+from datetime import datetime
+from werkzeug.utils import secure_filename
+from utils.instrumentation import span
+
+logger = logging.getLogger(__name__)
+
+# Datasets acumulados ficam em <UPLOAD_FOLDER>/datasets/<nome>/
+STORE_FOLDER = "datasets"
+MANIFEST_NAME = "dataset.json"
+INDEX_NAME = "row_hashes.npy"
+DEFAULT_DATASET = "principal"
+
+# Um append por vez: o índice de hashes e o manifesto são lidos e regravados inteiros
+_APPEND_LOCK = threading.Lock()
+
+
+def manifest_path(upload_folder, name=DEFAULT_DATASET):
+    name = secure_filename(name or DEFAULT_DATASET) or DEFAULT_DATASET
+    return os.path.join(upload_folder, STORE_FOLDER, name, MANIFEST_NAME)
+
+
+# O caminho do manifesto é o que circula como "arquivo do dataset" no resto da aplicação
+def is_store(path):
+    return os.path.basename(path) == MANIFEST_NAME
+
+
+def load_manifest(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _write_json(path, data):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=4, ensure_ascii=False, default=str)
+    os.replace(tmp_path, path)
+
+
+def _save_index(path, hashes):
+    import numpy as np
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.save(f, hashes, allow_pickle=False)
+    os.replace(tmp_path, path)
+
+
+def row_hashes(df):
+    """Hash de 64 bits por linha (todas as colunas, sem o índice)."""
+    import numpy as np
+    import pandas as pd
+
+    return pd.util.hash_pandas_object(df, index=False).to_numpy(dtype=np.uint64)
+
+
+def raw_row_hashes(csv_path):
+    """
+    Hash de cada linha do arquivo como texto (cabeçalhos normalizados, espaços removidos).
+
+    O hash é feito antes da limpeza porque o preenchimento de ausentes usa a mediana
+    do lote: a mesma linha receberia valores diferentes em lotes diferentes.
+    """
+    from services.data_loader import normalize_columns, read_dataset
+
+    raw = read_dataset(csv_path, as_text=True)
+    raw.columns = normalize_columns(raw.columns)
+    raw = raw[sorted(raw.columns)].apply(lambda col: col.str.strip())
+    return row_hashes(raw)
+
+
+def _align(df, manifest):
+    # As partes Parquet precisam do mesmo esquema: o lote segue os tipos do dataset
+    columns = manifest["columns"]
+    if set(df.columns) != set(columns):
+        raise ValueError(
+            f"Colunas do arquivo não batem com o dataset '{manifest['name']}'. "
+            f"Esperado: {', '.join(columns)}"
+        )
+    from pandas.api.types import is_float_dtype, is_integer_dtype
+
+    df = df[columns].copy()
+    for col, dtype in manifest["dtypes"].items():
+        if str(df[col].dtype) != dtype:
+            incompatible = ValueError(f"Coluna '{col}' incompatível com o tipo do dataset ({dtype})")
+            # astype de float para int trunca (1.5 -> 1) sem erro: só converte valores inteiros
+            if is_integer_dtype(dtype) and is_float_dtype(df[col].dtype) and not (df[col].dropna() % 1 == 0).all():
+                raise incompatible
+            try:
+                df[col] = df[col].astype(dtype)
+            except (TypeError, ValueError):
+                raise incompatible
+    return df
+
+
+def _numeric_stats(df):
+    stats = {}
+    for col in df.select_dtypes(include="number").columns:
+        values = df[col].dropna().astype(float)
+        if values.empty:
+            continue
+        mean = float(values.mean())
+        stats[col] = {
+            "count": int(len(values)),
+            "mean": mean,
+            "m2": float(((values - mean) ** 2).sum()),
+            "min": float(values.min()),
+            "max": float(values.max()),
+        }
+    return stats
+
+
+def _merge_stats(current, new):
+    # Combinação de médias e variâncias por partes (Chan et al.)
+    merged = dict(current)
+    for col, b in new.items():
+        a = current.get(col)
+        if a is None:
+            merged[col] = b
+            continue
+        n = a["count"] + b["count"]
+        delta = b["mean"] - a["mean"]
+        merged[col] = {
+            "count": n,
+            "mean": a["mean"] + delta * b["count"] / n,
+            "m2": a["m2"] + b["m2"] + delta * delta * a["count"] * b["count"] / n,
+            "min": min(a["min"], b["min"]),
+            "max": max(a["max"], b["max"]),
+        }
+    return merged
+
+
+def summary_stats(manifest):
+    """Contagem, média, desvio padrão, mínimo e máximo mantidos a cada append."""
+    return {
+        col: {
+            "count": s["count"],
+            "mean": s["mean"],
+            "std": (s["m2"] / (s["count"] - 1)) ** 0.5 if s["count"] > 1 else 0.0,
+            "min": s["min"],
+            "max": s["max"],
+        }
+        for col, s in manifest.get("stats", {}).items()
+    }
+
+
+def append_csv(upload_folder, csv_path, name=DEFAULT_DATASET):
+    """
+    Limpa apenas o lote novo, descarta as linhas já presentes no dataset (pelo índice
+    ordenado de hashes de 64 bits) e grava o restante como uma nova parte Parquet.
+
+    Returns:
+        Dicionário com o caminho do manifesto e as contagens do lote
+    """
+    import numpy as np
+    from services import profiling
+    from services.data_loader import clean_dataset
+
+    path = manifest_path(upload_folder, name)
+    folder = os.path.dirname(path)
+
+    with _APPEND_LOCK:
+        batch = clean_dataset(csv_path)
+
+        with span("append"):
+            os.makedirs(folder, exist_ok=True)
+            manifest = load_manifest(path) if os.path.exists(path) else None
+            if manifest is None:
+                manifest = {
+                    "name": os.path.basename(folder),
+                    "columns": list(batch.columns),
+                    "dtypes": {col: str(dtype) for col, dtype in batch.dtypes.items()},
+                    "rows": 0,
+                    "parts": [],
+                    "stats": {},
+                    "batches": [],
+                }
+                previous_profile = (0, {})
+            else:
+                batch = _align(batch, manifest)
+                # O estado dos sketches fica no cache da versão atual: lido antes de o manifesto mudar
+                previous_profile = profiling.load_state(path)
+
+            index_path = os.path.join(folder, INDEX_NAME)
+            index = np.load(index_path) if os.path.exists(index_path) else np.empty(0, dtype=np.uint64)
+
+            # clean_dataset preserva o índice original: linha limpa -> linha do arquivo
+            hashes = raw_row_hashes(csv_path)[batch.index.to_numpy()]
+            pos = np.searchsorted(index, hashes)
+            seen = np.zeros(len(hashes), dtype=bool)
+            if len(index):
+                seen = index[np.minimum(pos, len(index) - 1)] == hashes
+            # Repetidas dentro do próprio lote também saem: o drop_duplicates da limpeza roda
+            # antes do strip, e linhas que só diferem por espaços têm o mesmo hash
+            first = np.zeros(len(hashes), dtype=bool)
+            first[np.unique(hashes, return_index=True)[1]] = True
+            keep = first & ~seen
+            new_rows = batch.loc[keep].reset_index(drop=True)
+
+            if len(new_rows):
+                part_name = f"part-{len(manifest['parts']):05d}.parquet"
+                new_rows.to_parquet(os.path.join(folder, part_name), index=False)
+                _save_index(index_path, np.union1d(index, hashes[keep]))
+                manifest["parts"].append(part_name)
+                manifest["rows"] += len(new_rows)
+                manifest["stats"] = _merge_stats(manifest["stats"], _numeric_stats(new_rows))
+
+            result = {
+                "file": os.path.basename(csv_path),
+                "received": int(len(batch)),
+                "duplicates": int(len(batch) - keep.sum()),
+                "added": int(len(new_rows)),
+                "appended_at": datetime.now().isoformat(),
+            }
+            manifest["batches"].append(result)
+            _write_json(path, manifest)
+
+        # Perfil atualizado só com as linhas novas; sem estado anterior, fica para o próximo /api/profile
+        if previous_profile is not None and len(new_rows):
+            profiling.update_state(path, new_rows, previous_profile)
+
+    logger.info(
+        "Append em '%s': %s recebidas, %s duplicadas, %s adicionadas (total %s)",
+        manifest["name"], result["received"], result["duplicates"], result["added"], manifest["rows"]
+    )
+    return {**result, "manifest": path, "dataset": manifest["name"], "total_rows": manifest["rows"]}
+
+
+def iter_parts(path, columns=None):
+    import pandas as pd
+
+    manifest = load_manifest(path)
+    folder = os.path.dirname(path)
+    for part in manifest["parts"]:
+        yield pd.read_parquet(os.path.join(folder, part), columns=columns)
+
+
+def load_store(path, columns=None):
+    """Carrega todas as partes do dataset (já limpas) em um único DataFrame."""
+    import pandas as pd
+
+    with span("read"):
+        frames = list(iter_parts(path, columns))
+    if not frames:
+        manifest = load_manifest(path)
+        return pd.DataFrame(columns=columns or manifest["columns"])
+    return pd.concat(frames, ignore_index=True)
@@ -0,0 +1,243 @@
+import time
+import uuid
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from utils.instrumentation import Counter, Histogram, register
+
+logger = logging.getLogger(__name__)
+
+# Execução em segundo plano: cada job é um DAG de etapas; uma etapa entra na fila
+# do pool assim que todas as dependências terminam.
+
+PENDING = "pending"
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+SKIPPED = "skipped"
+
+
+# Levantada por uma etapa opcional sem o que fazer (ex: mapa sem coordenadas):
+# a etapa termina como SKIPPED e o job não é marcado como falho
+class SkipStage(Exception):
+    pass
+
+
+DEFAULT_MAX_WORKERS = 4
+# Jobs terminados mantidos para consulta (/api/jobs); os mais antigos são descartados
+MAX_FINISHED_JOBS = 100
+
+JOB_STAGES = register(Counter(
+    "job_stages_total",
+    "Etapas de jobs em segundo plano concluídas, por tipo de job, etapa e resultado",
+    labelnames=("kind", "stage", "status")
+))
+JOB_STAGE_SECONDS = register(Histogram(
+    "job_stage_duration_seconds",
+    "Duração das etapas de jobs em segundo plano",
+    labelnames=("kind", "stage")
+))
+
+
+class Stage:
+    """Etapa do DAG: `fn(context)` recebe os resultados das etapas anteriores por nome."""
+
+    def __init__(self, name, fn, deps=()):
+        self.name = name
+        self.fn = fn
+        self.deps = tuple(deps)
+
+
+class Job:
+    def __init__(self, kind, stages, meta):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.meta = meta
+        self.stages = OrderedDict((stage.name, stage) for stage in stages)
+        self.state = OrderedDict(
+            (stage.name, {
+                "status": PENDING, "deps": list(stage.deps), "started_at": None,
+                "finished_at": None, "duration_s": None, "error": None,
+            })
+            for stage in stages
+        )
+        # resultados das etapas (ex: o DataFrame limpo), liberados quando o job termina
+        self.context = {}
+        self.created_at = datetime.now().isoformat()
+        self.finished_at = None
+
+    def finished(self):
+        return all(s["status"] in (DONE, FAILED, SKIPPED) for s in self.state.values())
+
+    def status(self):
+        statuses = [s["status"] for s in self.state.values()]
+        if not self.finished():
+            return RUNNING if any(s != PENDING for s in statuses) else PENDING
+        return FAILED if FAILED in statuses else DONE
+
+    def to_dict(self):
+        done = sum(s["status"] in (DONE, FAILED, SKIPPED) for s in self.state.values())
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status(),
+            "progress": done / len(self.state) if self.state else 1.0,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+            "stages": {name: dict(state) for name, state in self.state.items()},
+            **self.meta,
+        }
+
+
+_lock = threading.Lock()
+_jobs = OrderedDict()
+_pool = {"executor": None, "max_workers": DEFAULT_MAX_WORKERS}
+
+
+def configure(max_workers=DEFAULT_MAX_WORKERS):
+    with _lock:
+        _pool["max_workers"] = max(1, int(max_workers))
+        # jobs já enfileirados terminam no pool antigo
+        if _pool["executor"] is not None:
+            _pool["executor"].shutdown(wait=False)
+            _pool["executor"] = None
+
+
+def _executor():
+    from concurrent.futures import ThreadPoolExecutor
+
+    if _pool["executor"] is None:
+        _pool["executor"] = ThreadPoolExecutor(max_workers=_pool["max_workers"], thread_name_prefix="job")
+    return _pool["executor"]
+
+
+def _check_dag(stages):
+    names = [stage.name for stage in stages]
+    if len(set(names)) != len(names):
+        raise ValueError("Nomes de etapas repetidos no job")
+    deps = {stage.name: set(stage.deps) for stage in stages}
+    unknown = set().union(*deps.values()) - set(names)
+    if unknown:
+        raise ValueError(f"Dependências desconhecidas: {', '.join(sorted(unknown))}")
+    # ordenação topológica: sobra etapa quando há ciclo
+    resolved = set()
+    while len(resolved) < len(names):
+        ready = {name for name, d in deps.items() if name not in resolved and d <= resolved}
+        if not ready:
+            raise ValueError("Dependências circulares entre etapas do job")
+        resolved |= ready
+
+
+# chamado com _lock: enfileira as etapas prontas e pula as que dependem de uma que falhou
+def _schedule(job):
+    changed = True
+    while changed:
+        changed = False
+        for name, state in job.state.items():
+            if state["status"] != PENDING:
+                continue
+            deps = [job.state[d]["status"] for d in job.stages[name].deps]
+            if any(d in (FAILED, SKIPPED) for d in deps):
+                state["status"] = SKIPPED
+                state["error"] = "dependência não concluída"
+                JOB_STAGES.inc(kind=job.kind, stage=name, status=SKIPPED)
+                changed = True
+            elif all(d == DONE for d in deps):
+                state["status"] = QUEUED
+                _executor().submit(_run_stage, job, name)
+
+    if job.finished() and job.finished_at is None:
+        job.finished_at = datetime.now().isoformat()
+        job.context.clear()
+        logger.info("Job %s (%s) terminado: %s", job.id, job.kind, job.status())
+        _evict()
+
+
+def _run_stage(job, name):
+    stage = job.stages[name]
+    with _lock:
+        state = job.state[name]
+        state["status"] = RUNNING
+        state["started_at"] = datetime.now().isoformat()
+        context = dict(job.context)
+
+    start = time.perf_counter()
+    try:
+        result, status, error = stage.fn(context), DONE, None
+    except SkipStage as e:
+        logger.info("Etapa '%s' do job %s pulada: %s", name, job.id, e)
+        result, status, error = None, SKIPPED, str(e)
+    except Exception as e:
+        logger.exception("Etapa '%s' do job %s falhou", name, job.id)
+        result, status, error = None, FAILED, str(e)
+    elapsed = time.perf_counter() - start
+
+    JOB_STAGES.inc(kind=job.kind, stage=name, status=status)
+    JOB_STAGE_SECONDS.observe(elapsed, kind=job.kind, stage=name)
+
+    with _lock:
+        state.update(status=status, error=error, finished_at=datetime.now().isoformat(), duration_s=elapsed)
+        if status == DONE:
+            job.context[name] = result
+        _schedule(job)
+
+
+def _evict():
+    finished = [job_id for job_id, job in _jobs.items() if job.finished_at is not None]
+    for job_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+        del _jobs[job_id]
+
+
+def submit(kind, stages, **meta):
+    """
+    Registra e inicia um job. `meta` (ex: source_path) aparece no status e serve
+    de filtro em latest().
+
+    Returns:
+        Status do job (ver get)
+    """
+    stages = list(stages)
+    _check_dag(stages)
+    job = Job(kind, stages, meta)
+    with _lock:
+        _jobs[job.id] = job
+        _schedule(job)
+        logger.info("Job %s (%s) iniciado: %s", job.id, kind, ", ".join(job.stages))
+        return job.to_dict()
+
+
+def get(job_id):
+    with _lock:
+        job = _jobs.get(job_id)
+        return job.to_dict() if job is not None else None
+
+
+def latest(kind=None, **meta):
+    """Job mais recente do tipo `kind` cujos metadados batem com `meta`."""
+    with _lock:
+        for job in reversed(_jobs.values()):
+            if kind is not None and job.kind != kind:
+                continue
+            if all(job.meta.get(k) == v for k, v in meta.items()):
+                return job.to_dict()
+    return None
+
+
+def list_jobs(kind=None, limit=20):
+    with _lock:
+        jobs = [job for job in reversed(_jobs.values()) if kind is None or job.kind == kind]
+        return [job.to_dict() for job in jobs[:limit]]
+
+
+def wait(job_id, timeout=None):
+    """Bloqueia até o job terminar (ou `timeout` segundos); usado por scripts e benchmarks."""
+    deadline = None if timeout is None else time.monotonic() + timeout
+    while True:
+        status = get(job_id)
+        if status is None or status["status"] in (DONE, FAILED):
+            return status
+        if deadline is not None and time.monotonic() > deadline:
+            return status
+        time.sleep(0.05)
@@ -0,0 +1,224 @@
+import os
+import json
+import time
+import shutil
+import logging
+import threading
+from collections import defaultdict
+from services import model_training
+
+logger = logging.getLogger(__name__)
+
+# Padrões (sobrescritos por configure() a partir do Config)
+DEFAULT_KEEP_LAST = 5
+DEFAULT_MAX_BYTES = 2 * 1024 * 1024 * 1024
+# Arquivos sem metadados mais novos que isso podem ser de um treino ainda gravando
+DEFAULT_ORPHAN_GRACE_SECONDS = 600
+
+_settings = {
+    "keep_last": DEFAULT_KEEP_LAST,
+    "max_bytes": DEFAULT_MAX_BYTES,
+    "orphan_grace_seconds": DEFAULT_ORPHAN_GRACE_SECONDS,
+}
+
+# Uma compactação por vez (disparada após cada treino e pela rota)
+_compact_lock = threading.Lock()
+
+
+def configure(keep_last=DEFAULT_KEEP_LAST, max_bytes=DEFAULT_MAX_BYTES,
+              orphan_grace_seconds=DEFAULT_ORPHAN_GRACE_SECONDS):
+    # keep_last=0 ou max_bytes=0 desligam o respectivo limite
+    _settings["keep_last"] = max(0, int(keep_last))
+    _settings["max_bytes"] = max(0, int(max_bytes))
+    _settings["orphan_grace_seconds"] = max(0.0, float(orphan_grace_seconds))
+
+
+def settings():
+    return dict(_settings)
+
+
+# Modelos do mesmo alvo competem pelas N vagas
+def target_key(metadata):
+    if "regression" in metadata and "classification" in metadata:
+        return f"both:{metadata['regression'].get('target_col')}:{metadata['classification'].get('target_col')}"
+    return f"{metadata.get('model_type')}:{metadata.get('target_col')}"
+
+
+def inventory():
+    """
+    Uma única varredura do MODEL_DIR: modelos (com os bytes de todos os seus arquivos),
+    arquivos órfãos (sem metadata.json) e temporários deixados por gravações interrompidas.
+    """
+    model_dir = model_training.MODEL_DIR
+    files = defaultdict(dict)
+    temporary = []
+    with os.scandir(model_dir) as entries:
+        for entry in entries:
+            if not entry.is_file():
+                continue
+            stat = entry.stat()
+            if entry.name.endswith(".tmp"):
+                temporary.append({"file": entry.name, "bytes": stat.st_size, "mtime": stat.st_mtime})
+                continue
+            model_id, suffix = _split_artifact(entry.name)
+            if model_id is None:
+                continue
+            files[model_id][suffix] = {"file": entry.name, "bytes": stat.st_size, "mtime": stat.st_mtime}
+
+    models, orphans = [], []
+    for model_id, artifacts in files.items():
+        size = sum(a["bytes"] for a in artifacts.values())
+        if "metadata.json" not in artifacts:
+            orphans.append({
+                "model_id": model_id, "files": sorted(a["file"] for a in artifacts.values()), "bytes": size,
+                "mtime": max(a["mtime"] for a in artifacts.values()),
+            })
+            continue
+        try:
+            with open(os.path.join(model_dir, artifacts["metadata.json"]["file"]), "r", encoding="utf-8") as f:
+                metadata = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning("Metadados ilegíveis de %s: %s", model_id, e)
+            continue
+        models.append({
+            "model_id": model_id,
+            "target": target_key(metadata),
+            "timestamp": metadata.get("timestamp", ""),
+            "pinned": bool(metadata.get("pinned")),
+            "bytes": size,
+        })
+
+    models.sort(key=lambda m: (m["timestamp"], m["model_id"]), reverse=True)
+    return {"models": models, "orphans": orphans, "temporary": temporary}
+
+
+def _split_artifact(name):
+    for suffix in model_training.ARTIFACT_SUFFIXES:
+        if name.endswith("_" + suffix):
+            model_id = name[:-len(suffix) - 1]
+            if model_training.MODEL_ID_PATTERN.fullmatch(model_id):
+                return model_id, suffix
+    return None, None
+
+
+def plan(inv, keep_last=None, max_bytes=None):
+    """
+    Decide o que remover: primeiro tudo além dos `keep_last` mais recentes de cada alvo;
+    depois, enquanto o total passar de `max_bytes`, os mais antigos que sobraram.
+    Fixados nunca saem, e o mais recente de cada alvo só sai pelo limite de N.
+
+    Returns:
+        Lista de {"model_id", "reason", "bytes"} na ordem de remoção
+    """
+    keep_last = _settings["keep_last"] if keep_last is None else keep_last
+    max_bytes = _settings["max_bytes"] if max_bytes is None else max_bytes
+
+    remove = []
+    kept = []
+    per_target = defaultdict(int)
+    for model in inv["models"]:  # mais recente primeiro
+        per_target[model["target"]] += 1
+        model = dict(model, rank=per_target[model["target"]])
+        if not model["pinned"] and keep_last and model["rank"] > keep_last:
+            remove.append({"model_id": model["model_id"], "reason": "retention", "bytes": model["bytes"]})
+        else:
+            kept.append(model)
+
+    if max_bytes:
+        total = sum(m["bytes"] for m in kept)
+        for model in reversed(kept):  # mais antigo primeiro
+            if total <= max_bytes:
+                break
+            if model["pinned"] or model["rank"] == 1:
+                continue
+            remove.append({"model_id": model["model_id"], "reason": "budget", "bytes": model["bytes"]})
+            total -= model["bytes"]
+        if total > max_bytes:
+            logger.warning(
+                "Modelos fixados/mais recentes ocupam %s bytes, acima do limite de %s", total, max_bytes
+            )
+    return remove
+
+
+def compact(dry_run=False, keep_last=None, max_bytes=None):
+    """
+    Aplica a política de retenção e recolhe órfãos, temporários e restos da lixeira.
+
+    Returns:
+        Relatório com o que foi (ou seria, em dry_run) removido e os bytes antes/depois
+    """
+    if not _compact_lock.acquire(blocking=False):
+        return {"skipped": True, "reason": "compactação já em andamento"}
+    try:
+        inv = inventory()
+        removals = plan(inv, keep_last=keep_last, max_bytes=max_bytes)
+        grace = _settings["orphan_grace_seconds"]
+        now = time.time()
+        orphans = [o for o in inv["orphans"] if now - o["mtime"] > grace]
+        temporary = [t for t in inv["temporary"] if now - t["mtime"] > grace]
+
+        bytes_before = (
+            sum(m["bytes"] for m in inv["models"]) + sum(o["bytes"] for o in inv["orphans"])
+            + sum(t["bytes"] for t in inv["temporary"])
+        )
+        freed = sum(r["bytes"] for r in removals) + sum(o["bytes"] for o in orphans) + sum(t["bytes"] for t in temporary)
+
+        if not dry_run:
+            model_dir = model_training.MODEL_DIR
+            # órfãos saem pela mesma remoção: são modelos cujo metadata.json não existe
+            for model_id in [r["model_id"] for r in removals] + [o["model_id"] for o in orphans]:
+                try:
+                    model_training.delete_model(model_id)
+                except FileNotFoundError:
+                    pass  # removido em paralelo (DELETE /models/<id>)
+            for tmp in temporary:
+                try:
+                    os.remove(os.path.join(model_dir, tmp["file"]))
+                except FileNotFoundError:
+                    pass
+            # lixeira de remoções interrompidas
+            shutil.rmtree(os.path.join(model_dir, model_training.TRASH_FOLDER), ignore_errors=True)
+
+        if removals or orphans or temporary:
+            logger.info(
+                "Compactação%s: %s modelos, %s órfãos, %s temporários, %s bytes",
+                " (simulação)" if dry_run else "", len(removals), len(orphans), len(temporary), freed
+            )
+        return {
+            "dry_run": dry_run,
+            "settings": settings(),
+            "removed": removals,
+            "orphans": [o["model_id"] for o in orphans],
+            "temporary": [t["file"] for t in temporary],
+            "bytes_before": bytes_before,
+            "bytes_after": bytes_before - freed,
+            "models_kept": len(inv["models"]) - len(removals),
+        }
+    finally:
+        _compact_lock.release()
+
+
+def usage():
+    inv = inventory()
+    return {
+        "settings": settings(),
+        "models": len(inv["models"]),
+        "pinned": sum(m["pinned"] for m in inv["models"]),
+        "bytes": sum(m["bytes"] for m in inv["models"]),
+        "orphan_bytes": sum(o["bytes"] for o in inv["orphans"]) + sum(t["bytes"] for t in inv["temporary"]),
+        "targets": dict(sorted(_count_targets(inv["models"]).items())),
+    }
+
+
+def _count_targets(models):
+    counts = defaultdict(int)
+    for model in models:
+        counts[model["target"]] += 1
+    return counts
+
+
+# Compactação em segundo plano (após cada treino)
+def schedule():
+    from services import jobs
+
+    return jobs.submit("retention", [jobs.Stage("compact", lambda ctx: compact())])
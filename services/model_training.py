@@ -1,37 +1,73 @@
 import json
 import os
-import joblib
+import re
+import copy
+import shutil
+import logging
+import threading
 from datetime import datetime
 from pathlib import Path
 from services.data_loader import load_csv
+from services import prediction_cache
+from utils.instrumentation import span, memory_profile as _memory_profile
 
-from ml.ml_module import (
-    train_regression_model,
-    train_classification_model,
-    train_all_models,
-    predict_regression,
-    predict_classification
-)
+# joblib e ml.ml_module (sklearn) são importados dentro das funções:
+# importar este módulo não deve carregar o subsistema de ML inteiro
 
 # MODEL_DIR deve estar no diretório backend
 BACKEND_DIR = Path(__file__).resolve().parent.parent
 MODEL_DIR = BACKEND_DIR / "models"
 MODEL_DIR.mkdir(exist_ok=True)
 
-# Treina um modelo de machine learning usando o ml_module.py
+logger = logging.getLogger(__name__)
+
+# Arquivos de um modelo: <model_id>_<sufixo>; o metadata.json é o que torna o modelo visível.
+# O id é model_<data>_<hora>_<microssegundos>_<aleatório>: treinos concorrentes no mesmo
+# segundo não se sobrescrevem (ids antigos, só até o segundo, continuam válidos)
+MODEL_ID_PATTERN = re.compile(r"model_\d{8}_\d{6}(?:_\d{6}_[0-9a-f]{6})?")
+ARTIFACT_SUFFIXES = ("metadata.json", "regression.pkl", "classification.pkl", "encoder.pkl")
+TRASH_FOLDER = ".trash"
+
+# Importância por permutação: "background" (padrão, job após o treino), "sync" ou "none"
+IMPORTANCE_MODES = ("background", "sync", "none")
+
+# Serializa as regravações de metadados (jobs de importância, pins, remoção)
+_METADATA_LOCK = threading.Lock()
+
+# Modelos mantidos em memória pelo modo de serving (preload_models).
+# Chave: model_id -> (assinatura do metadata, model, metadata, label_encoder)
+_MODEL_CACHE = {}
+
+# Treina um modelo de machine learning usando o ml_module.py.
+# memory_profile=True grava nos metadados o pico/saldo de memória de cada etapa (tracemalloc)
 def train_model(csv_path, model_type="regression", target_col=None, 
-                algorithm="rf", params=None, test_size=0.2, random_state=42):
+                algorithm="rf", params=None, test_size=0.2, random_state=42,
+                sample_first=None, cv_folds=None, importance=None, memory_profile=False):
+    with _memory_profile(memory_profile) as memory:
+        return _train_model(
+            csv_path, model_type, target_col, algorithm, params, test_size, random_state,
+            sample_first, cv_folds, importance, memory
+        )
+
+
+def _train_model(csv_path, model_type, target_col, algorithm, params, test_size, random_state,
+                 sample_first, cv_folds, importance, memory):
+    import joblib
+    from ml.ml_module import train_regression_model, train_classification_model
+
+    importance = _resolve_importance(importance)
+
     if not os.path.exists(csv_path):
         raise FileNotFoundError("Arquivo CSV não encontrado para treinamento.")
 
     df = load_csv(csv_path)
-    
+
     if target_col is None:
         raise ValueError("target_col é obrigatório para treinamento.")
-    
+
     # Normaliza o nome da coluna target (mesmo padrão usado no load_csv)
     target_col_normalized = target_col.strip().lower().replace(' ', '_').replace('-', '_')
-    
+
     if target_col_normalized not in df.columns:
         # Lista colunas disponíveis para ajudar no debug
         available_cols = ', '.join(df.columns.tolist()[:10])  # Mostra até 10 colunas
@@ -39,17 +75,23 @@ def train_model(csv_path, model_type="regression", target_col=None,
             f"Coluna '{target_col}' (normalizada: '{target_col_normalized}') não encontrada no DataFrame. "
             f"Colunas disponíveis: {available_cols}{'...' if len(df.columns) > 10 else ''}"
         )
-    
+
     # Usa a coluna normalizada
     target_col = target_col_normalized
 
     timestamp = datetime.now().isoformat()
-    model_id = f"model_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-    
+    model_id = _new_model_id()
+
     try:
         if model_type == "regression":
             # Mapeia algoritmo para formato do ml_module
-            ml_algorithm = "rf" if algorithm == "rf" or algorithm == "random_forest_reg" else "linreg"
+            algorithm_map = {
+                "rf": "rf",
+                "random_forest_reg": "rf",
+                "hgb": "hgb",
+                "hist_gradient_boosting": "hgb"
+            }
+            ml_algorithm = algorithm_map.get(algorithm, "linreg")
             
             result = train_regression_model(
                 df=df,
@@ -57,12 +99,15 @@ def train_model(csv_path, model_type="regression", target_col=None,
                 model_type=ml_algorithm,
                 params=params,
                 test_size=test_size,
-                random_state=random_state
+                random_state=random_state,
+                sample_first=sample_first,
+                cv_folds=cv_folds
             )
             
             # Salva o modelo
             model_path = MODEL_DIR / f"{model_id}_regression.pkl"
-            joblib.dump(result["model"], model_path)
+            with span("dump"):
+                joblib.dump(result["model"], model_path)
             
             # Salva metadados
             metadata = {
@@ -78,7 +123,10 @@ def train_model(csv_path, model_type="regression", target_col=None,
                 "n_samples_train": result["n_samples_train"],
                 "n_samples_test": result["n_samples_test"],
                 "y_test_sample": result.get("y_test_sample", []),
-                "y_pred_sample": result.get("y_pred_sample", [])
+                "y_pred_sample": result.get("y_pred_sample", []),
+                "learning_curve": result.get("learning_curve"),
+                "cross_validation": result.get("cross_validation"),
+                "boosting": result.get("boosting")
             }
             
         elif model_type == "classification":
@@ -88,7 +136,9 @@ def train_model(csv_path, model_type="regression", target_col=None,
                 "random_forest": "rf",
                 "logreg": "logreg",
                 "logistic_regression": "logreg",
-                "knn": "knn"
+                "knn": "knn",
+                "hgb": "hgb",
+                "hist_gradient_boosting": "hgb"
             }
             ml_algorithm = algorithm_map.get(algorithm, "rf")
             
@@ -98,14 +148,17 @@ def train_model(csv_path, model_type="regression", target_col=None,
                 model_type=ml_algorithm,
                 params=params,
                 test_size=test_size,
-                random_state=random_state
+                random_state=random_state,
+                sample_first=sample_first,
+                cv_folds=cv_folds
             )
             
             # Salva o modelo e o label encoder
             model_path = MODEL_DIR / f"{model_id}_classification.pkl"
             encoder_path = MODEL_DIR / f"{model_id}_encoder.pkl"
-            joblib.dump(result["model"], model_path)
-            joblib.dump(result["label_encoder"], encoder_path)
+            with span("dump"):
+                joblib.dump(result["model"], model_path)
+                joblib.dump(result["label_encoder"], encoder_path)
             
             # Salva metadados
             metadata = {
@@ -125,16 +178,27 @@ def train_model(csv_path, model_type="regression", target_col=None,
                 "n_classes": result["n_classes"],
                 "y_test_sample": result.get("y_test_sample", []),
                 "y_pred_sample": result.get("y_pred_sample", []),
-                "y_proba_sample": result.get("y_proba_sample", [])
+                "y_proba_sample": result.get("y_proba_sample", []),
+                "curves": result.get("curves"),
+                "learning_curve": result.get("learning_curve"),
+                "cross_validation": result.get("cross_validation"),
+                "boosting": result.get("boosting")
             }
             
         else:
             raise ValueError(f"model_type '{model_type}' não suportado. Use 'regression' ou 'classification'.")
         
+        # Importância por permutação: calculada agora ou em segundo plano, nunca na consulta
+        importance_sections = [(None, model_type, result)]
+        metadata["feature_importance"] = _importance_placeholder(importance, importance_sections)
+        
+        if memory is not None:
+            metadata["memory_profile"] = memory.to_dict()
+
         # Salva metadados em JSON
-        metadata_path = MODEL_DIR / f"{model_id}_metadata.json"
-        with open(metadata_path, "w", encoding="utf-8") as f:
-            json.dump(metadata, f, indent=4, ensure_ascii=False, default=str)
+        _write_metadata(model_id, metadata)
+        _start_importance_job(model_id, importance, importance_sections)
+        _schedule_retention()
         
         metadata["status"] = "treinado com sucesso"
         return metadata
@@ -147,7 +211,22 @@ def train_model(csv_path, model_type="regression", target_col=None,
 def train_both_models(csv_path, target_reg, target_clf, 
                      reg_algorithm="rf", clf_algorithm="rf",
                      reg_params=None, clf_params=None,
-                     test_size=0.2, random_state=42): 
+                     test_size=0.2, random_state=42, sample_first=None,
+                     importance=None, memory_profile=False): 
+    with _memory_profile(memory_profile) as memory:
+        return _train_both_models(
+            csv_path, target_reg, target_clf, reg_algorithm, clf_algorithm, reg_params, clf_params,
+            test_size, random_state, sample_first, importance, memory
+        )
+
+
+def _train_both_models(csv_path, target_reg, target_clf, reg_algorithm, clf_algorithm, reg_params,
+                       clf_params, test_size, random_state, sample_first, importance, memory):
+    import joblib
+    from ml.ml_module import train_all_models
+
+    importance = _resolve_importance(importance)
+
     if not os.path.exists(csv_path):
         raise FileNotFoundError("Arquivo CSV não encontrado para treinamento.")
 
@@ -156,14 +235,14 @@ def train_both_models(csv_path, target_reg, target_clf,
     # Normaliza os nomes das colunas target (mesmo padrão usado no load_csv)
     target_reg_normalized = target_reg.strip().lower().replace(' ', '_').replace('-', '_')
     target_clf_normalized = target_clf.strip().lower().replace(' ', '_').replace('-', '_')
-    
+
     if target_reg_normalized not in df.columns:
         available_cols = ', '.join(df.columns.tolist()[:10])
         raise ValueError(
             f"Coluna de regressão '{target_reg}' (normalizada: '{target_reg_normalized}') não encontrada. "
             f"Colunas disponíveis: {available_cols}{'...' if len(df.columns) > 10 else ''}"
         )
-    
+
     if target_clf_normalized not in df.columns:
         available_cols = ', '.join(df.columns.tolist()[:10])
         raise ValueError(
@@ -172,16 +251,24 @@ def train_both_models(csv_path, target_reg, target_clf,
         )
 
     timestamp = datetime.now().isoformat()
-    model_id = f"model_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-    
+    model_id = _new_model_id()
+
     try:
         # Mapeia algoritmos
-        reg_ml_algorithm = "rf" if reg_algorithm == "random_forest_reg" else "linreg"
+        # como antes: só "random_forest_reg" vira rf aqui (o padrão "rf" segue treinando linreg)
+        reg_algorithm_map = {
+            "random_forest_reg": "rf",
+            "hgb": "hgb",
+            "hist_gradient_boosting": "hgb"
+        }
+        reg_ml_algorithm = reg_algorithm_map.get(reg_algorithm, "linreg")
         
         algorithm_map = {
             "random_forest": "rf",
             "logistic_regression": "logreg",
-            "knn": "knn"
+            "knn": "knn",
+            "hgb": "hgb",
+            "hist_gradient_boosting": "hgb"
         }
         clf_ml_algorithm = algorithm_map.get(clf_algorithm, "rf")
         
@@ -194,7 +281,8 @@ def train_both_models(csv_path, target_reg, target_clf,
             reg_params=reg_params,
             clf_params=clf_params,
             test_size=test_size,
-            random_state=random_state
+            random_state=random_state,
+            sample_first=sample_first
         )
         
         # Salva modelos
@@ -202,9 +290,10 @@ def train_both_models(csv_path, target_reg, target_clf,
         clf_model_path = MODEL_DIR / f"{model_id}_classification.pkl"
         clf_encoder_path = MODEL_DIR / f"{model_id}_encoder.pkl"
         
-        joblib.dump(results["regression"]["model"], reg_model_path)
-        joblib.dump(results["classification"]["model"], clf_model_path)
-        joblib.dump(results["classification"]["label_encoder"], clf_encoder_path)
+        with span("dump"):
+            joblib.dump(results["regression"]["model"], reg_model_path)
+            joblib.dump(results["classification"]["model"], clf_model_path)
+            joblib.dump(results["classification"]["label_encoder"], clf_encoder_path)
         
         # Salva metadados
         metadata = {
@@ -216,7 +305,9 @@ def train_both_models(csv_path, target_reg, target_clf,
                 "algorithm": reg_algorithm,
                 "metrics": results["regression"]["metrics"],
                 "n_samples_train": results["regression"]["n_samples_train"],
-                "n_samples_test": results["regression"]["n_samples_test"]
+                "n_samples_test": results["regression"]["n_samples_test"],
+                "learning_curve": results["regression"].get("learning_curve"),
+                "boosting": results["regression"].get("boosting")
             },
             "classification": {
                 "model_path": str(clf_model_path),
@@ -227,13 +318,25 @@ def train_both_models(csv_path, target_reg, target_clf,
                 "classes": results["classification"]["classes_"],
                 "n_samples_train": results["classification"]["n_samples_train"],
                 "n_samples_test": results["classification"]["n_samples_test"],
-                "n_classes": results["classification"]["n_classes"]
+                "n_classes": results["classification"]["n_classes"],
+                "curves": results["classification"].get("curves"),
+                "learning_curve": results["classification"].get("learning_curve"),
+                "boosting": results["classification"].get("boosting")
             }
         }
         
-        metadata_path = MODEL_DIR / f"{model_id}_metadata.json"
-        with open(metadata_path, "w", encoding="utf-8") as f:
-            json.dump(metadata, f, indent=4, ensure_ascii=False, default=str)
+        for section in ("regression", "classification"):
+            sections = [(section, section, results[section])]
+            metadata[section]["feature_importance"] = _importance_placeholder(importance, sections)
+        
+        if memory is not None:
+            metadata["memory_profile"] = memory.to_dict()
+
+        _write_metadata(model_id, metadata)
+        _start_importance_job(model_id, importance, [
+            (section, section, results[section]) for section in ("regression", "classification")
+        ])
+        _schedule_retention()
         
         metadata["status"] = "ambos modelos treinados com sucesso"
         return metadata
@@ -241,22 +344,207 @@ def train_both_models(csv_path, target_reg, target_clf,
     except Exception as e:
         raise RuntimeError(f"Erro ao treinar modelos: {str(e)}") from e
 
-# Carrega um modelo treinado e seus metadados
-def load_model(model_id):
+def _resolve_importance(importance):
+    if importance is None or importance is True:
+        return "background" if importance is None else "sync"
+    if importance is False:
+        return "none"
+    if importance not in IMPORTANCE_MODES:
+        raise ValueError(f"importance deve ser um de: {', '.join(IMPORTANCE_MODES)}")
+    return importance
+
+
+def _compute_importance(task, result):
+    from ml.ml_module import permutation_feature_importance
+
+    try:
+        with span("evaluate"):
+            importance = permutation_feature_importance(
+                result["model"], result["X_test"], result["y_test"],
+                features=result["numeric_features"] + result["categorical_features"],
+                task=task
+            )
+        return {"status": "done", **importance}
+    except Exception as e:
+        logger.warning("Falha ao calcular a importância por permutação: %s", e)
+        return {"status": "error", "error": str(e)}
+
+
+def _importance_placeholder(mode, sections):
+    # modo sync: calcula já; background: marca como pendente até o job terminar
+    if mode == "sync":
+        return _compute_importance(sections[0][1], sections[0][2])
+    if mode == "background":
+        return {"status": "pending"}
+    return None
+
+
+def _start_importance_job(model_id, mode, sections):
+    from services import jobs
+
+    if mode != "background":
+        return
+    # o job guarda só o necessário (modelo e conjunto de teste), não o resultado inteiro;
+    # uma etapa por seção (regressão/classificação), visíveis em /api/jobs
+    stages = []
+    for section, task, result in sections:
+        result = {k: result[k] for k in ("model", "X_test", "y_test", "numeric_features", "categorical_features")}
+        stages.append(jobs.Stage(
+            section or "importance",
+            lambda ctx, section=section, task=task, result=result: _importance_job(model_id, section, task, result),
+        ))
+    jobs.submit("importance", stages, model_id=model_id)
+
+
+def _importance_job(model_id, section, task, result):
+    importance = _compute_importance(task, result)
+    with _METADATA_LOCK:
+        try:
+            metadata = load_metadata(model_id)
+        except FileNotFoundError:
+            logger.warning("Modelo %s removido antes de terminar a importância", model_id)
+            return
+        target = metadata[section] if section else metadata
+        target["feature_importance"] = importance
+        _write_metadata(model_id, metadata)
+    logger.info("Importância por permutação salva para o modelo %s (%s)", model_id, section or task)
+
+
+# Retenção do MODEL_DIR em segundo plano: o modelo recém-treinado é sempre o mais novo do alvo
+def _schedule_retention():
+    from services import model_retention
+
+    model_retention.schedule()
+
+
+# Grava os metadados de forma atômica (leitores nunca veem um JSON pela metade)
+def _write_metadata(model_id, metadata):
+    metadata_path = MODEL_DIR / f"{model_id}_metadata.json"
+    tmp_path = metadata_path.with_name(f"{metadata_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(metadata, f, indent=4, ensure_ascii=False, default=str)
+    os.replace(tmp_path, metadata_path)
+    return metadata_path
+
+
+def _metadata_signature(metadata_path):
+    stat = metadata_path.stat()
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+# Assinatura de todos os arquivos do modelo (metadados + .pkl): muda se qualquer um for regravado
+def _artifact_signature(model_id):
+    signature = []
+    for suffix in ARTIFACT_SUFFIXES:
+        path = MODEL_DIR / f"{model_id}_{suffix}"
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            if suffix == "metadata.json":
+                raise FileNotFoundError(f"Modelo '{model_id}' não encontrado.")
+            continue
+        signature.append((suffix, stat.st_mtime_ns, stat.st_size))
+    return tuple(signature)
+
+
+# Lê apenas os metadados (JSON) de um modelo, sem carregar o .pkl
+def load_metadata(model_id):
+    _check_model_id(model_id)
     metadata_path = MODEL_DIR / f"{model_id}_metadata.json"
-    
+
     if not metadata_path.exists():
         raise FileNotFoundError(f"Modelo '{model_id}' não encontrado.")
-    
+
     with open(metadata_path, "r", encoding="utf-8") as f:
-        metadata = json.load(f)
-    
+        return json.load(f)
+
+
+def _new_model_id():
+    import secrets
+
+    return f"model_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}_{secrets.token_hex(3)}"
+
+
+def _check_model_id(model_id):
+    if not MODEL_ID_PATTERN.fullmatch(model_id or ""):
+        raise FileNotFoundError(f"Modelo '{model_id}' não encontrado.")
+
+
+# Modelos fixados nunca são removidos pela política de retenção
+def set_pinned(model_id, pinned=True):
+    _check_model_id(model_id)
+    with _METADATA_LOCK:
+        metadata = load_metadata(model_id)
+        metadata["pinned"] = bool(pinned)
+        _write_metadata(model_id, metadata)
+    return metadata
+
+
+def delete_model(model_id):
+    """
+    Remove os arquivos do modelo. O metadata.json sai primeiro (com um os.replace para a
+    lixeira), então o modelo some de list_models de uma vez; se o processo cair no meio,
+    os .pkl que sobrarem viram órfãos e são recolhidos pela compactação.
+
+    Returns:
+        Bytes liberados
+    """
+    _check_model_id(model_id)
+    trash = MODEL_DIR / TRASH_FOLDER / model_id
+    trash.mkdir(parents=True, exist_ok=True)
+    freed, moved = 0, 0
+    with _METADATA_LOCK:
+        for suffix in ARTIFACT_SUFFIXES:
+            path = MODEL_DIR / f"{model_id}_{suffix}"
+            try:
+                freed += path.stat().st_size
+                os.replace(path, trash / path.name)
+                moved += 1
+            except FileNotFoundError:
+                continue
+    shutil.rmtree(trash, ignore_errors=True)
+    if not moved:
+        raise FileNotFoundError(f"Modelo '{model_id}' não encontrado.")
+
+    _MODEL_CACHE.pop(model_id, None)
+    prediction_cache.invalidate(model_id)
+    logger.info("Modelo %s removido (%s bytes)", model_id, freed)
+    return freed
+
+
+# Carrega um modelo treinado e seus metadados
+def load_model(model_id):
+    with span("load"):
+        cached = _MODEL_CACHE.get(model_id)
+        if cached is not None:
+            signature, model, metadata, label_encoder = cached
+            try:
+                current = _metadata_signature(MODEL_DIR / f"{model_id}_metadata.json")
+            except FileNotFoundError:
+                current = None
+            if current == signature:
+                # cópia: quem chama pode alterar o dict (ex: remover caminhos)
+                return model, copy.deepcopy(metadata), label_encoder
+            _MODEL_CACHE.pop(model_id, None)
+            if current is not None:
+                # metadados regravados (ex: fixação, importância): recarrega e continua pré-carregado
+                model, metadata, label_encoder = _load_model(model_id)
+                _MODEL_CACHE[model_id] = (current, model, metadata, label_encoder)
+                return model, copy.deepcopy(metadata), label_encoder
+        return _load_model(model_id)
+
+
+def _load_model(model_id):
+    import joblib
+
+    metadata = load_metadata(model_id)
+
     model_path = Path(metadata.get("model_path", metadata.get("regression", {}).get("model_path")))
     if not model_path.exists():
         raise FileNotFoundError(f"Arquivo do modelo não encontrado: {model_path}")
-    
+
     model = joblib.load(model_path)
-    
+
     # Se for classificação, carrega também o encoder
     label_encoder = None
     if metadata.get("model_type") == "classification":
@@ -267,71 +555,162 @@ def load_model(model_id):
         encoder_path = Path(metadata["classification"].get("encoder_path"))
         if encoder_path.exists():
             label_encoder = joblib.load(encoder_path)
-    
+
     return model, metadata, label_encoder
 
 
 #Faz predições usando um modelo treinado
-def predict_with_model(model_id, data, model_type=None):
+def predict_with_model(model_id, data, model_type=None, use_cache=True):
     import pandas as pd
-    
+
+    # Payloads repetidos (dict) são respondidos pelo cache enquanto o artefato não mudar
+    cache_key = None
+    if use_cache and isinstance(data, dict) and prediction_cache.enabled():
+        signature = _artifact_signature(model_id)
+        cache_key = prediction_cache.feature_key(data, model_type)
+        cached = prediction_cache.get(model_id, signature, cache_key)
+        if cached is not None:
+            return cached
+
     model, metadata, label_encoder = load_model(model_id)
-    
+
     # Converte dict para DataFrame se necessário
     if isinstance(data, dict):
         data = pd.DataFrame([data])
     elif not isinstance(data, pd.DataFrame):
         raise TypeError("data deve ser um DataFrame ou dicionário")
-    
+
     # Detecta tipo do modelo se não fornecido
     if model_type is None:
         model_type = metadata.get("model_type")
         if model_type is None and "regression" in metadata:
             # Modelo com ambos os tipos
             raise ValueError("model_type deve ser especificado quando o modelo tem ambos os tipos")
-    
+
     try:
-        if model_type == "regression":
-            predictions = predict_regression(model, data)
-            return {
-                "predictions": predictions.tolist() if hasattr(predictions, 'tolist') else predictions,
-                "model_type": "regression",
-                "model_id": model_id
-            }
-        elif model_type == "classification":
-            predictions = predict_classification(
-                model, 
-                data, 
-                label_encoder=label_encoder,
-                return_proba=True
-            )
-            # Adiciona classes do metadata
-            classes = metadata.get("classes", [])
-            return {
-                **predictions,
-                "model_type": "classification",
-                "model_id": model_id,
-                "classes": classes
-            }
-        else:
-            raise ValueError(f"model_type '{model_type}' não suportado")
-            
+        with span("predict"):
+            result = _predict(model, metadata, label_encoder, model_id, data, model_type)
     except Exception as e:
         raise RuntimeError(f"Erro ao fazer predições: {str(e)}") from e
 
+    if cache_key is not None:
+        prediction_cache.put(model_id, signature, cache_key, result)
+    return result
+
+
+def _predict(model, metadata, label_encoder, model_id, data, model_type):
+    from ml.ml_module import predict_regression, predict_classification
+
+    if model_type == "regression":
+        predictions = predict_regression(model, data)
+        return {
+            "predictions": predictions.tolist() if hasattr(predictions, 'tolist') else predictions,
+            "model_type": "regression",
+            "model_id": model_id
+        }
+    elif model_type == "classification":
+        predictions = predict_classification(
+            model, 
+            data, 
+            label_encoder=label_encoder,
+            return_proba=True
+        )
+        # Adiciona classes do metadata
+        classes = metadata.get("classes", [])
+        return {
+            **predictions,
+            "model_type": "classification",
+            "model_id": model_id,
+            "classes": classes
+        }
+    else:
+        raise ValueError(f"model_type '{model_type}' não suportado")
+
+
+# Pré-carrega modelos em memória (usado pelo modo de serving antes do fork dos workers)
+def preload_models(model_ids=None, latest=None):
+    if model_ids is None:
+        model_ids = [m["model_id"] for m in list_models() if m.get("model_id")]
+        if latest is not None:
+            model_ids = model_ids[:latest]
+
+    loaded = []
+    for model_id in model_ids:
+        try:
+            metadata_path = MODEL_DIR / f"{model_id}_metadata.json"
+            signature = _metadata_signature(metadata_path)
+            model, metadata, label_encoder = _load_model(model_id)
+            _MODEL_CACHE[model_id] = (signature, model, metadata, label_encoder)
+            loaded.append(model_id)
+        except Exception as e:
+            logger.warning("Não foi possível pré-carregar o modelo %s: %s", model_id, e)
+
+    return loaded
+
+
+# Extrai as features esperadas por um modelo a partir dos metadados
+def get_model_feature_lists(metadata, model_type):
+    if "regression" in metadata and "classification" in metadata:
+        section = metadata.get("regression" if model_type == "regression" else "classification", {})
+        return section.get("numeric_features", []), section.get("categorical_features", [])
+    return metadata.get("numeric_features", []), metadata.get("categorical_features", [])
+
+
 # Lista todos os modelos treinados
 def list_models():
     models = []
-    
+
     for metadata_file in MODEL_DIR.glob("*_metadata.json"):
         try:
             with open(metadata_file, "r", encoding="utf-8") as f:
                 metadata = json.load(f)
                 models.append(metadata)
         except Exception as e:
-            print(f"Erro ao carregar {metadata_file}: {e}")
-    
+            logger.warning("Erro ao carregar %s: %s", metadata_file, e)
+
     # Ordena por timestamp (mais recente primeiro)
     models.sort(key=lambda x: x.get("timestamp", ""), reverse=True)
-    
+
     return models
+
+
+def memory_summary(model_type=None):
+    """
+    Agrega os perfis de memória gravados nos metadados (treinos com memory_profile=True):
+    por etapa, o maior pico (e de qual modelo), a mediana dos picos e o saldo médio.
+    """
+    import numpy as np
+
+    per_stage = {}
+    profiled = 0
+    for metadata in list_models():
+        profile = metadata.get("memory_profile")
+        if not profile:
+            continue
+        kind = metadata.get("model_type") or "both"
+        if model_type and kind != model_type:
+            continue
+        profiled += 1
+        stages = dict(profile.get("stages", {}))
+        if profile.get("total"):
+            stages["total"] = profile["total"]
+        for stage, values in stages.items():
+            entry = per_stage.setdefault(stage, {"peaks": [], "nets": [], "max_model": None})
+            if not entry["peaks"] or values["peak_mb"] > max(entry["peaks"]):
+                entry["max_model"] = metadata.get("model_id")
+            entry["peaks"].append(values["peak_mb"])
+            entry["nets"].append(values["net_mb"])
+
+    return {
+        "models_profiled": profiled,
+        "stages": {
+            stage: {
+                "models": len(entry["peaks"]),
+                "peak_mb_max": round(float(np.max(entry["peaks"])), 3),
+                "peak_mb_median": round(float(np.median(entry["peaks"])), 3),
+                "net_mb_mean": round(float(np.mean(entry["nets"])), 3),
+                "peak_mb_max_model_id": entry["max_model"],
+            }
+            for stage, entry in per_stage.items()
+        },
+    }
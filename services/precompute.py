@@ -0,0 +1,85 @@
+import os
+import logging
+from services import jobs
+from services.dataset_cache import dataset_fingerprint
+
+logger = logging.getLogger(__name__)
+
+JOB_KIND = "precompute"
+PLOTS_DIR = os.path.join("static", "plots")
+MAP_NAME = "mapa_vendas.html"
+
+
+# Um mapa por versão do dataset: a página nunca mostra o mapa do upload anterior
+def map_dir(source_path):
+    return os.path.join(PLOTS_DIR, "maps", dataset_fingerprint(source_path))
+
+
+def map_path(source_path):
+    return os.path.join(map_dir(source_path), MAP_NAME)
+
+
+def _build_map(df, source_path):
+    from services.visualization_service import generate_map
+
+    # generate_sales_map renomeia as colunas do df recebido: cópia rasa, o df é compartilhado
+    plots = generate_map(df.copy(deep=False), map_dir(source_path))
+    if not plots:
+        # o mapa é opcional (ex: sem coordenadas das cidades): a etapa é pulada, não falha,
+        # e a página deixa de esperar por ele
+        raise jobs.SkipStage("Mapa não gerado (veja o log)")
+    return plots
+
+
+def build_stages(source_path, export_png=False, plots_dir=PLOTS_DIR):
+    """
+    DAG do pré-processamento de um upload. O esquema e o perfil leem o arquivo por conta
+    própria; as demais etapas partem do DataFrame limpo e rodam em paralelo entre si.
+    """
+    from services import aggregates, profiling
+    from services.data_loader import load_csv, sniff_schema
+    from services.visualization_service import generate_visualizations
+
+    stages = [
+        jobs.Stage("clean", lambda ctx: load_csv(source_path)),
+        jobs.Stage("schema", lambda ctx: sniff_schema(source_path)),
+        jobs.Stage("profile", lambda ctx: profiling.get_profile(source_path)),
+        jobs.Stage("stats", lambda ctx: aggregates.get_stats(ctx["clean"], source_path), deps=("clean",)),
+        jobs.Stage("histograms", lambda ctx: aggregates.get_histograms(ctx["clean"], source_path), deps=("clean",)),
+        jobs.Stage("correlation", lambda ctx: aggregates.get_correlation(ctx["clean"], source_path), deps=("clean",)),
+        jobs.Stage("city_counts", lambda ctx: aggregates.get_city_counts(ctx["clean"], source_path), deps=("clean",)),
+        jobs.Stage("map", lambda ctx: _build_map(ctx["clean"], source_path), deps=("clean",)),
+    ]
+    if export_png:
+        # os PNGs reaproveitam os histogramas e a correlação já em cache; o mapa fica com a etapa "map"
+        stages.append(jobs.Stage(
+            "plots",
+            lambda ctx: generate_visualizations(
+                ctx["clean"].copy(), plots_dir, source_path=source_path, include_map=False
+            ),
+            deps=("clean", "histograms", "correlation"),
+        ))
+    return stages
+
+
+def start(source_path, export_png=False):
+    """
+    Enfileira o pré-processamento do arquivo recém-enviado. Um job ainda válido para a
+    mesma versão do arquivo é reaproveitado em vez de repetir o trabalho.
+
+    Returns:
+        Status do job (ver jobs.get)
+    """
+    fingerprint = dataset_fingerprint(source_path)
+    current = jobs.latest(JOB_KIND, source_path=source_path, fingerprint=fingerprint)
+    if current is not None and current["status"] != jobs.FAILED:
+        return current
+    return jobs.submit(
+        JOB_KIND, build_stages(source_path, export_png=export_png),
+        source_path=source_path, fingerprint=fingerprint, file=os.path.basename(source_path)
+    )
+
+
+# Job da versão atual do arquivo (None se o upload não passou pelo pré-processamento)
+def current(source_path):
+    return jobs.latest(JOB_KIND, source_path=source_path, fingerprint=dataset_fingerprint(source_path))
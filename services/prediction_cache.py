@@ -0,0 +1,135 @@
+import copy
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from utils.instrumentation import Counter, register
+
+# Padrões (sobrescritos por configure() a partir do Config)
+DEFAULT_MAX_ENTRIES = 1000
+DEFAULT_TTL_SECONDS = 300
+
+CACHE_REQUESTS = register(Counter(
+    "prediction_cache_requests_total",
+    "Consultas ao cache de predições por modelo e resultado (hit/miss)",
+    labelnames=("model_id", "result")
+))
+CACHE_EVICTIONS = register(Counter(
+    "prediction_cache_evictions_total",
+    "Entradas removidas do cache de predições por motivo (lru/ttl/invalidated)",
+    labelnames=("reason",)
+))
+
+
+class _ModelEntries:
+    """Resultados em cache de um modelo, válidos enquanto a assinatura do artefato não mudar."""
+
+    def __init__(self, signature):
+        self.signature = signature
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+
+_lock = threading.Lock()
+_models = {}
+_settings = {"max_entries": DEFAULT_MAX_ENTRIES, "ttl_seconds": DEFAULT_TTL_SECONDS}
+
+
+def configure(max_entries=DEFAULT_MAX_ENTRIES, ttl_seconds=DEFAULT_TTL_SECONDS):
+    # max_entries=0 desliga o cache
+    with _lock:
+        _settings["max_entries"] = int(max_entries)
+        _settings["ttl_seconds"] = float(ttl_seconds)
+        if not enabled():
+            _models.clear()
+
+
+def enabled():
+    return _settings["max_entries"] > 0
+
+
+def feature_key(features, model_type):
+    """Hash canônico do payload: mesma chave para o mesmo dict, qualquer que seja a ordem das chaves."""
+    payload = json.dumps(
+        {"model_type": model_type, "features": features},
+        sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str
+    )
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def get(model_id, signature, key):
+    now = time.monotonic()
+    with _lock:
+        cached = _models.get(model_id)
+        if cached is not None and cached.signature != signature:
+            # Artefato do modelo mudou: descarta tudo o que foi calculado com o anterior
+            CACHE_EVICTIONS.inc(len(cached.entries), reason="invalidated")
+            cached = None
+            del _models[model_id]
+        if cached is None:
+            cached = _models[model_id] = _ModelEntries(signature)
+
+        entry = cached.entries.get(key)
+        if entry is not None and entry[0] < now:
+            del cached.entries[key]
+            CACHE_EVICTIONS.inc(reason="ttl")
+            entry = None
+
+        if entry is None:
+            cached.misses += 1
+            CACHE_REQUESTS.inc(model_id=model_id, result="miss")
+            return None
+
+        cached.entries.move_to_end(key)
+        cached.hits += 1
+        CACHE_REQUESTS.inc(model_id=model_id, result="hit")
+        value = entry[1]
+
+    # cópia: quem chama pode alterar o resultado (ex: jsonify não altera, mas outros podem)
+    return copy.deepcopy(value)
+
+
+def put(model_id, signature, key, value):
+    with _lock:
+        cached = _models.get(model_id)
+        if cached is None or cached.signature != signature:
+            return
+        cached.entries[key] = (time.monotonic() + _settings["ttl_seconds"], copy.deepcopy(value))
+        cached.entries.move_to_end(key)
+        while len(cached.entries) > _settings["max_entries"]:
+            cached.entries.popitem(last=False)
+            CACHE_EVICTIONS.inc(reason="lru")
+
+
+def invalidate(model_id=None):
+    with _lock:
+        if model_id is None:
+            _models.clear()
+        else:
+            _models.pop(model_id, None)
+
+
+def stats():
+    with _lock:
+        models = {
+            model_id: {
+                "entries": len(cached.entries),
+                "hits": cached.hits,
+                "misses": cached.misses,
+                "hit_rate": cached.hits / (cached.hits + cached.misses) if cached.hits + cached.misses else None,
+            }
+            for model_id, cached in _models.items()
+        }
+    hits = sum(m["hits"] for m in models.values())
+    misses = sum(m["misses"] for m in models.values())
+    return {
+        "enabled": enabled(),
+        "max_entries_per_model": _settings["max_entries"],
+        "ttl_seconds": _settings["ttl_seconds"],
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": hits / (hits + misses) if hits + misses else None,
+        "models": models,
+    }
@@ -0,0 +1,427 @@
+import base64
+import logging
+from services import dataset_cache
+from utils.instrumentation import span
+
+logger = logging.getLogger(__name__)
+
+# Linhas lidas por bloco: limita a memória da varredura independentemente do tamanho do arquivo
+CHUNK_ROWS = 200_000
+# HyperLogLog com 2^12 registradores: ~1,6% de erro padrão na contagem de distintos
+HLL_PRECISION = 12
+# Contadores mantidos pelo Space-Saving (top-k aproximado)
+TOPK_CAPACITY = 256
+TOPK_REPORT = 20
+# Capacidade de cada nível do sketch de quantis (KLL simplificado)
+QUANTILE_K = 512
+QUANTILES = (0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99)
+
+
+class HyperLogLog:
+    """Contagem aproximada de valores distintos a partir de hashes de 64 bits."""
+
+    def __init__(self, p=HLL_PRECISION, registers=None):
+        import numpy as np
+
+        self.p = p
+        self.m = 1 << p
+        self.registers = np.zeros(self.m, dtype=np.uint8) if registers is None else registers
+
+    def add_hashes(self, hashes):
+        import numpy as np
+
+        if len(hashes) == 0:
+            return
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        idx = (hashes >> np.uint64(64 - self.p)).astype(np.intp)
+        # Posição do primeiro bit 1 nos 32 bits seguintes ao índice (frexp é exato para uint32)
+        top = ((hashes << np.uint64(self.p)) >> np.uint64(32)).astype(np.float64)
+        rank = (33 - np.frexp(top)[1]).astype(np.uint8)
+        np.maximum.at(self.registers, idx, rank)
+
+    def merge(self, other):
+        import numpy as np
+
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def count(self):
+        import numpy as np
+
+        alpha = 0.7213 / (1 + 1.079 / self.m)
+        estimate = alpha * self.m ** 2 / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        # Correção para cardinalidades pequenas (linear counting)
+        if estimate <= 2.5 * self.m and zeros:
+            estimate = self.m * np.log(self.m / zeros)
+        return int(round(estimate))
+
+    @property
+    def relative_error(self):
+        return 1.04 / self.m ** 0.5
+
+    def to_dict(self):
+        return {"p": self.p, "registers": base64.b64encode(self.registers.tobytes()).decode("ascii")}
+
+    @classmethod
+    def from_dict(cls, data):
+        import numpy as np
+
+        registers = np.frombuffer(base64.b64decode(data["registers"]), dtype=np.uint8).copy()
+        return cls(p=data["p"], registers=registers)
+
+
+class SpaceSaving:
+    """
+    Top-k aproximado (heavy hitters) com memória limitada a `capacity` contadores.
+
+    As contagens são estimativas por cima: contagem - erro <= valor real <= contagem.
+    Qualquer valor com frequência real acima de `floor` está garantidamente no resumo.
+    """
+
+    def __init__(self, capacity=TOPK_CAPACITY, counts=None, errors=None, floor=0):
+        self.capacity = capacity
+        self.counts = dict(counts or {})
+        self.errors = dict(errors or {})
+        self.floor = floor
+
+    def update(self, value_counts):
+        import pandas as pd
+
+        # value_counts: contagens exatas do bloco atual (valor -> ocorrências)
+        counts = pd.Series(self.counts, dtype="int64")
+        errors = pd.Series(self.errors, dtype="int64")
+        incoming = value_counts.astype("int64")
+        known = incoming.index.isin(counts.index)
+        new = incoming[~known]
+
+        counts = counts.add(incoming[known], fill_value=0)
+        if len(new):
+            # Um valor fora do resumo pode ter aparecido até `floor` vezes antes
+            new_errors = pd.Series(self.floor, index=new.index, dtype="int64")
+            # concat com Series vazia gera FutureWarning no pandas: só concatena se houver o que juntar
+            if len(counts):
+                counts = pd.concat([counts, new + self.floor])
+                errors = pd.concat([errors, new_errors])
+            else:
+                counts, errors = new + self.floor, new_errors
+        self._store(counts, errors, self.floor)
+
+    def merge(self, other):
+        import pandas as pd
+
+        # Valores ausentes de um dos resumos contam com o piso daquele resumo
+        index = pd.Index(list(self.counts)).union(pd.Index(list(other.counts)))
+        counts = (pd.Series(self.counts, dtype="int64").reindex(index, fill_value=self.floor)
+                  + pd.Series(other.counts, dtype="int64").reindex(index, fill_value=other.floor))
+        errors = (pd.Series(self.errors, dtype="int64").reindex(index, fill_value=self.floor)
+                  + pd.Series(other.errors, dtype="int64").reindex(index, fill_value=other.floor))
+        self._store(counts, errors, self.floor + other.floor)
+
+    def _store(self, counts, errors, floor):
+        if len(counts) > self.capacity:
+            largest = counts.nlargest(self.capacity + 1)
+            floor = max(floor, int(largest.iloc[-1]))
+            counts = largest.iloc[:self.capacity]
+        self.floor = floor
+        self.counts = {str(v): int(c) for v, c in counts.items()}
+        self.errors = {str(v): int(errors[v]) for v in counts.index}
+
+    def top(self, k=TOPK_REPORT):
+        ordered = sorted(self.counts.items(), key=lambda item: item[1], reverse=True)[:k]
+        return [{"value": v, "count": c, "error": self.errors.get(v, 0)} for v, c in ordered]
+
+    def to_dict(self):
+        return {"capacity": self.capacity, "counts": self.counts, "errors": self.errors, "floor": self.floor}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(capacity=data["capacity"], counts=data["counts"], errors=data["errors"], floor=data["floor"])
+
+
+class QuantileSketch:
+    """
+    Quantis em fluxo (KLL simplificado): cada nível guarda até `k` valores; ao encher,
+    o nível é ordenado e metade dos itens (pares ou ímpares, ao acaso) sobe para o
+    próximo nível com peso dobrado. Memória O(k log(n/k)).
+    """
+
+    def __init__(self, k=QUANTILE_K, levels=None, n=0, minimum=None, maximum=None, total=0.0):
+        import numpy as np
+
+        self.k = k
+        self.levels = [np.asarray(level, dtype=np.float64) for level in (levels or [])]
+        self.n = n
+        self.min = minimum
+        self.max = maximum
+        self.total = total
+        self._rng = np.random.default_rng(n)
+
+    def update(self, values):
+        import numpy as np
+
+        values = np.asarray(values, dtype=np.float64)
+        if len(values) == 0:
+            return
+        self.n += len(values)
+        self.total += float(values.sum())
+        lo, hi = float(values.min()), float(values.max())
+        self.min = lo if self.min is None else min(self.min, lo)
+        self.max = hi if self.max is None else max(self.max, hi)
+
+        if not self.levels:
+            self.levels.append(np.empty(0, dtype=np.float64))
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compact()
+
+    def _compact(self):
+        import numpy as np
+
+        h = 0
+        while h < len(self.levels):
+            level = self.levels[h]
+            if len(level) > self.k:
+                level = np.sort(level)
+                # Com tamanho ímpar, o último item fica no nível atual
+                keep = level[-1:] if len(level) % 2 else level[:0]
+                even = level[:len(level) - len(keep)]
+                promoted = even[int(self._rng.integers(2))::2]
+                self.levels[h] = keep
+                if h + 1 == len(self.levels):
+                    self.levels.append(np.empty(0, dtype=np.float64))
+                self.levels[h + 1] = np.concatenate([self.levels[h + 1], promoted])
+            h += 1
+
+    def merge(self, other):
+        import numpy as np
+
+        if other.n == 0:
+            return
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0, dtype=np.float64))
+        for h, level in enumerate(other.levels):
+            self.levels[h] = np.concatenate([self.levels[h], level])
+        self.n += other.n
+        self.total += other.total
+        self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = other.max if self.max is None else max(self.max, other.max)
+        self._compact()
+
+    def quantiles(self, qs=QUANTILES):
+        import numpy as np
+
+        if self.n == 0:
+            return {}
+        values = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(level), 2.0 ** h) for h, level in enumerate(self.levels)])
+        order = np.argsort(values, kind="stable")
+        values, cumulative = values[order], np.cumsum(weights[order])
+        result = {}
+        for q in qs:
+            pos = min(int(np.searchsorted(cumulative, q * cumulative[-1])), len(values) - 1)
+            result[f"p{int(round(q * 100)):02d}"] = float(values[pos])
+        return result
+
+    def to_dict(self):
+        return {
+            "k": self.k, "levels": [level.tolist() for level in self.levels], "n": self.n,
+            "min": self.min, "max": self.max, "total": self.total,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            k=data["k"], levels=data["levels"], n=data["n"],
+            minimum=data["min"], maximum=data["max"], total=data["total"],
+        )
+
+
+class ColumnProfile:
+    """Sketches de uma coluna: distintos (HLL), top-k (Space-Saving) e quantis numéricos."""
+
+    def __init__(self, count=0, missing=0, non_numeric=0, hll=None, topk=None, quantiles=None):
+        self.count = count
+        self.missing = missing
+        self.non_numeric = non_numeric
+        self.hll = hll or HyperLogLog()
+        self.topk = topk or SpaceSaving()
+        self.quantiles = quantiles or QuantileSketch()
+
+    def update(self, series):
+        import pandas as pd
+
+        # Mesma normalização de texto do clean_dataset: espaços nas pontas não contam
+        values = series.dropna().str.strip()
+        values = values[values != ""]
+        self.count += len(values)
+        self.missing += len(series) - len(values)
+        if values.empty:
+            return
+
+        self.hll.add_hashes(pd.util.hash_pandas_object(values, index=False).to_numpy())
+        self.topk.update(values.value_counts(sort=False))
+
+        # Vírgula decimal, como no clean_dataset
+        numbers = pd.to_numeric(values.str.replace(",", ".", regex=False), errors="coerce")
+        parsed = numbers.notna()
+        self.non_numeric += int((~parsed).sum())
+        if parsed.any():
+            self.quantiles.update(numbers[parsed].to_numpy())
+
+    def merge(self, other):
+        self.count += other.count
+        self.missing += other.missing
+        self.non_numeric += other.non_numeric
+        self.hll.merge(other.hll)
+        self.topk.merge(other.topk)
+        self.quantiles.merge(other.quantiles)
+
+    def summary(self, top=TOPK_REPORT):
+        numeric = self.count > 0 and self.non_numeric == 0
+        result = {
+            "kind": "numeric" if numeric else "categorical",
+            "count": self.count,
+            "missing": self.missing,
+            "distinct_approx": min(self.hll.count(), self.count),
+            "distinct_relative_error": round(self.hll.relative_error, 4),
+            "top_values": self.topk.top(top),
+        }
+        if numeric:
+            result.update({
+                "min": self.quantiles.min,
+                "max": self.quantiles.max,
+                "mean": self.quantiles.total / self.quantiles.n,
+                "quantiles": self.quantiles.quantiles(),
+            })
+        return result
+
+    def to_dict(self):
+        return {
+            "count": self.count, "missing": self.missing, "non_numeric": self.non_numeric,
+            "hll": self.hll.to_dict(), "topk": self.topk.to_dict(), "quantiles": self.quantiles.to_dict(),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            count=data["count"], missing=data["missing"], non_numeric=data["non_numeric"],
+            hll=HyperLogLog.from_dict(data["hll"]),
+            topk=SpaceSaving.from_dict(data["topk"]),
+            quantiles=QuantileSketch.from_dict(data["quantiles"]),
+        )
+
+
+def profile_chunks(chunks):
+    """
+    Atualiza os sketches de cada coluna bloco a bloco (uma única varredura).
+
+    Returns:
+        Tupla (número de linhas, dicionário coluna -> ColumnProfile)
+    """
+    from services.data_loader import normalize_columns
+
+    rows = 0
+    profiles = {}
+    for chunk in chunks:
+        chunk.columns = normalize_columns(chunk.columns)
+        rows += len(chunk)
+        for col in chunk.columns:
+            profiles.setdefault(col, ColumnProfile()).update(chunk[col])
+    return rows, profiles
+
+
+def profile_file(filepath, chunk_rows=CHUNK_ROWS):
+    """
+    Perfila o arquivo bruto (antes da limpeza) lendo tudo como texto em blocos,
+    para que a memória não dependa do tamanho do arquivo.
+    """
+    from services.data_loader import iter_dataset_chunks
+
+    with span("profile"):
+        return profile_chunks(iter_dataset_chunks(filepath, chunk_rows, as_text=True))
+
+
+def profile_store(path):
+    """
+    Perfila um dataset acumulado (modo append) parte a parte. As partes já estão
+    limpas, então o perfil reflete os valores após a limpeza.
+    """
+    from services.dataset_store import iter_parts
+
+    with span("profile"):
+        return profile_chunks(part.astype("string") for part in iter_parts(path))
+
+
+def summarize(rows, profiles, top=TOPK_REPORT):
+    return {
+        "rows": rows,
+        "columns": {col: profile.summary(top) for col, profile in profiles.items()},
+    }
+
+
+def _params():
+    return {"hll_precision": HLL_PRECISION, "topk_capacity": TOPK_CAPACITY, "quantile_k": QUANTILE_K}
+
+
+def load_state(source_path):
+    """
+    Sketches completos salvos no cache do dataset.
+
+    Returns:
+        Tupla (linhas, dicionário coluna -> ColumnProfile) ou None se não houver estado válido
+    """
+    state = dataset_cache.load_json(source_path, "profile_state.json")
+    if not state or state.get("params") != _params():
+        return None
+    return state["rows"], {col: ColumnProfile.from_dict(d) for col, d in state["columns"].items()}
+
+
+def save_state(source_path, rows, profiles):
+    data = summarize(rows, profiles)
+    try:
+        dataset_cache.save_json(source_path, "profile_state.json", {
+            "params": _params(),
+            "rows": rows,
+            "columns": {col: profile.to_dict() for col, profile in profiles.items()},
+        })
+        dataset_cache.save_json(source_path, "profile.json", {"params": _params(), "data": data})
+    except OSError as e:
+        logger.warning("Não foi possível salvar o perfil do dataset: %s", e)
+    return data
+
+
+def update_state(source_path, frame, previous):
+    """
+    Soma as linhas de `frame` a um perfil anterior (rows, profiles) e salva o resultado
+    no cache da versão atual do dataset, sem reler as linhas antigas.
+    """
+    rows, profiles = previous
+    with span("profile"):
+        new_rows, new_profiles = profile_chunks([frame.astype("string")])
+        for col, profile in new_profiles.items():
+            if col in profiles:
+                profiles[col].merge(profile)
+            else:
+                profiles[col] = profile
+    return save_state(source_path, rows + new_rows, profiles)
+
+
+def get_profile(source_path, columns=None):
+    """
+    Retorna o perfil do dataset, lendo do cache ao lado do arquivo quando possível.
+    Os sketches completos também são salvos, para permitir atualizações incrementais.
+    """
+    from services.dataset_store import is_store
+
+    cached = dataset_cache.load_json(source_path, "profile.json")
+    if cached and cached.get("params") == _params() and "data" in cached:
+        data = cached["data"]
+    else:
+        rows, profiles = profile_store(source_path) if is_store(source_path) else profile_file(source_path)
+        data = save_state(source_path, rows, profiles)
+
+    if columns:
+        missing = [c for c in columns if c not in data["columns"]]
+        if missing:
+            raise ValueError(f"Colunas inexistentes: {', '.join(missing)}")
+        data = {"rows": data["rows"], "columns": {c: data["columns"][c] for c in columns}}
+    return data
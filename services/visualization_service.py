@@ -1,19 +1,51 @@
 import os
-import matplotlib.pyplot as plt
-import seaborn as sns
-import folium
-from folium.plugins import MarkerCluster
-from geopy.geocoders import Nominatim
-import time
-
-def generate_visualizations(df, output_dir):
+import logging
+from utils.instrumentation import span
+from services.aggregates import get_histograms, get_correlation
+
+logger = logging.getLogger(__name__)
+
+# Acima disso os valores anotados no heatmap ficam ilegíveis
+MAX_ANNOTATED_COLUMNS = 12
+
+
+# matplotlib/seaborn só são importados no primeiro gráfico: quem não gera
+# gráficos (ex: worker de predição) não paga esse custo na inicialização
+def _plotting():
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    return plt, sns
+
+
+# source_path (opcional): arquivo de origem do df, usado para cachear os histogramas;
+# include_map=False pula o mapa (ex: o pré-processamento já tem uma etapa só para ele)
+def generate_visualizations(df, output_dir, source_path=None, include_map=True):
+    with span("plot"):
+        return _generate_visualizations(df, output_dir, source_path, include_map)
+
+
+def _generate_visualizations(df, output_dir, source_path=None, include_map=True):
+    import pandas as pd
+    plt, sns = _plotting()
     os.makedirs(output_dir, exist_ok=True)
     plots = {}
 
-    # Distribuição de valores (numéricos)
-    for col in df.select_dtypes(include="number").columns:
+    # Distribuição de valores (numéricos): desenhada a partir das contagens pré-calculadas,
+    # sem passar todas as linhas para o seaborn
+    histograms = get_histograms(df, source_path)
+    for col, hist in histograms.items():
+        if not hist["counts"]:
+            continue
         plt.figure(figsize=(6,4))
-        sns.histplot(df[col].dropna(), kde=True)
+        edges = hist["edges"]
+        centers = [(a + b) / 2 for a, b in zip(edges[:-1], edges[1:])]
+        ax = sns.histplot(x=centers, weights=hist["counts"], bins=edges)
+        if hist["kde"]:
+            color = ax.patches[0].get_facecolor() if ax.patches else None
+            ax.plot(hist["kde"]["x"], hist["kde"]["y"], color=color[:3] if color else None)
+        ax.set_xlabel(col)
         plot_path = os.path.join(output_dir, f"dist_{col}.png")
         plt.title(f"Distribuição de {col}")
         plt.tight_layout()
@@ -21,31 +53,48 @@ def generate_visualizations(df, output_dir):
         plt.close()
         plots[col] = plot_path
 
-    # Correlação
+    # Correlação: heatmap só de um subconjunto limitado de colunas (matriz completa em cache)
+    corr = get_correlation(df, source_path)
     corr_path = os.path.join(output_dir, "correlation.png")
     plt.figure(figsize=(10, 8))
-    sns.heatmap(df.corr(numeric_only=True), annot=True, cmap="coolwarm")
-    plt.title("Matriz de Correlação")
+    sns.heatmap(
+        pd.DataFrame(corr["matrix"], index=corr["columns"], columns=corr["columns"], dtype=float),
+        annot=len(corr["columns"]) <= MAX_ANNOTATED_COLUMNS, fmt=".2f", cmap="coolwarm", vmin=-1, vmax=1
+    )
+    title = "Matriz de Correlação"
+    if corr["truncated"]:
+        title += f" ({len(corr['columns'])} de {corr['n_columns']} colunas)"
+    plt.title(title)
     plt.tight_layout()
     plt.savefig(corr_path)
     plt.close()
     plots["correlation"] = corr_path
 
+    if include_map:
+        plots.update(generate_map(df, output_dir))
+
+    return plots
+
+
+# Gera apenas o mapa interativo (HTML do folium), sem nenhum PNG
+def generate_map(df, output_dir):
+    os.makedirs(output_dir, exist_ok=True)
     mapa_path = os.path.join(output_dir, "mapa_vendas.html")
     try:
         mapa = generate_sales_map(df)
         mapa.save(mapa_path)
-        plots["mapa_vendas"] = mapa_path
+        return {"mapa_vendas": mapa_path}
     except Exception as e:
-        print(f"Erro ao gerar mapa de vendas: {e}")
-
-    return plots
+        logger.warning("Erro ao gerar mapa de vendas: %s", e)
+        return {}
 
 
 # mapa de vendas
 def generate_sales_map(df):
     import pandas as pd
     import numpy as np
+    import folium
+    from folium.plugins import MarkerCluster
 
     df.columns = df.columns.str.lower()
 
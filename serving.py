@@ -0,0 +1,53 @@
+import gc
+import logging
+from flask import Flask, Response
+from flask_cors import CORS
+from config import Config
+from utils import instrumentation
+from prediction_routes import prediction_bp
+from services.model_training import preload_models
+
+logging.basicConfig(
+    level=getattr(logging, Config.LOG_LEVEL, logging.INFO),
+    format="%(asctime)s %(levelname)s %(name)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+
+# App enxuto, somente leitura: expõe apenas /predict e /models/<id>/features
+# (mais /metrics). Não importa upload, análise nem treino.
+def create_app(preload=True):
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    CORS(app)
+    instrumentation.init_app(app)
+    app.register_blueprint(prediction_bp)
+
+    @app.route("/metrics", methods=["GET"])
+    def metrics():
+        return Response(instrumentation.render_prometheus(), mimetype="text/plain; version=0.0.4")
+
+    loaded = []
+    if preload:
+        # Importa o subsistema de ML e carrega os modelos no processo master:
+        # com preload_app do gunicorn, os workers herdam tudo via fork (copy-on-write)
+        import ml.ml_module  # noqa: F401
+
+        loaded = preload_models(
+            model_ids=Config.SERVING_PRELOAD_MODEL_IDS or None,
+            latest=Config.SERVING_PRELOAD_LATEST
+        )
+        # Tira os objetos pré-carregados do GC, que senão tocaria nas páginas
+        # compartilhadas e forçaria cópias em cada worker
+        gc.freeze()
+        logger.info("Modelos pré-carregados: %s", ", ".join(loaded) or "nenhum")
+
+    app.config["PRELOADED_MODELS"] = loaded
+    return app
+
+
+app = create_app()
+
+
+if __name__ == "__main__":
+    app.run(port=8000, host='0.0.0.0')
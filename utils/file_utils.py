@@ -1,10 +1,35 @@
 import os
 from werkzeug.utils import secure_filename
 
-ALLOWED_EXTENSIONS = {"csv"}
+# Formatos aceitos: extensão -> (formato, compressão)
+FILE_FORMATS = {
+    ".csv": ("csv", None),
+    ".csv.gz": ("csv", "gzip"),
+    ".csv.zst": ("csv", "zstd"),
+    ".parquet": ("parquet", None),
+    ".feather": ("feather", None),
+    ".arrow": ("feather", None),
+}
+
+ALLOWED_EXTENSIONS = {ext.lstrip(".") for ext in FILE_FORMATS}
+
+def detect_format(filename):
+    # extensões compostas (.csv.gz) antes das simples
+    name = filename.lower()
+    for ext in sorted(FILE_FORMATS, key=len, reverse=True):
+        if name.endswith(ext):
+            return FILE_FORMATS[ext]
+    raise ValueError(
+        f"Formato não suportado: {os.path.basename(filename)}. "
+        f"Use {', '.join(sorted(FILE_FORMATS))}"
+    )
 
 def allowed_file(filename):
-    return "." in filename and filename.rsplit(".", 1)[1].lower() in ALLOWED_EXTENSIONS
+    try:
+        detect_format(filename)
+        return True
+    except ValueError:
+        return False
 
 def save_file(file, upload_folder):
     if file and allowed_file(file.filename):
@@ -13,4 +38,4 @@ def save_file(file, upload_folder):
         file.save(filepath)
         return filepath
     else:
-        raise ValueError("Arquivo inválido. Envie um CSV.")
+        raise ValueError(f"Arquivo inválido. Formatos aceitos: {', '.join(sorted(FILE_FORMATS))}")
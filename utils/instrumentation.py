@@ -0,0 +1,327 @@
+import time
+import logging
+import threading
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Buckets padrão (segundos), do request rápido ao treino de vários minutos
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0)
+
+# Etapas conhecidas do pipeline: span() avisa (uma vez por nome) sobre etapas fora da lista,
+# para que uma etapa nova não entre nas métricas sem ser registrada aqui
+PIPELINE_STAGES = ("read", "clean", "stats", "plot", "preprocess", "fit", "evaluate", "dump", "load", "predict", "profile", "append", "cv")
+_unknown_stages = set()
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs += [f'{n}="{_escape(v)}"' for n, v in extra]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    """
+    Contador monotônico com labels, no formato do Prometheus.
+    """
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1.0, **labels):
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value}")
+        return lines
+
+
+class Histogram:
+    """
+    Histograma cumulativo com labels, no formato do Prometheus.
+    """
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series["counts"][i] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {key: {"counts": list(s["counts"]), "sum": s["sum"], "count": s["count"]}
+                    for key, s in self._series.items()}
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for key, series in sorted(self.snapshot().items()):
+            for bound, count in zip(self.buckets, series["counts"]):
+                labels = _format_labels(self.labelnames, key, [("le", bound)])
+                lines.append(f"{self.name}_bucket{labels} {count}")
+            labels = _format_labels(self.labelnames, key, [("le", "+Inf")])
+            lines.append(f"{self.name}_bucket{labels} {series['count']}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {series['sum']}")
+            lines.append(f"{self.name}_count{labels} {series['count']}")
+        return lines
+
+
+REGISTRY = []
+
+
+def register(metric):
+    REGISTRY.append(metric)
+    return metric
+
+
+ROUTE_LATENCY = register(Histogram(
+    "http_request_duration_seconds",
+    "Latência das rotas Flask em segundos.",
+    labelnames=("method", "route", "status"),
+))
+
+STAGE_DURATION = register(Histogram(
+    "pipeline_stage_duration_seconds",
+    "Duração das etapas do pipeline de dados/ML em segundos.",
+    labelnames=("stage",),
+))
+
+STAGE_ERRORS = register(Counter(
+    "pipeline_stage_errors_total",
+    "Quantidade de etapas do pipeline que terminaram com erro.",
+    labelnames=("stage",),
+))
+
+
+STAGE_PEAK_MEMORY = register(Histogram(
+    "pipeline_stage_peak_memory_bytes",
+    "Pico de memória alocada (tracemalloc) acima do início da etapa, quando o perfil de memória está ligado.",
+    labelnames=("stage",),
+    buckets=tuple(2 ** n * 1024 * 1024 for n in range(0, 16)),
+))
+
+MB = 1024 * 1024
+
+# Perfil de memória (opt-in): o tracemalloc só fica ligado enquanto houver um perfil ativo
+_memory = threading.local()
+_tracing = {"users": 0, "started": False}
+_tracing_lock = threading.Lock()
+
+
+def _max_rss_mb():
+    # pico de RSS do processo: inclui o que o tracemalloc não vê (malloc direto de C/Cython)
+    try:
+        import resource
+    except ImportError:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KB no Linux
+
+
+class MemoryProfile:
+    """
+    Pico e saldo de memória de cada etapa (span) executada na thread do perfil.
+
+    O tracemalloc é do processo inteiro: com outras threads alocando ao mesmo tempo
+    (treinos simultâneos, jobs), os números incluem a memória delas.
+    """
+
+    def __init__(self):
+        self.stages = {}
+        self._stack = []
+
+    def _traced(self):
+        import tracemalloc
+
+        return tracemalloc.get_traced_memory()
+
+    def _enter(self):
+        import tracemalloc
+
+        current, peak = self._traced()
+        if self._stack:
+            # o pico é zerado para a etapa interna; a externa guarda o que viu até aqui
+            parent = self._stack[-1]
+            parent["peak"] = max(parent["peak"], peak)
+        tracemalloc.reset_peak()
+        frame = {"start": current, "peak": current}
+        self._stack.append(frame)
+        return frame
+
+    def _exit(self, stage, frame):
+        current, peak = self._traced()
+        frame["peak"] = max(frame["peak"], peak)
+        self._stack.pop()
+        if self._stack:
+            self._stack[-1]["peak"] = max(self._stack[-1]["peak"], frame["peak"])
+        if stage is None:
+            return
+        peak_bytes = frame["peak"] - frame["start"]
+        STAGE_PEAK_MEMORY.observe(peak_bytes, stage=stage)
+        entry = self.stages.setdefault(stage, {"calls": 0, "peak_mb": 0.0, "net_mb": 0.0, "peak_traced_mb": 0.0})
+        entry["calls"] += 1
+        entry["peak_mb"] = max(entry["peak_mb"], peak_bytes / MB)
+        entry["net_mb"] += (current - frame["start"]) / MB
+        entry["peak_traced_mb"] = max(entry["peak_traced_mb"], frame["peak"] / MB)
+        entry["max_rss_mb"] = _max_rss_mb()
+
+    def to_dict(self):
+        """Etapas na ordem em que rodaram e o total do perfil até agora."""
+        total = None
+        if self._stack:
+            root = self._stack[0]
+            current, peak = self._traced()
+            total = {
+                "peak_mb": (max(root["peak"], peak) - root["start"]) / MB,
+                "net_mb": (current - root["start"]) / MB,
+                "max_rss_mb": _max_rss_mb(),
+            }
+        return {
+            "tracer": "tracemalloc",
+            "stages": {name: {k: round(v, 3) if isinstance(v, float) else v for k, v in entry.items()}
+                       for name, entry in self.stages.items()},
+            "total": total and {k: round(v, 3) if isinstance(v, float) else v for k, v in total.items()},
+        }
+
+
+@contextmanager
+def memory_profile(enabled=True):
+    """
+    Registra pico e saldo de memória de cada span() executado dentro do bloco (na mesma
+    thread). Com enabled=False não faz nada e devolve None, sem o custo do tracemalloc.
+
+    Uso:
+        with memory_profile() as profile:
+            train(...)
+        profile.to_dict()
+    """
+    if not enabled or getattr(_memory, "profile", None) is not None:
+        # perfis aninhados: as etapas já vão para o perfil externo
+        yield getattr(_memory, "profile", None) if enabled else None
+        return
+
+    import tracemalloc
+
+    with _tracing_lock:
+        if _tracing["users"] == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _tracing["started"] = True
+        _tracing["users"] += 1
+
+    profile = MemoryProfile()
+    profile._enter()
+    _memory.profile = profile
+    try:
+        yield profile
+    finally:
+        _memory.profile = None
+        with _tracing_lock:
+            _tracing["users"] -= 1
+            if _tracing["users"] == 0 and _tracing["started"]:
+                tracemalloc.stop()
+                _tracing["started"] = False
+
+
+@contextmanager
+def span(stage):
+    """
+    Mede a duração de uma etapa do pipeline e registra no histograma de etapas
+    (e a memória da etapa, dentro de memory_profile()).
+
+    Uso:
+        with span("fit"):
+            model.fit(X, y)
+    """
+    if stage not in PIPELINE_STAGES and stage not in _unknown_stages:
+        _unknown_stages.add(stage)
+        logger.warning("Etapa '%s' fora de PIPELINE_STAGES; registre-a em utils/instrumentation.py", stage)
+    profile = getattr(_memory, "profile", None)
+    frame = profile._enter() if profile is not None else None
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        STAGE_ERRORS.inc(stage=stage)
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_DURATION.observe(elapsed, stage=stage)
+        if frame is not None:
+            profile._exit(stage, frame)
+        logger.debug("Etapa '%s' concluída em %.4fs", stage, elapsed)
+
+
+def render_prometheus():
+    """
+    Gera o texto de exposição (text/plain; version=0.0.4) de todas as métricas registradas.
+    """
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def init_app(app):
+    """
+    Registra hooks no Flask para medir a latência de cada rota.
+
+    O label 'route' usa a regra da rota (ex: /models/<model_id>) e não a URL,
+    para não explodir a cardinalidade das séries.
+    """
+    from flask import g, request
+
+    @app.before_request
+    def _start_timer():
+        g._request_start = time.perf_counter()
+
+    def _observe(status):
+        start = g.pop("_request_start", None)
+        if start is not None:
+            route = request.url_rule.rule if request.url_rule is not None else "<unmatched>"
+            ROUTE_LATENCY.observe(
+                time.perf_counter() - start,
+                method=request.method,
+                route=route,
+                status=status,
+            )
+
+    @app.after_request
+    def _record_latency(response):
+        _observe(response.status_code)
+        return response
+
+    # o after_request não roda quando a view levanta uma exceção não tratada (ex: com
+    # PROPAGATE_EXCEPTIONS): a requisição ainda aparece nas métricas, como 500
+    @app.teardown_request
+    def _record_failed_request(exc):
+        _observe(500)
+
+    return app
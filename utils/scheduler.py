@@ -0,0 +1,171 @@
+import os
+import time
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+from utils.instrumentation import Histogram, register
+
+logger = logging.getLogger(__name__)
+
+# Escalonador de núcleos dos treinos: cada ajuste (fit, validação cruzada, importância)
+# recebe uma cota de núcleos e roda com n_jobs e threads de BLAS/OpenMP limitados a ela.
+# A soma das cotas nunca passa do total; quem não cabe espera na fila (FIFO).
+
+CORE_WAIT_SECONDS = register(Histogram(
+    "training_core_wait_seconds",
+    "Tempo de espera na fila do escalonador de núcleos antes de um ajuste começar",
+    labelnames=("label",),
+))
+CORES_GRANTED = register(Histogram(
+    "training_cores_granted",
+    "Núcleos concedidos a cada ajuste pelo escalonador",
+    labelnames=("label",),
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128),
+))
+
+
+def detect_cores():
+    # respeita a afinidade do processo (taskset/cgroups) quando o SO expõe
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+_cond = threading.Condition()
+_state = {"total": detect_cores(), "free": detect_cores(), "running": {}, "blas_limiter": None}
+_queue = deque()
+
+
+def configure(total_cores=None):
+    """Define quantos núcleos os treinos podem usar (None/0 = todos os do processo)."""
+    with _cond:
+        total = int(total_cores) if total_cores else detect_cores()
+        total = max(1, total)
+        in_use = _state["total"] - _state["free"]
+        _state["total"] = total
+        _state["free"] = total - in_use
+        _cond.notify_all()
+
+
+def total_cores():
+    return _state["total"]
+
+
+def status():
+    with _cond:
+        return {
+            "total_cores": _state["total"],
+            "free_cores": max(0, _state["free"]),
+            "running": [dict(info) for info in _state["running"].values()],
+            "queued": len(_queue),
+        }
+
+
+def _wanted(want):
+    # None = o que a fila permitir; -1 (convenção do joblib) = todos os núcleos
+    total = _state["total"]
+    if want is None or want < 0 or want > total:
+        return total
+    return max(1, int(want))
+
+
+# chamado com _cond: divide os núcleos livres com quem ainda está na fila
+def _grant(want):
+    fair_share = max(1, _state["total"] // (len(_state["running"]) + len(_queue) + 1))
+    return max(1, min(_wanted(want), _state["free"], fair_share))
+
+
+# chamado com _cond: o limite do BLAS é global ao processo, então vale a menor cota possível
+# com os ajustes atuais (total / ajustes em execução); o de OpenMP é por thread (ver allocate)
+def _update_blas_limit():
+    from threadpoolctl import threadpool_limits
+
+    running = len(_state["running"])
+    if running == 0:
+        if _state["blas_limiter"] is not None:
+            _state["blas_limiter"].restore_original_limits()
+            _state["blas_limiter"] = None
+        return
+    limit = max(1, _state["total"] // running)
+    if _state["blas_limiter"] is None:
+        # o primeiro limitador guarda os limites originais para restaurar no fim
+        _state["blas_limiter"] = threadpool_limits(limits=limit, user_api="blas")
+    else:
+        threadpool_limits(limits=limit, user_api="blas")
+
+
+@contextmanager
+def allocate(want=None, label="fit"):
+    """
+    Reserva núcleos para um ajuste, esperando na fila se não houver núcleo livre.
+
+    Dentro do bloco, o OpenMP da thread atual fica limitado à cota; o chamador usa
+    o número devolvido como n_jobs.
+
+    Uso:
+        with allocate(estimator_n_jobs, label="fit") as cores:
+            estimator.set_params(n_jobs=cores)
+            estimator.fit(X, y)
+    """
+    from threadpoolctl import threadpool_limits
+
+    ticket = object()
+    start = time.perf_counter()
+    with _cond:
+        _queue.append(ticket)
+        try:
+            # só o primeiro da fila entra, e só quando há pelo menos um núcleo livre
+            while _queue[0] is not ticket or _state["free"] < 1:
+                _cond.wait()
+        except BaseException:
+            _queue.remove(ticket)
+            _cond.notify_all()
+            raise
+        _queue.popleft()
+        cores = _grant(want)
+        _state["free"] -= cores
+        _state["running"][ticket] = {
+            "label": label, "cores": cores, "thread": threading.current_thread().name,
+        }
+        _update_blas_limit()
+        _cond.notify_all()
+
+    waited = time.perf_counter() - start
+    CORE_WAIT_SECONDS.observe(waited, label=label)
+    CORES_GRANTED.observe(cores, label=label)
+    if waited > 0.01:
+        logger.info("Ajuste '%s' esperou %.2fs por núcleos; recebeu %s", label, waited, cores)
+
+    try:
+        with threadpool_limits(limits=cores, user_api="openmp"):
+            yield cores
+    finally:
+        with _cond:
+            del _state["running"][ticket]
+            _state["free"] += cores
+            _update_blas_limit()
+            _cond.notify_all()
+
+
+@contextmanager
+def fit_slot(estimator, label="fit"):
+    """
+    allocate() para um estimador do sklearn: o n_jobs pedido nos parâmetros vira o pedido
+    ao escalonador e o estimador ajusta com a cota recebida. O n_jobs original volta ao
+    final, e é ele que fica salvo no modelo (a predição não passa pelo escalonador).
+    """
+    params = estimator.get_params(deep=False)
+    if "n_jobs" not in params:
+        with allocate(None, label=label) as cores:
+            yield cores
+        return
+
+    requested = params["n_jobs"]
+    with allocate(requested, label=label) as cores:
+        estimator.set_params(n_jobs=cores)
+        try:
+            yield cores
+        finally:
+            estimator.set_params(n_jobs=requested)